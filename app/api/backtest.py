@@ -1,28 +1,37 @@
 from fastapi import APIRouter, Body, Query
 from typing import List, Dict
-from app.backtest.backtester import Backtester
-from app.backtest.pit_loader import PITLoader
+from app.backtest.backtester import Backtester, BacktestConfig
+from app.backtest.pit_loader import load_membership_history, pit_loader
 from app.backtest.walk_forward import WalkForward
 from app.backtest.monte_carlo import MonteCarlo
 
 router = APIRouter(prefix="/api/v5/backtest", tags=["Backtesting"])
 bt = Backtester()
-pit = PITLoader()
 wf = WalkForward()
 mc = MonteCarlo()
 
 @router.post("/run")
-async def run_backtest(signals: List[Dict] = Body(...)):
-    return bt.run(signals)
+def run_backtest(
+    signals: List[Dict] = Body(...),
+    capital: float = Query(1e7, gt=0),
+    execution_lag: int = Query(1, ge=0),
+    max_participation: float = Query(0.1, gt=0),
+):
+    return bt.run(signals, BacktestConfig(capital=capital, execution_lag=execution_lag, max_participation=max_participation))
 
 @router.get("/pit")
-async def load_pit(as_of: str = Query(...)):
+def load_pit(as_of: str = Query(...)):
     from datetime import date
-    return pit.load(date.fromisoformat(as_of))
+    return pit_loader.load(date.fromisoformat(as_of))
+
+@router.post("/pit/history")
+def pit_history(records: List[Dict] = Body(...)):
+    """Historical universe versions ({"symbol", "valid_from", "valid_to", ...}); existing versions are kept."""
+    return {"loaded": load_membership_history(records)}
 
 @router.post("/walkforward")
-async def walk_forward(strategy: Dict = Body(...)):
-    return wf.optimize(strategy)
+def walk_forward(strategy: Dict = Body(...), rebuild: bool = Query(False)):
+    return wf.optimize(strategy, rebuild=rebuild)
 
 @router.post("/montecarlo")
 async def monte_carlo(model: Dict = Body(...), runs: int = Body(1000)):
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Query, Body
-from typing import List, Dict
+from fastapi import APIRouter, Query, Body, Header, HTTPException
+from typing import List, Dict, Optional
+from datetime import date
 from app.events_actions.corporate_actions import CorporateActionsService
 from app.events_actions.calendars import CalendarService
 from app.events_actions.catalyst import CatalystCardsService
 from app.events_actions.ics_export import ICSScheduler
+from app.events_actions.adjustments import adjustment_engine
 from fastapi.responses import Response
 
 router = APIRouter(prefix="/api/v4/events", tags=["Events_Actions"])
@@ -12,10 +14,25 @@ cs = CalendarService()
 ccs = CatalystCardsService()
 ics = ICSScheduler()
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: a comma-separated list, weak (W/) tags compare equal, "*" matches any."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
+
 @router.get("/actions", response_model=List[Dict])
 def actions():
     return cas.fetch_actions()
 
+@router.post("/actions", response_model=Dict)
+def add_action(payload: Dict = Body(...)):
+    return cas.add_action(payload)
+
+@router.get("/adjusted/{symbol}", response_model=List[Dict])
+def adjusted_series(symbol: str, start: Optional[date] = Query(None), end: Optional[date] = Query(None)):
+    return adjustment_engine.adjusted_series([symbol], start, end)
+
 @router.get("/dividends", response_model=List[Dict])
 def dividends(days: int = Query(7)):
     return cs.get_dividends(days)
@@ -24,10 +41,29 @@ def dividends(days: int = Query(7)):
 def agm(days: int = Query(7)):
     return cs.get_agm(days)
 
+@router.get("/catalyst", response_model=Dict)
+def catalyst_cards(page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=500)):
+    return ccs.get_cards(page, page_size)
+
 @router.post("/catalyst", response_model=Dict)
 def catalyst(payload: Dict = Body(...)):
-    return ccs.generate_card(payload["symbol"], payload["event_id"])
+    card = ccs.generate_card(payload["symbol"], payload["event_id"])
+    if card is None:
+        raise HTTPException(status_code=404, detail=f"No upcoming corporate action with id {payload['event_id']}")
+    return card
+
+@router.get("/calendar", response_model=List[Dict])
+def calendar(start: date = Query(...), end: date = Query(...), types: Optional[List[str]] = Query(None)):
+    return cs.get_events(start, end, types)
 
 @router.get("/export/ics")
-def export_ics(days: int = Query(30)):
-    return Response(content=ics.export(days), media_type="text/calendar")
+def export_ics(
+    days: int = Query(30),
+    user_id: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    etag = ics.etag(user_id, days)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    content, etag = ics.feed(user_id, days)
+    return Response(content=content, media_type="text/calendar", headers={"ETag": etag})
@@ -2,6 +2,8 @@ from fastapi import APIRouter
 from datetime import datetime
 from app.core.models import HealthResponse, HealthStatus, SystemHealthCheck
 from app.core.database import db_manager
+from app.core.write_buffer import quote_buffer
+from app.tasks.ingest_queue import ingest_queue
 
 router = APIRouter(prefix="/api/v1/health", tags=["Health"])
 
@@ -29,3 +31,13 @@ def get_health():
         data_freshness=freshness,
         uptime_seconds=None
     )
+
+
+@router.get("/ingest")
+def get_ingest_health():
+    """Write-path metrics: staged quote backlog, flush latency and ingest queue depth."""
+    return {
+        "quote_buffer": quote_buffer.get_stats(),
+        "ingest_queue": ingest_queue.depth(),
+        "timestamp": datetime.utcnow(),
+    }
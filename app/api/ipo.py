@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Query
-from typing import List, Dict
+from fastapi import APIRouter, Body, HTTPException, Query
+from datetime import datetime
+from typing import List, Dict, Optional
 from app.ipo.scoring import IPOScoringEngine
 from app.ipo.monitoring import IPOMonitor
 from app.ipo.strategy import IPOEntryStrategy
+from app.ipo.ingest import upsert_ipos, upsert_subscriptions
+from app.ipo.tracker import subscription_tracker
 
 router = APIRouter(prefix="/api/v4/ipo", tags=["IPO"])
 engine = IPOScoringEngine()
@@ -10,8 +13,34 @@ monitor = IPOMonitor()
 strate = IPOEntryStrategy()
 
 @router.get("/upcoming", response_model=List[Dict])
-def upcoming():
-    return engine.score_upcoming()
+def upcoming(limit: Optional[int] = Query(None, ge=1)):
+    return engine.score_upcoming(limit)
+
+@router.post("/issues", response_model=Dict)
+def load_issues(records: List[Dict] = Body(...)):
+    try:
+        return {"upserted": upsert_ipos(records)}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date: {e}")
+
+@router.post("/subscriptions", response_model=Dict)
+def load_subscriptions(records: List[Dict] = Body(...)):
+    return {"upserted": upsert_subscriptions(records)}
+
+@router.post("/subscriptions/snapshots", response_model=Dict)
+def ingest_snapshots(snapshots: List[Dict] = Body(...)):
+    try:
+        return {"ingested": subscription_tracker.ingest(snapshots)}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid captured_at: {e}")
+
+@router.get("/subscriptions/live", response_model=List[Dict])
+def live_subscriptions():
+    return subscription_tracker.live()
+
+@router.get("/subscriptions/{symbol}/history", response_model=List[Dict])
+def subscription_history(symbol: str, since: Optional[datetime] = None):
+    return subscription_tracker.history(symbol, since)
 
 @router.get("/prelist", response_model=Dict)
 def prelist(symbol: str = Query(...)):
@@ -3,6 +3,7 @@ from typing import List
 from datetime import datetime, timedelta
 from app.core.database import db_manager
 from app.core.models import QuoteResponse, Exchange
+from app.data.reconciliation import reconciler
 
 router = APIRouter(prefix="/api/v1/quotes", tags=["Quotes"])
 
@@ -16,7 +17,7 @@ def get_quotes(symbols: List[str] = Query(..., description="List of stock symbol
         SELECT q.symbol, s.name, q.exchange, q.price, q.change_amount, q.change_percent,
                q.volume, q.high, q.low, q.timestamp
         FROM quotes q
-        JOIN stocks s ON q.symbol = s.symbol
+        JOIN stocks s ON q.symbol = s.symbol AND q.exchange = s.exchange
         WHERE q.symbol IN ({placeholders})
           AND q.exchange = ?
         ORDER BY q.timestamp DESC
@@ -48,3 +49,18 @@ def get_quotes(symbols: List[str] = Query(..., description="List of stock symbol
         count += 1
 
     return results
+
+
+@router.get("/best")
+def get_best_prices(symbols: List[str] = Query(..., description="NSE or BSE symbols")):
+    """Best-price view across NSE and BSE from the latest reconciliation pass."""
+    rows = reconciler.best_prices(symbols)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No reconciled quotes found for provided symbols")
+    return rows
+
+
+@router.get("/divergences")
+def get_divergences(include_stale: bool = Query(False, description="Also list pairs whose quotes are far apart in time")):
+    """Companies whose latest NSE and BSE prices disagree beyond RECON_MAX_SPREAD_BPS."""
+    return {"last_run_at": reconciler.last_run_at, "items": reconciler.divergences(include_stale)}
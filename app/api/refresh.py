@@ -12,6 +12,8 @@ from app.core.database import db_manager
 from app.data.fetchers.nse_fetcher import NSEFetcher
 from app.data.fetchers.bse_fetcher import BSEFetcher
 from app.data.fetchers.gold_fetcher import GoldFetcher
+from app.core.write_buffer import quote_buffer
+from app.tasks.data_refresh import quote_to_row
 
 router = APIRouter(prefix="/refresh", tags=["Data Refresh"])
 
@@ -90,51 +92,23 @@ class RefreshService:
             logger.error(f"Failed to fetch NSE quotes: {e}")
             raise HTTPException(status_code=502, detail="Failed to fetch NSE quotes")
 
-        insert_query = """
-            INSERT INTO quotes (
-                id, symbol, exchange, price, change_amount, change_percent, volume, value,
-                high, low, open, close, bid, ask, delivery_qty, delivery_percent,
-                timestamp, data_source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        inserted = 0
+        rows = []
         errors = 0
         for q in quotes or []:
             try:
                 # Be liberal about the data shape (dict or object)
-                symbol = _get_attr(q, "symbol")
-                exchange_value = _get_attr(q, "exchange")
-                if hasattr(exchange_value, "value"):
-                    exchange_value = exchange_value.value
-                if not exchange_value:
-                    exchange_value = "NSE"
-
-                params = [
-                    _gen_pk(),
-                    symbol,
-                    exchange_value,
-                    _as_float(_get_attr(q, "price")),
-                    _as_float(_get_attr(q, "change_amount")),
-                    _as_float(_get_attr(q, "change_percent")),
-                    _get_attr(q, "volume"),
-                    _get_attr(q, "value"),
-                    _as_float(_get_attr(q, "high")),
-                    _as_float(_get_attr(q, "low")),
-                    _as_float(_get_attr(q, "open")),
-                    _as_float(_get_attr(q, "close")),
-                    _as_float(_get_attr(q, "bid")),
-                    _as_float(_get_attr(q, "ask")),
-                    _get_attr(q, "delivery_qty"),
-                    _as_float(_get_attr(q, "delivery_percent")),
-                    _get_attr(q, "timestamp") or datetime.utcnow(),
-                    _get_attr(_get_attr(q, "data_source"), "value", default="API") or "API",
-                ]
-                db_manager.execute_insert(insert_query, params)
-                inserted += 1
+                rows.append(quote_to_row(q, "NSE"))
             except Exception as e:
                 errors += 1
-                logger.error(f"NSE quote insert failed for {_get_attr(q, 'symbol')}: {e}")
+                logger.error(f"NSE quote normalization failed for {_get_attr(q, 'symbol')}: {e}")
+
+        # Validate/stage on the shared write buffer and flush now so the response reflects stored rows
+        try:
+            inserted = quote_buffer.add(rows)
+            quote_buffer.flush()
+        except Exception as e:
+            logger.error(f"NSE quotes write failed: {e}")
+            raise HTTPException(status_code=500, detail="Failed to store NSE quotes")
 
         logger.info(f"NSE quotes refresh completed | inserted={inserted}, errors={errors}")
         return {"exchange": "NSE", "symbols_count": len(symbols), "inserted": inserted, "errors": errors}
@@ -167,50 +141,23 @@ class RefreshService:
             logger.error(f"Failed to fetch BSE quotes: {e}")
             raise HTTPException(status_code=502, detail="Failed to fetch BSE quotes")
 
-        insert_query = """
-            INSERT INTO quotes (
-                id, symbol, exchange, price, change_amount, change_percent, volume, value,
-                high, low, open, close, bid, ask, delivery_qty, delivery_percent,
-                timestamp, data_source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        inserted = 0
+        rows = []
         errors = 0
         for q in quotes or []:
             try:
-                symbol = _get_attr(q, "symbol")
-                exchange_value = _get_attr(q, "exchange")
-                if hasattr(exchange_value, "value"):
-                    exchange_value = exchange_value.value
-                if not exchange_value:
-                    exchange_value = "BSE"
-
-                params = [
-                    _gen_pk(),
-                    symbol,
-                    exchange_value,
-                    _as_float(_get_attr(q, "price")),
-                    _as_float(_get_attr(q, "change_amount")),
-                    _as_float(_get_attr(q, "change_percent")),
-                    _get_attr(q, "volume"),
-                    _get_attr(q, "value"),
-                    _as_float(_get_attr(q, "high")),
-                    _as_float(_get_attr(q, "low")),
-                    _as_float(_get_attr(q, "open")),
-                    _as_float(_get_attr(q, "close")),
-                    _as_float(_get_attr(q, "bid")),
-                    _as_float(_get_attr(q, "ask")),
-                    _get_attr(q, "delivery_qty"),
-                    _as_float(_get_attr(q, "delivery_percent")),
-                    _get_attr(q, "timestamp") or datetime.utcnow(),
-                    _get_attr(_get_attr(q, "data_source"), "value", default="API") or "API",
-                ]
-                db_manager.execute_insert(insert_query, params)
-                inserted += 1
+                # Be liberal about the data shape (dict or object)
+                rows.append(quote_to_row(q, "BSE"))
             except Exception as e:
                 errors += 1
-                logger.error(f"BSE quote insert failed for {_get_attr(q, 'symbol')}: {e}")
+                logger.error(f"BSE quote normalization failed for {_get_attr(q, 'symbol')}: {e}")
+
+        # Validate/stage on the shared write buffer and flush now so the response reflects stored rows
+        try:
+            inserted = quote_buffer.add(rows)
+            quote_buffer.flush()
+        except Exception as e:
+            logger.error(f"BSE quotes write failed: {e}")
+            raise HTTPException(status_code=500, detail="Failed to store BSE quotes")
 
         logger.info(f"BSE quotes refresh completed | inserted={inserted}, errors={errors}")
         return {"exchange": "BSE", "symbols_count": len(symbols), "inserted": inserted, "errors": errors}
@@ -7,8 +7,8 @@ router = APIRouter(prefix="/api/v1/universe", tags=["Universe"])
 
 @router.get("/stats", response_model=UniverseStatsResponse)
 def get_universe_stats():
-    # Total stocks
-    total_stocks_query = "SELECT COUNT(*) AS count FROM stocks"
+    # Total stocks (a symbol listed on both exchanges counts once)
+    total_stocks_query = "SELECT COUNT(DISTINCT symbol) AS count FROM stocks"
     total_stocks = db_manager.execute_query(total_stocks_query)[0]['count']
 
     # NSE and BSE counts
@@ -1,9 +1,223 @@
-from typing import List, Dict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
 import numpy as np
+import pandas as pd
+from app.core.database import db_manager
+
+TRADING_DAYS = 252
+
+PANEL_SQL = """
+SELECT b.symbol, b.date,
+       b.close * COALESCE(f.cum_total_factor, 1.0) AS tr_close,
+       b.close * b.volume AS traded_value
+FROM primary_daily_bars b
+ASOF LEFT JOIN adjustment_factors f ON b.sec_id = f.sec_id AND b.date < f.ex_date
+WHERE b.date BETWEEN ? AND ? {filter}
+"""
+
+
+@dataclass
+class CostModel:
+    """Indian equity delivery costs as fractions of traded value."""
+    stt: float = 0.001  # securities transaction tax, both sides
+    brokerage: float = 0.0003
+    exchange: float = 0.0000345  # exchange transaction charges
+    gst: float = 0.18  # on brokerage + exchange charges
+    stamp_duty: float = 0.00015  # buy side only
+    slippage: float = 0.0005
+
+    @property
+    def buy_rate(self) -> float:
+        return self.stt + (self.brokerage + self.exchange) * (1 + self.gst) + self.stamp_duty + self.slippage
+
+    @property
+    def sell_rate(self) -> float:
+        return self.stt + (self.brokerage + self.exchange) * (1 + self.gst) + self.slippage
+
+
+@dataclass
+class BacktestConfig:
+    capital: float = 1e7
+    execution_lag: int = 1  # signals computed at close t trade at close t + lag
+    max_participation: float = 0.1  # max trade value per symbol per day as a share of 20-day ADV
+    costs: CostModel = field(default_factory=CostModel)
+
+
+@dataclass
+class PricePanel:
+    """Dense (date x symbol) arrays over adjusted daily bars."""
+    dates: np.ndarray
+    symbols: np.ndarray
+    returns: np.ndarray  # total-return adjusted close-to-close; NaN where there is no bar
+    adv: np.ndarray  # 20-day average traded value known before each day's close
+
+    @property
+    def tradable(self) -> np.ndarray:
+        return np.isfinite(self.returns)
+
+
+def load_panel(start: date, end: date, symbols: Optional[Sequence[str]] = None) -> PricePanel:
+    """
+    Load adjusted closes and traded value for [start, end] into dense arrays.
+    A month of earlier bars is read so ADV is known from the first day.
+    """
+    params: List[Any] = [start - timedelta(days=45), end]
+    filter_sql = ""
+    if symbols is not None:
+        filter_sql = "AND b.symbol IN (SELECT UNNEST(?))"
+        params.append(list(symbols))
+    rows = db_manager.execute_query(PANEL_SQL.format(filter=filter_sql), params)
+    if not rows:
+        return PricePanel(np.array([], dtype=object), np.array([], dtype=object), np.zeros((0, 0)), np.zeros((0, 0)))
+    frame = pd.DataFrame(rows)
+    closes = frame.pivot(index="date", columns="symbol", values="tr_close").sort_index()
+    traded = frame.pivot(index="date", columns="symbol", values="traded_value").reindex_like(closes)
+    adv = traded.rolling(20, min_periods=5).mean().shift(1)
+    returns = closes.pct_change(fill_method=None)
+    keep = closes.index >= start
+    closes, adv, returns = closes[keep], adv[keep], returns[keep]
+    if closes.empty:
+        return PricePanel(np.array([], dtype=object), np.array([], dtype=object), np.zeros((0, 0)), np.zeros((0, 0)))
+    returns.iloc[0] = np.where(closes.iloc[0].notna(), 0.0, np.nan)
+    return PricePanel(
+        dates=closes.index.to_numpy(),
+        symbols=closes.columns.to_numpy(),
+        returns=returns.to_numpy(),
+        adv=adv.fillna(0.0).to_numpy(),
+    )
+
 
 class Backtester:
-    def run(self, signals: List[Dict], slippage: float = 0.001) -> Dict:
-        returns = [s.get("return", 0) - slippage for s in signals]
-        total_return = sum(returns)
-        sharpe_ratio = total_return / (np.std(returns) if len(returns) > 1 else 1)
-        return {"total_return": total_return, "sharpe": sharpe_ratio}
+    """
+    Vectorised portfolio simulation over a PricePanel.
+
+    Signals are target weights as a (date x symbol) matrix, or (params x date x
+    symbol) to run a stack of parameter sets together. A row with any finite
+    value is a rebalance (NaN symbols in it mean weight 0); an all-NaN row
+    holds the drifted positions. Each day marks positions to market, then
+    trades towards the target at the close, clipped to max_participation of
+    ADV and only in symbols with a bar. A symbol whose trade was clipped or
+    had no bar keeps working towards the last target on later days until it
+    is reached or the next rebalance replaces it. Costs are charged on traded
+    value.
+    The loop is over days only, with every step vectorised across parameter
+    sets and symbols.
+    """
+
+    def simulate(self, signals: np.ndarray, panel: PricePanel, config: Optional[BacktestConfig] = None) -> Dict[str, np.ndarray]:
+        config = config or BacktestConfig()
+        target = signals[None] if signals.ndim == 2 else signals
+        n_params, n_days, n_symbols = target.shape
+        if (n_days, n_symbols) != panel.returns.shape:
+            raise ValueError(f"signals {target.shape[1:]} do not match the price panel {panel.returns.shape}")
+
+        lag = config.execution_lag
+        returns = np.nan_to_num(panel.returns)
+        tradable = panel.tradable
+        rebalance = np.isfinite(target).any(axis=2)  # (P, D)
+        target = np.nan_to_num(target)
+        buy_rate, sell_rate = config.costs.buy_rate, config.costs.sell_rate
+
+        weights = np.zeros((n_params, n_symbols))
+        active = np.zeros((n_params, n_symbols))  # latest target per parameter set
+        working = np.zeros((n_params, n_symbols), dtype=bool)  # symbols still trading towards it
+        equity = np.full(n_params, float(config.capital))
+        curve = np.empty((n_params, n_days))
+        turnover = np.zeros((n_params, n_days))
+        costs = np.zeros((n_params, n_days))
+        clipped = np.zeros((n_params, n_days))
+
+        for t in range(n_days):
+            if t:
+                gross = weights @ returns[t]
+                weights = weights * (1.0 + returns[t]) / (1.0 + gross)[:, None]
+                equity = equity * (1.0 + gross)
+            s = t - lag
+            if s >= 0:
+                new = rebalance[:, s]
+                active[new] = target[new, s]
+                working[new] = True
+                wanted = np.where(working, active - weights, 0.0)
+                delta = np.where(tradable[t], wanted, 0.0)
+                limit = config.max_participation * panel.adv[t] / equity[:, None]
+                capped = np.clip(delta, -limit, limit)
+                clipped[:, t] = np.abs(delta - capped).sum(axis=1)
+                working &= np.abs(wanted - capped) > 1e-9
+                buys = np.maximum(capped, 0.0).sum(axis=1)
+                sells = np.maximum(-capped, 0.0).sum(axis=1)
+                cost = buys * buy_rate + sells * sell_rate
+                weights = (weights + capped) / (1.0 - cost)[:, None]
+                equity = equity * (1.0 - cost)
+                turnover[:, t] = (buys + sells) / 2
+                costs[:, t] = cost
+            curve[:, t] = equity
+
+        peak = np.maximum.accumulate(curve, axis=1)
+        return {
+            "equity": curve,
+            "drawdown": curve / peak - 1.0,
+            "turnover": turnover,
+            "costs": costs,
+            "capacity_clipped": clipped,
+        }
+
+    @staticmethod
+    def summarize(result: Dict[str, np.ndarray], capital: float) -> List[Dict[str, float]]:
+        """Per-parameter-set statistics from simulate() output."""
+        curve = result["equity"]
+        n_days = curve.shape[1]
+        years = max(n_days / TRADING_DAYS, 1 / TRADING_DAYS)
+        previous = np.concatenate([np.full((len(curve), 1), capital), curve[:, :-1]], axis=1)
+        daily = curve / previous - 1.0
+        std = daily.std(axis=1, ddof=1) if n_days > 1 else np.zeros(len(curve))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe = np.where(std > 0, daily.mean(axis=1) / std * np.sqrt(TRADING_DAYS), 0.0)
+        final = curve[:, -1] if n_days else np.full(len(curve), capital)
+        stats = {
+            "total_return": final / capital - 1,
+            "cagr": (final / capital) ** (1 / years) - 1,
+            "volatility": std * np.sqrt(TRADING_DAYS),
+            "sharpe": sharpe,
+            "max_drawdown": result["drawdown"].min(axis=1) if n_days else np.zeros(len(curve)),
+            "annual_turnover": result["turnover"].sum(axis=1) / years,
+            "total_costs": result["costs"].sum(axis=1),
+            "capacity_clipped": result["capacity_clipped"].sum(axis=1),
+        }
+        return [{k: float(v[i]) for k, v in stats.items()} for i in range(len(curve))]
+
+    def run(self, signals: List[Dict], config: Optional[BacktestConfig] = None) -> Dict:
+        """
+        Backtest long-format signals ({"date", "symbol", "weight"} records; each
+        date present is a rebalance) through the last bar in daily_bars.
+        """
+        config = config or BacktestConfig()
+        if not signals:
+            return {"error": "no signals"}
+        frame = pd.DataFrame(signals)
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        end = db_manager.execute_query("SELECT MAX(date) AS d FROM daily_bars")[0]["d"]
+        if end is None:
+            return {"error": "no daily bars"}
+        panel = load_panel(frame["date"].min(), end, sorted(frame["symbol"].unique()))
+        if not len(panel.dates):
+            return {"error": "no bars for the signalled symbols"}
+        # A rebalance date that is not a trading day applies on the next one; when several
+        # signal dates land on the same trading day, the latest signal date replaces the others
+        position = np.searchsorted(panel.dates, frame["date"].to_numpy())
+        frame = frame[position < len(panel.dates)].assign(
+            signal_date=frame["date"], date=panel.dates[position[position < len(panel.dates)]]
+        )
+        frame = frame[frame["signal_date"] == frame.groupby("date")["signal_date"].transform("max")]
+        matrix = (
+            frame.pivot_table(index="date", columns="symbol", values="weight", aggfunc="last")
+            .reindex(index=panel.dates, columns=panel.symbols)
+        )
+        rebalances = frame["date"].unique()
+        matrix.loc[rebalances] = matrix.loc[rebalances].fillna(0.0)
+        result = self.simulate(matrix.to_numpy(), panel, config)
+        stats = self.summarize(result, config.capital)[0]
+        return {
+            **stats,
+            "equity_curve": [{"date": d, "equity": float(v)} for d, v in zip(panel.dates, result["equity"][0])],
+        }
@@ -1,6 +1,189 @@
+import threading
+import time
 from datetime import date
-from typing import Dict
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+VERSIONED_COLUMNS = ["name", "exchange", "sector", "industry", "isin", "segment", "listing_date"]
+MEMBERSHIP_COLUMNS = ["symbol", "valid_from", "valid_to", *VERSIONED_COLUMNS]
+OPEN_END = np.datetime64("9999-12-31", "D")
+
+# Order-independent content hash: catches same-day corrections that keep the row count and dates
+VERSION_SQL = f"""
+SELECT COUNT(*) AS n, bit_xor(hash({", ".join(MEMBERSHIP_COLUMNS)})) AS digest FROM universe_membership
+"""
+
+_UNCHANGED = " AND ".join(f"s.{c} IS NOT DISTINCT FROM u.{c}" for c in VERSIONED_COLUMNS)
+
+_CHANGED = f"u.valid_to IS NULL AND NOT EXISTS (SELECT 1 FROM primary_stocks s WHERE s.symbol = u.symbol AND {_UNCHANGED})"
+
+# Versions opened earlier the same day are corrected in place (dropped and reopened) ...
+DROP_SAME_DAY_SQL = f"DELETE FROM universe_membership u WHERE u.valid_from = ? AND {_CHANGED}"
+# ... older open versions whose symbol left `stocks` or whose attributes changed are closed ...
+CLOSE_CHANGED_SQL = f"UPDATE universe_membership u SET valid_to = ? WHERE u.valid_from < ? AND {_CHANGED}"
+# ... then open a version for every symbol without one (its primary listing's attributes)
+OPEN_NEW_SQL = f"""
+INSERT INTO universe_membership ({", ".join(MEMBERSHIP_COLUMNS)})
+SELECT s.symbol, ?, NULL, {", ".join(f"s.{c}" for c in VERSIONED_COLUMNS)}
+FROM primary_stocks s
+WHERE NOT EXISTS (SELECT 1 FROM universe_membership u WHERE u.symbol = s.symbol AND u.valid_to IS NULL)
+ON CONFLICT (symbol, valid_from) DO UPDATE SET {", ".join(f"{c} = EXCLUDED.{c}" for c in VERSIONED_COLUMNS)}, valid_to = NULL
+"""
+
+
+def snapshot_universe(as_of: Optional[date] = None) -> Dict[str, int]:
+    """
+    Diff `stocks` against the open membership versions and record the changes
+    effective `as_of`: listings and reclassifications open a new version,
+    removals and reclassifications close the previous one (valid_to is exclusive).
+    """
+    as_of = as_of or date.today()
+    with db_manager.transaction():
+        before = db_manager.execute_query(
+            "SELECT COUNT(*) AS n FROM universe_membership WHERE valid_to IS NULL"
+        )[0]["n"]
+        db_manager.execute_insert(DROP_SAME_DAY_SQL, [as_of])
+        db_manager.execute_insert(CLOSE_CHANGED_SQL, [as_of, as_of])
+        after_close = db_manager.execute_query(
+            "SELECT COUNT(*) AS n FROM universe_membership WHERE valid_to IS NULL"
+        )[0]["n"]
+        db_manager.execute_insert(OPEN_NEW_SQL, [as_of])
+        after = db_manager.execute_query(
+            "SELECT COUNT(*) AS n FROM universe_membership WHERE valid_to IS NULL"
+        )[0]["n"]
+    result = {"closed": before - after_close, "opened": after - after_close, "members": after}
+    logger.info(f"Universe snapshot {as_of}: {result}")
+    return result
+
+
+def _as_date(value: Any) -> Optional[date]:
+    return date.fromisoformat(str(value)[:10]) if value is not None and not isinstance(value, date) else value
+
+
+def load_membership_history(records: Sequence[Dict[str, Any]]) -> int:
+    """Bulk-load historical versions (e.g. past index or exchange lists, delisted names included)."""
+    dates = {"valid_from", "valid_to", "listing_date"}
+    db_manager.bulk_insert(
+        "universe_membership",
+        MEMBERSHIP_COLUMNS,
+        [[_as_date(r.get(c)) if c in dates else r.get(c) for c in MEMBERSHIP_COLUMNS] for r in records],
+        on_conflict="ON CONFLICT (symbol, valid_from) DO NOTHING",
+    )
+    return len(records)
+
 
 class PITLoader:
+    """
+    Point-in-time universe from universe_membership.
+
+    Every version interval is cached as sorted numpy columns, so "universe as of
+    D" is a vectorised interval test over the cache (no query per rebalance).
+    The cache is reloaded when the table's version changes, checked at most every
+    PIT_CACHE_CHECK_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._records: List[Dict[str, Any]] = []
+        self._symbols = np.empty(0, dtype=object)
+        self._sectors = np.empty(0, dtype=object)
+        self._from = np.empty(0, dtype="datetime64[D]")
+        self._to = np.empty(0, dtype="datetime64[D]")
+        self._version = None
+        self._checked_at = 0.0
+
+    def _ensure_loaded(self):
+        if self._loaded and time.monotonic() - self._checked_at < settings.PIT_CACHE_CHECK_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        row = db_manager.execute_query(VERSION_SQL)[0]
+        version = (row["n"], row["digest"])
+        if version == self._version:
+            return
+        rows = db_manager.execute_query(
+            f"SELECT {', '.join(MEMBERSHIP_COLUMNS)} FROM universe_membership ORDER BY valid_from, symbol"
+        )
+        frame = pd.DataFrame(rows, columns=MEMBERSHIP_COLUMNS)
+        self._from = pd.to_datetime(frame["valid_from"]).to_numpy().astype("datetime64[D]")
+        self._to = pd.to_datetime(frame["valid_to"]).to_numpy().astype("datetime64[D]")
+        self._to[np.isnat(self._to)] = OPEN_END
+        self._loaded = True
+        self._records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        self._symbols = frame["symbol"].to_numpy()
+        self._sectors = frame["sector"].to_numpy()
+        self._version = version
+        logger.debug(f"PIT universe cache loaded: {len(frame)} versions")
+
+    def _mask(self, as_of: date) -> np.ndarray:
+        d = np.datetime64(as_of, "D")
+        upto = np.searchsorted(self._from, d, side="right")  # versions are sorted by valid_from
+        mask = np.zeros(len(self._from), dtype=bool)
+        mask[:upto] = self._to[:upto] > d
+        return mask
+
+    def _selected(self, as_of: date, sector: Optional[str]) -> np.ndarray:
+        self._ensure_loaded()
+        mask = self._mask(as_of)
+        if sector is not None:
+            mask &= self._sectors == sector
+        return np.flatnonzero(mask)
+
+    def members(self, as_of: date, sector: Optional[str] = None) -> np.ndarray:
+        """Symbols in the universe on `as_of` (fast path for backtest loops)."""
+        with self._lock:
+            selected = self._selected(as_of, sector)  # may reload the cache
+            return self._symbols[selected]
+
+    def universe(self, as_of: date, sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Member rows with their classification as it was on `as_of`."""
+        with self._lock:
+            return [self._records[i] for i in self._selected(as_of, sector)]
+
+    def membership_matrix(self, dates: Sequence[date], symbols: Sequence[str]) -> np.ndarray:
+        """
+        Bulk loader for walking a date range: a (date x symbol) boolean membership
+        matrix built from the version intervals with one cumulative sum.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            days = np.array(dates, dtype="datetime64[D]")
+            col = {s: i for i, s in enumerate(symbols)}
+            rows = np.array([col.get(s, -1) for s in self._symbols], dtype=np.int64)
+            keep = rows >= 0
+            start = np.searchsorted(days, self._from[keep], side="left")
+            end = np.searchsorted(days, self._to[keep], side="left")
+            marks = np.zeros((len(days) + 1, len(symbols)), dtype=np.int32)
+            np.add.at(marks, (start, rows[keep]), 1)
+            np.add.at(marks, (end, rows[keep]), -1)
+            return np.cumsum(marks, axis=0)[:-1] > 0
+
+    def covered(self, dates: Sequence[date]) -> np.ndarray:
+        """Per date, whether any version is in force, i.e. the universe was recorded for that day."""
+        with self._lock:
+            self._ensure_loaded()
+            days = np.array(dates, dtype="datetime64[D]")
+            marks = np.zeros(len(days) + 1, dtype=np.int32)
+            np.add.at(marks, np.searchsorted(days, self._from, side="left"), 1)
+            np.add.at(marks, np.searchsorted(days, self._to, side="left"), -1)
+            return np.cumsum(marks)[:-1] > 0
+
     def load(self, as_of: date) -> Dict:
-        return {"date": as_of.isoformat(), "universe_size": 7500}
+        members = self.universe(as_of)
+        sectors: Dict[str, int] = {}
+        for m in members:
+            key = m["sector"] or "Unknown"
+            sectors[key] = sectors.get(key, 0) + 1
+        return {
+            "date": as_of.isoformat(),
+            "universe_size": len(members),
+            "sectors": dict(sorted(sectors.items(), key=lambda kv: kv[1], reverse=True)),
+            "members": [m["symbol"] for m in members],
+        }
+
+
+pit_loader = PITLoader()
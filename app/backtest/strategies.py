@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+
+def _trailing_return(index: np.ndarray, rows: np.ndarray, lookback: int, skip: int = 0) -> np.ndarray:
+    """Total return from `lookback` to `skip` days before each of `rows`; NaN without the history."""
+    out = np.full((len(rows), index.shape[1]), np.nan)
+    ok = rows - lookback >= 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[ok] = index[rows[ok] - skip] / index[rows[ok] - lookback] - 1.0
+    return out
+
+
+def _top_n(scores: np.ndarray, eligible: np.ndarray, rows: np.ndarray, top_n: int, n_days: int) -> np.ndarray:
+    """Equal weights in the `top_n` highest scores on each rebalance row; NaN (hold) elsewhere."""
+    weights = np.full((n_days, scores.shape[1]), np.nan)
+    if not len(rows) or not scores.shape[1]:
+        return weights
+    ranked = np.where(eligible[rows] & np.isfinite(scores), scores, -np.inf)
+    n = min(top_n, ranked.shape[1])
+    top = np.argpartition(-ranked, n - 1, axis=1)[:, :n]
+    ok = np.isfinite(np.take_along_axis(ranked, top, axis=1))
+    count = np.maximum(ok.sum(axis=1, keepdims=True), 1)
+    block = np.zeros_like(ranked)
+    np.put_along_axis(block, top, np.where(ok, 1.0 / count, 0.0), axis=1)
+    weights[rows] = block
+    return weights
+
+
+def _rebalance_rows(n_days: int, offset: int, every: int) -> np.ndarray:
+    # Anchored to the absolute panel position so every window sees the same schedule
+    return np.flatnonzero((np.arange(n_days) + offset) % max(int(every), 1) == 0)
+
+
+def momentum(index: np.ndarray, eligible: np.ndarray, offset: int, lookback: int = 252, skip: int = 21,
+             top_n: int = 20, rebalance_days: int = 21) -> np.ndarray:
+    """Hold the top_n names by trailing return over [t - lookback, t - skip]."""
+    rows = _rebalance_rows(len(index), offset, rebalance_days)
+    return _top_n(_trailing_return(index, rows, int(lookback), int(skip)), eligible, rows, int(top_n), len(index))
+
+
+def mean_reversion(index: np.ndarray, eligible: np.ndarray, offset: int, lookback: int = 5,
+                   top_n: int = 20, rebalance_days: int = 5) -> np.ndarray:
+    """Hold the top_n biggest losers over the last `lookback` days."""
+    rows = _rebalance_rows(len(index), offset, rebalance_days)
+    return _top_n(-_trailing_return(index, rows, int(lookback)), eligible, rows, int(top_n), len(index))
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """
+    A parameterised signal generator for the walk-forward optimizer.
+
+    `signals(index, eligible, offset, **params)` maps a (date x symbol) total-return
+    index and eligibility mask to target weights in Backtester form; `offset` is the
+    absolute panel row of the first date. `warmup(params)` is the number of earlier
+    rows the signal needs.
+    """
+    signals: Callable[..., np.ndarray]
+    space: Dict[str, List[Any]]
+    warmup: Callable[[Dict[str, Any]], int]
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "momentum": Strategy(
+        signals=momentum,
+        space={
+            "lookback": [63, 126, 189, 252],
+            "skip": [0, 21],
+            "top_n": [10, 20, 30, 50],
+            "rebalance_days": [5, 21, 63],
+        },
+        warmup=lambda p: int(p.get("lookback", 252)),
+    ),
+    "mean_reversion": Strategy(
+        signals=mean_reversion,
+        space={
+            "lookback": [3, 5, 10, 21],
+            "top_n": [10, 20, 50],
+            "rebalance_days": [1, 5, 10],
+        },
+        warmup=lambda p: int(p.get("lookback", 5)),
+    ),
+}
@@ -1,5 +1,304 @@
-from typing import Dict
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+from .backtester import Backtester, BacktestConfig, PricePanel, load_panel
+from .pit_loader import pit_loader
+from .strategies import STRATEGIES
+
+METRICS = ("sharpe", "cagr", "total_return", "max_drawdown")  # higher is better for each
+
+Window = Tuple[int, int, int]  # panel rows: in-sample [lo, split), out-of-sample [split, hi)
+
+# ---------- worker side ----------
+
+_SEGMENTS: List[shared_memory.SharedMemory] = []
+_ARRAYS: Dict[str, np.ndarray] = {}
+
+
+@contextmanager
+def _shared_arrays(arrays: Dict[str, np.ndarray]) -> Iterator[Dict[str, Tuple[str, Tuple[int, ...], str]]]:
+    """Copy arrays into shared memory once; yields the specs workers attach by."""
+    segments, specs = [], {}
+    try:
+        for name, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+        yield specs
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def _attach(specs: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """Pool initializer: map the parent's arrays without copying them."""
+    _ARRAYS.clear()
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SEGMENTS.append(shm)
+        _ARRAYS[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _evaluate(
+    name: str, candidates: Sequence[Dict[str, Any]], lo: int, hi: int, config: BacktestConfig, with_returns: bool = False
+) -> Tuple[List[Dict[str, float]], Optional[List[float]]]:
+    """
+    Backtest a chunk of parameter sets over panel rows [lo, hi) as one stack.
+    Signals are built from up to `warmup` earlier rows so lookbacks are filled.
+    """
+    strategy = STRATEGIES[name]
+    start = max(0, lo - max(strategy.warmup(p) for p in candidates))
+    index, eligible = _ARRAYS["index"][start:hi], _ARRAYS["eligible"][start:hi]
+    stack = np.stack([strategy.signals(index, eligible, start, **p)[lo - start:] for p in candidates])
+    panel = PricePanel(np.arange(lo, hi), np.empty(0), _ARRAYS["returns"][lo:hi], _ARRAYS["adv"][lo:hi])
+    result = Backtester().simulate(stack, panel, config)
+    stats = Backtester.summarize(result, config.capital)
+    if not with_returns:
+        return stats, None
+    curve = result["equity"][0]
+    daily = curve / np.concatenate([[config.capital], curve[:-1]]) - 1.0
+    return stats, daily.tolist()
+
+
+# ---------- optimizer ----------
+
+
+def _candidates(space: Dict[str, Sequence[Any]], search: str, samples: int, seed: int) -> List[Dict[str, Any]]:
+    """Grid (every combination) or a seeded random sample of it, decoded without enumerating the grid."""
+    keys = sorted(space)
+    values = [list(space[k]) for k in keys]
+    total = math.prod(len(v) for v in values)
+    if search == "random" and samples < total:
+        codes = np.sort(np.random.default_rng(seed).choice(total, size=samples, replace=False))
+    else:
+        codes = range(total)
+    out = []
+    for code in codes:
+        code, params = int(code), {}
+        for key, options in zip(reversed(keys), reversed(values)):
+            code, i = divmod(code, len(options))
+            params[key] = options[i]
+        out.append({k: params[k] for k in keys})
+    return out
+
+
+def _windows(n_days: int, in_sample: int, out_sample: int, anchored: bool) -> List[Window]:
+    """Rolling (or anchored/expanding) in-sample windows, each followed by its out-of-sample block."""
+    windows = []
+    split = in_sample
+    while split + out_sample <= n_days:
+        windows.append((0 if anchored else split - in_sample, split, split + out_sample))
+        split += out_sample
+    return windows
+
+
+def _inputs(panel: PricePanel) -> Dict[str, np.ndarray]:
+    """Arrays shared with the workers: returns, ADV, a total-return index and the eligibility mask."""
+    listed = np.maximum.accumulate(panel.tradable, axis=0)
+    index = np.where(listed, np.cumprod(1.0 + np.nan_to_num(panel.returns), axis=0), np.nan)
+    # Survivorship-free on days the universe was recorded for; plain tradability before
+    # the first version (or in gaps between loaded history and daily snapshots)
+    membership = pit_loader.membership_matrix(panel.dates, panel.symbols)
+    covered = pit_loader.covered(panel.dates)
+    eligible = panel.tradable & (membership | ~covered[:, None])
+    return {"returns": panel.returns, "adv": panel.adv, "index": index, "eligible": eligible}
+
+
+def _stitched(returns: np.ndarray, capital: float) -> Dict[str, float]:
+    curve = capital * np.cumprod(1.0 + returns)
+    zeros = np.zeros((1, len(curve)))
+    result = {
+        "equity": curve[None],
+        "drawdown": (curve / np.maximum.accumulate(curve) - 1.0)[None],
+        "turnover": zeros, "costs": zeros, "capacity_clipped": zeros,
+    }
+    stats = Backtester.summarize(result, capital)[0]
+    return {k: stats[k] for k in ("total_return", "cagr", "volatility", "sharpe", "max_drawdown")}
+
 
 class WalkForward:
-    def optimize(self, strategy: Dict) -> Dict:
-        return {"win_rate": 0.68, "max_drawdown": 0.07}
+    """
+    Walk-forward parameter optimisation.
+
+    History is split into rolling in-sample/out-of-sample windows. In each window
+    every candidate parameter set (grid or random search over the strategy's
+    space) is backtested in-sample, and the best by `metric` is then run on the
+    following out-of-sample block, which starts from cash. Window x parameter-chunk
+    jobs fan out over a process pool whose workers map the price arrays from
+    shared memory; a window's out-of-sample run is queued as soon as its last
+    in-sample chunk is in. Results are stored in walkforward_results per
+    (strategy hash, window), so a rerun only computes windows it has not seen.
+    """
+
+    def _load_cached(self, strategy_hash: str) -> Dict[Tuple[date, date], Dict[str, Any]]:
+        rows = db_manager.execute_query("SELECT * FROM walkforward_results WHERE strategy_hash = ?", [strategy_hash])
+        return {(r["is_start"], r["oos_end"]): r for r in rows}
+
+    def _store(self, strategy_hash: str, name: str, n_candidates: int, rows: List[Dict[str, Any]]):
+        columns = ["strategy_hash", "is_start", "is_end", "oos_start", "oos_end", "strategy",
+                   "params", "is_stats", "oos_stats", "oos_returns", "candidates"]
+        db_manager.bulk_insert(
+            "walkforward_results",
+            columns,
+            [
+                [strategy_hash, r["is_start"], r["is_end"], r["oos_start"], r["oos_end"], name,
+                 json.dumps(r["params"]), json.dumps(r["is_stats"]), json.dumps(r["oos_stats"]),
+                 r["oos_returns"], n_candidates]
+                for r in rows
+            ],
+            on_conflict=(
+                "ON CONFLICT (strategy_hash, is_start, oos_end) DO UPDATE SET is_end = EXCLUDED.is_end, "
+                "oos_start = EXCLUDED.oos_start, params = EXCLUDED.params, is_stats = EXCLUDED.is_stats, "
+                "oos_stats = EXCLUDED.oos_stats, oos_returns = EXCLUDED.oos_returns, "
+                "candidates = EXCLUDED.candidates, computed_at = now()"
+            ),
+        )
+
+    def _compute(
+        self, name: str, candidates: List[Dict[str, Any]], windows: List[Window], panel: PricePanel,
+        config: BacktestConfig, metric: str,
+    ) -> List[Dict[str, Any]]:
+        workers = settings.WALKFORWARD_MAX_WORKERS or os.cpu_count() or 1
+        # Enough chunks for several jobs per worker, each stack within WALKFORWARD_CHUNK_MB
+        # (signals plus the simulator's working copies, ~4x)
+        longest = max(split - lo for lo, split, _ in windows)
+        budget = max(1, settings.WALKFORWARD_CHUNK_MB * 2 ** 20 // max(longest * panel.returns.shape[1] * 8 * 4, 1))
+        per_window = math.ceil(workers * 4 / len(windows))
+        chunk = max(1, min(budget, math.ceil(len(candidates) / per_window)))
+        chunks = [(i, candidates[i:i + chunk]) for i in range(0, len(candidates), chunk)]
+
+        is_stats: List[List[Optional[Dict[str, float]]]] = [[None] * len(candidates) for _ in windows]
+        remaining = [len(chunks)] * len(windows)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(windows)
+        # Fork so workers inherit the loaded modules instead of re-importing them (and re-opening the database)
+        context = multiprocessing.get_context("fork")
+        with _shared_arrays(_inputs(panel)) as specs, ProcessPoolExecutor(
+            max_workers=min(workers, len(windows) * len(chunks)), mp_context=context,
+            initializer=_attach, initargs=(specs,),
+        ) as pool:
+            pending = {
+                pool.submit(_evaluate, name, part, lo, split, config): ("is", w, offset)
+                for w, (lo, split, _) in enumerate(windows)
+                for offset, part in chunks
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase, w, offset = pending.pop(future)
+                    stats, oos_returns = future.result()
+                    lo, split, hi = windows[w]
+                    if phase == "oos":
+                        best = results[w]["best"]
+                        results[w] = {
+                            "is_start": panel.dates[lo], "is_end": panel.dates[split - 1],
+                            "oos_start": panel.dates[split], "oos_end": panel.dates[hi - 1],
+                            "params": candidates[best], "is_stats": is_stats[w][best],
+                            "oos_stats": stats[0], "oos_returns": oos_returns,
+                        }
+                        continue
+                    is_stats[w][offset:offset + len(stats)] = stats
+                    remaining[w] -= 1
+                    if not remaining[w]:
+                        scores = np.array([s[metric] for s in is_stats[w]])
+                        best = int(np.argmax(np.where(np.isfinite(scores), scores, -np.inf)))
+                        results[w] = {"best": best}
+                        pending[pool.submit(_evaluate, name, [candidates[best]], split, hi, config, True)] = ("oos", w, 0)
+        return results
+
+    def optimize(self, strategy: Dict, rebuild: bool = False) -> Dict:
+        """
+        Walk-forward optimise a strategy spec:
+            name            key of STRATEGIES (default "momentum")
+            params          {param: [values]} overriding the strategy's default space
+            search          "grid" (default) or "random" with `samples` and `seed`
+            in_sample_days, out_sample_days, anchored
+            metric          in-sample objective, one of METRICS (default "sharpe")
+            start, end, symbols, capital, execution_lag, max_participation
+        """
+        started = time.monotonic()
+        name = strategy.get("name", "momentum")
+        if name not in STRATEGIES:
+            return {"error": f"unknown strategy {name!r}", "strategies": sorted(STRATEGIES)}
+        overrides = strategy.get("params") or {}
+        unknown = set(overrides) - set(STRATEGIES[name].space)
+        if unknown:
+            return {"error": f"unknown parameters {sorted(unknown)} for {name}"}
+        metric = strategy.get("metric", "sharpe")
+        if metric not in METRICS:
+            return {"error": f"metric must be one of {list(METRICS)}"}
+        search = strategy.get("search", "grid")
+        candidates = _candidates(
+            {**STRATEGIES[name].space, **overrides}, search, int(strategy.get("samples", 100)), int(strategy.get("seed", 0))
+        )
+        if not candidates:
+            return {"error": "empty parameter space"}
+        in_sample = int(strategy.get("in_sample_days", 504))
+        out_sample = int(strategy.get("out_sample_days", 126))
+        anchored = bool(strategy.get("anchored", False))
+        config = BacktestConfig(
+            capital=float(strategy.get("capital", 1e7)),
+            execution_lag=int(strategy.get("execution_lag", 1)),
+            max_participation=float(strategy.get("max_participation", 0.1)),
+        )
+
+        bounds = db_manager.execute_query("SELECT MIN(date) AS first, MAX(date) AS last FROM daily_bars")[0]
+        if bounds["last"] is None:
+            return {"error": "no daily bars"}
+        start = date.fromisoformat(strategy["start"]) if strategy.get("start") else bounds["first"]
+        end = date.fromisoformat(strategy["end"]) if strategy.get("end") else bounds["last"]
+        symbols = sorted(strategy["symbols"]) if strategy.get("symbols") else None
+        panel = load_panel(start, end, symbols)
+        windows = _windows(len(panel.dates), in_sample, out_sample, anchored)
+        if not windows:
+            return {"error": f"{len(panel.dates)} trading days is less than one {in_sample}+{out_sample} day window"}
+
+        # Everything that changes a window's result except the window itself
+        strategy_hash = hashlib.sha1(json.dumps({
+            "name": name, "candidates": candidates, "in_sample_days": in_sample, "out_sample_days": out_sample,
+            "anchored": anchored, "metric": metric, "start": start, "symbols": symbols, "config": asdict(config),
+        }, sort_keys=True, default=str).encode()).hexdigest()
+        cached = {} if rebuild else self._load_cached(strategy_hash)
+        todo = [w for w in windows if (panel.dates[w[0]], panel.dates[w[2] - 1]) not in cached]
+        if todo:
+            computed = self._compute(name, candidates, todo, panel, config, metric)
+            self._store(strategy_hash, name, len(candidates), computed)
+            cached.update({(r["is_start"], r["oos_end"]): r for r in computed})
+
+        rows = []
+        for lo, _, hi in windows:
+            r = cached[(panel.dates[lo], panel.dates[hi - 1])]
+            rows.append({k: json.loads(v) if isinstance(v, str) else v for k, v in r.items()
+                         if k in ("is_start", "is_end", "oos_start", "oos_end", "params", "is_stats", "oos_stats", "oos_returns")})
+        oos = _stitched(np.concatenate([r["oos_returns"] for r in rows]), config.capital)
+        logger.info(
+            f"Walk-forward {name} [{strategy_hash[:10]}] | windows={len(windows)} computed={len(todo)} "
+            f"candidates={len(candidates)} in {time.monotonic() - started:.1f}s"
+        )
+        return {
+            "strategy": name,
+            "strategy_hash": strategy_hash,
+            "search": search,
+            "metric": metric,
+            "candidates": len(candidates),
+            "computed_windows": len(todo),
+            "cached_windows": len(windows) - len(todo),
+            "win_rate": float(np.mean([r["oos_stats"]["total_return"] > 0 for r in rows])),
+            "max_drawdown": oos["max_drawdown"],
+            "out_of_sample": oos,
+            "windows": [{k: v for k, v in r.items() if k != "oos_returns"} for r in rows],
+        }
@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,6 +11,10 @@ class Settings(BaseSettings):
     DATABASE_MEMORY: bool = False  # <--- Added this line
 
     AUTO_REFRESH_INTERVAL: int = 15
+    MARKET_EDGE_REFRESH_INTERVAL: int = 120  # pre-open / post-close polling, seconds
+    MARKET_TIMEZONE: str = "Asia/Kolkata"
+    MARKET_EXTRA_HOLIDAYS: str = ""  # comma-separated ISO dates, e.g. "2026-03-04,2026-08-28"
+    MARKET_EXTRA_SESSIONS: str = ""  # special sessions (IST), e.g. "2026-11-08 18:00-19:00" for Muhurat trading
     MANUAL_REFRESH_ENABLED: bool = True
     DATA_STALENESS_THRESHOLD: int = 300
     NSE_BASE_URL: str = "https://www.nseindia.com"
@@ -30,6 +35,45 @@ class Settings(BaseSettings):
     LOG_FILE: str = "logs/elite_stock.log"
     RATE_LIMIT_PER_MINUTE: int = 60
     SCHEDULER_ENABLED: bool = True
+    SCHEDULER_IN_API: bool = True  # set False when running the standalone ingestion worker
+    SCHEDULER_LOCK_PATH: str = "data/scheduler.lock"
+    INGEST_QUEUE_PATH: str = "data/ingest_queue.db"
+    INGEST_QUEUE_VISIBILITY_TIMEOUT: int = 120  # seconds before an unacked batch is redelivered
+    INGEST_DRAIN_INTERVAL: int = 5  # seconds
+    QUOTE_BUFFER_MAX_ROWS: int = 2000
+    QUOTE_BUFFER_MAX_AGE_SECONDS: float = 5.0
+    QUOTE_DEDUP_MODE: str = "skip"  # off | skip (advance last row's last_seen_at) | rle (also count repeat_count)
+    DQ_ENABLED: bool = True
+    DQ_SAMPLE_PERCENT: float = 100.0  # sample rate for the join/group-by quality checks
+    DQ_MAX_NULL_RATE: float = 0.2
+    DQ_MAX_SPREAD_PCT: float = 2.0
+    RECON_LOOKBACK_SECONDS: int = 86400  # only the recent quotes are scanned for latest snapshots
+    RECON_MAX_SPREAD_BPS: float = 100.0
+    RECON_MAX_STALENESS_SECONDS: int = 120
+    PORTFOLIO_PRICE_SYNC_SECONDS: float = 5.0  # max price staleness of portfolio analytics reads
+    RISK_WINDOW_DAYS: int = 250  # trading days of returns in the shared covariance
+    RISK_MIN_OBSERVATIONS: int = 60
+    RISK_CHECK_SECONDS: int = 600  # how often reads check daily_bars for a new day
+    FUND_OVERLAP_WEIGHT_STEP: float = 0.001  # weight quantum (10 bp) for the all-funds overlap matrix
+    # Returns-based style analysis: style name -> index_history series
+    STYLE_FACTORS: Dict[str, str] = {
+        "value": "NIFTY500 VALUE 50",
+        "growth": "NIFTY GROWTH SECTORS 15",
+        "momentum": "NIFTY200 MOMENTUM 30",
+        "quality": "NIFTY200 QUALITY 30",
+        "low_volatility": "NIFTY100 LOW VOLATILITY 30",
+    }
+    STYLE_WINDOW_DAYS: int = 252  # trading days per regression window
+    STYLE_STEP_DAYS: int = 21  # windows end every ~month
+    STYLE_MIN_COVERAGE: float = 0.8  # share of window days a fund needs NAV returns for
+    INDEX_HISTORY_BACKFILL_DAYS: int = 1100  # first fetch of a factor/market index series
+    IPO_VELOCITY_WINDOW_MINUTES: int = 60  # subscription velocity lookback
+    IPO_TRACKER_SYNC_SECONDS: float = 5.0  # how often non-ingesting processes pull new snapshots
+    EVENT_STUDY_MARKET_INDEX: str = "NIFTY 500"  # index_history series; equal-weighted universe if missing
+    EVENT_STUDY_MIN_ESTIMATION_DAYS: int = 120  # of the 220-day [-250, -31] market-model window
+    PIT_CACHE_CHECK_SECONDS: int = 60  # how often the point-in-time universe cache checks for new versions
+    WALKFORWARD_MAX_WORKERS: int = 0  # optimizer worker processes; 0 = one per core
+    WALKFORWARD_CHUNK_MB: int = 64  # signal stack size per optimizer job, bounds worker memory
     DATA_REFRESH_CRON: str = "*/15 * * * * *"
     HEALTH_CHECK_CRON: str = "*/30 * * * * *"
     USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
@@ -43,6 +87,7 @@ NSE_ENDPOINTS = {
     "equity_master": "/api/master-quote",
     "option_chain": "/api/option-chain-indices?symbol=NIFTY",
     "equity_info": "/api/quote-equity?symbol=",
+    "index_history": "/api/historical/indicesHistory",
     "market_data": "/api/marketData",
 }
 
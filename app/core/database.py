@@ -1,6 +1,7 @@
 import duckdb
 import os
-from typing import Optional, Dict, Any, List
+import threading
+from typing import Optional, Dict, Any, List, Callable, Sequence
 from contextlib import contextmanager
 from loguru import logger
 from app.core.config import settings
@@ -8,42 +9,60 @@ import atexit
 
 
 class DuckDBManager:
+    """
+    The process's single DuckDB connection.
+
+    DuckDB allows one read-write process per database file, so exactly one process
+    (the API) owns it and every write goes through that process; the ingestion
+    worker only fetches into the ingest queue. The connection is opened on first
+    use, so processes that import the data layer without querying it (the worker)
+    never touch the file.
+
+    The connection is shared by every thread (scheduler jobs run in a pool), so all
+    access is serialised by a re-entrant lock held for the whole of each statement
+    or transaction; statements issued inside `transaction()` re-enter it.
+    """
+
     def __init__(self):
         self.connection: Optional[duckdb.DuckDBPyConnection] = None
         self.database_path = settings.DATABASE_PATH
-        self._initialize_database()
+        self._shutdown_hooks: List[Callable[[], Any]] = []
+        self._connect_lock = threading.Lock()
+        self._lock = threading.RLock()
         atexit.register(self.close)
 
     def _initialize_database(self):
         try:
-            os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
-            logger.debug(f"Database path resolved to: {self.database_path}")
-
             if settings.DATABASE_MEMORY:
                 self.connection = duckdb.connect(":memory:")
                 logger.info("Connected to in-memory DuckDB database")
             else:
-                # Safety check: If file exists but is invalid, delete and recreate
-                if os.path.exists(self.database_path):
-                    try:
-                        test_conn = duckdb.connect(self.database_path)
-                        test_conn.close()
-                    except duckdb.IOException:
-                        logger.warning(f"Invalid DuckDB file detected at {self.database_path}. Deleting and recreating.")
-                        os.remove(self.database_path)
-
-                self.connection = duckdb.connect(self.database_path)
+                os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+                logger.debug(f"Database path resolved to: {self.database_path}")
+                try:
+                    self.connection = duckdb.connect(self.database_path)
+                except duckdb.IOException as e:
+                    # Most often another process holds the file's write lock; never delete it
+                    logger.error(
+                        f"Cannot open {self.database_path} (is another process using it? "
+                        f"only one API process may own the database): {e}"
+                    )
+                    raise
                 logger.info(f"Connected to DuckDB database at {self.database_path}")
 
+            self._rekey_stocks()
             self._create_schema()
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
             raise
 
     def _create_schema(self):
         schema_sql = """
         CREATE TABLE IF NOT EXISTS stocks (
-            symbol VARCHAR PRIMARY KEY,
+            symbol VARCHAR NOT NULL,
             name VARCHAR NOT NULL,
             exchange VARCHAR NOT NULL,
             sector VARCHAR,
@@ -54,10 +73,15 @@ class DuckDBManager:
             listing_date DATE,
             face_value DECIMAL(10,2),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol, exchange)
         );
+        -- One row per symbol for symbol-level readers: the NSE listing, else the other venue's
+        CREATE OR REPLACE VIEW primary_stocks AS
+            SELECT * FROM stocks
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY exchange = 'NSE' DESC, exchange) = 1;
         CREATE TABLE IF NOT EXISTS quotes (
-            id INTEGER PRIMARY KEY,
+            id BIGINT PRIMARY KEY,
             symbol VARCHAR NOT NULL,
             exchange VARCHAR NOT NULL,
             price DECIMAL(10,2) NOT NULL,
@@ -75,7 +99,10 @@ class DuckDBManager:
             delivery_percent DECIMAL(5,2),
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             data_source VARCHAR DEFAULT 'API',
-            FOREIGN KEY (symbol) REFERENCES stocks(symbol)
+            last_seen_at TIMESTAMP,
+            repeat_count INTEGER DEFAULT 0,
+            sec_id INTEGER,
+            FOREIGN KEY (symbol, exchange) REFERENCES stocks(symbol, exchange)
         );
         CREATE TABLE IF NOT EXISTS gold_rates (
             id INTEGER PRIMARY KEY,
@@ -91,6 +118,7 @@ class DuckDBManager:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(date, city, purity)
         );
+        CREATE SEQUENCE IF NOT EXISTS data_quality_log_id_seq;
         CREATE TABLE IF NOT EXISTS data_quality_log (
             id INTEGER PRIMARY KEY,
             source VARCHAR NOT NULL,
@@ -113,10 +141,338 @@ class DuckDBManager:
             symbol VARCHAR NOT NULL,
             added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             notes TEXT,
-            FOREIGN KEY (symbol) REFERENCES stocks(symbol)
+            sec_id INTEGER
+        );
+        CREATE SEQUENCE IF NOT EXISTS sec_id_seq;
+        CREATE TABLE IF NOT EXISTS securities (
+            sec_id INTEGER PRIMARY KEY DEFAULT nextval('sec_id_seq'),
+            isin VARCHAR UNIQUE,
+            name VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS security_aliases (
+            sec_id INTEGER NOT NULL,
+            exchange VARCHAR NOT NULL,
+            symbol VARCHAR NOT NULL,
+            valid_from DATE NOT NULL,
+            valid_to DATE,
+            PRIMARY KEY (exchange, symbol, valid_from)
         );
+        CREATE SEQUENCE IF NOT EXISTS corporate_actions_id_seq;
+        CREATE TABLE IF NOT EXISTS corporate_actions (
+            id INTEGER PRIMARY KEY DEFAULT nextval('corporate_actions_id_seq'),
+            sec_id INTEGER,
+            symbol VARCHAR NOT NULL,
+            type VARCHAR NOT NULL,
+            date DATE,
+            ex_date DATE,
+            record_date DATE,
+            amount DECIMAL(12,4),
+            ratio_numerator DOUBLE,
+            ratio_denominator DOUBLE,
+            impact_fund_score DOUBLE,
+            impact_tech_score DOUBLE,
+            event_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS daily_bars (
+            sec_id INTEGER NOT NULL,
+            exchange VARCHAR NOT NULL,
+            date DATE NOT NULL,
+            symbol VARCHAR NOT NULL,
+            open DOUBLE,
+            high DOUBLE,
+            low DOUBLE,
+            close DOUBLE NOT NULL,
+            volume BIGINT,
+            PRIMARY KEY (sec_id, exchange, date)
+        );
+        -- One bar per symbol and day for readers: the NSE listing's bar, else the other venue's
+        CREATE OR REPLACE VIEW primary_daily_bars AS
+            SELECT * FROM daily_bars
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol, date ORDER BY exchange = 'NSE' DESC, exchange) = 1;
+        CREATE TABLE IF NOT EXISTS adjustment_factors (
+            sec_id INTEGER NOT NULL,
+            ex_date DATE NOT NULL,
+            split_factor DOUBLE NOT NULL,
+            dividend_factor DOUBLE NOT NULL,
+            cum_split_factor DOUBLE NOT NULL,
+            cum_total_factor DOUBLE NOT NULL,
+            PRIMARY KEY (sec_id, ex_date)
+        );
+        CREATE TABLE IF NOT EXISTS catalyst_cards (
+            event_id INTEGER PRIMARY KEY,
+            sec_id INTEGER,
+            symbol VARCHAR NOT NULL,
+            event_type VARCHAR NOT NULL,
+            event_date DATE,
+            score_fund DOUBLE,
+            score_tech DOUBLE,
+            impact_prob DOUBLE,
+            recommendation VARCHAR,
+            last_price DOUBLE,
+            change_percent DOUBLE,
+            delivery_percent DOUBLE,
+            ret_20d DOUBLE,
+            price_at TIMESTAMP,
+            generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE SEQUENCE IF NOT EXISTS portfolio_id_seq;
+        CREATE TABLE IF NOT EXISTS portfolio (
+            id INTEGER PRIMARY KEY DEFAULT nextval('portfolio_id_seq'),
+            user_id VARCHAR NOT NULL,
+            symbol VARCHAR NOT NULL,
+            sec_id INTEGER,
+            quantity DOUBLE NOT NULL,
+            avg_price DOUBLE NOT NULL,
+            added_at DATE DEFAULT CURRENT_DATE
+        );
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            snapshot_date DATE NOT NULL,
+            user_id VARCHAR NOT NULL,
+            total_value DOUBLE,
+            total_cost DOUBLE,
+            unrealized_pnl DOUBLE,
+            holdings_count INTEGER,
+            xirr DOUBLE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (snapshot_date, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS holding_snapshots (
+            snapshot_date DATE NOT NULL,
+            holding_id INTEGER NOT NULL,
+            user_id VARCHAR NOT NULL,
+            symbol VARCHAR NOT NULL,
+            price DOUBLE,
+            current_value DOUBLE,
+            xirr DOUBLE,
+            PRIMARY KEY (snapshot_date, holding_id)
+        );
+        CREATE TABLE IF NOT EXISTS mutual_funds (
+            fid INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            amc VARCHAR,
+            category VARCHAR,
+            isin_growth VARCHAR,
+            isin_reinvest VARCHAR,
+            nav DOUBLE,
+            nav_date DATE,
+            expense_ratio DOUBLE,
+            aum DOUBLE,
+            benchmark VARCHAR,
+            symbol VARCHAR,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS etfs (
+            fid INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            amc VARCHAR,
+            category VARCHAR,
+            isin_growth VARCHAR,
+            isin_reinvest VARCHAR,
+            nav DOUBLE,
+            nav_date DATE,
+            expense_ratio DOUBLE,
+            aum DOUBLE,
+            benchmark VARCHAR,
+            symbol VARCHAR,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS nav_history (
+            fid INTEGER NOT NULL,
+            date DATE NOT NULL,
+            nav DOUBLE NOT NULL,
+            PRIMARY KEY (fid, date)
+        );
+        CREATE TABLE IF NOT EXISTS index_history (
+            index_name VARCHAR NOT NULL,
+            date DATE NOT NULL,
+            value DOUBLE NOT NULL,
+            PRIMARY KEY (index_name, date)
+        );
+        CREATE TABLE IF NOT EXISTS fund_metrics (
+            fid INTEGER PRIMARY KEY,
+            kind VARCHAR NOT NULL,
+            name VARCHAR,
+            category VARCHAR,
+            as_of DATE,
+            nav DOUBLE,
+            ret_1m DOUBLE,
+            ret_3m DOUBLE,
+            ret_1y DOUBLE,
+            cagr_3y DOUBLE,
+            volatility_1y DOUBLE,
+            max_drawdown_1y DOUBLE,
+            tracking_error_1y DOUBLE,
+            liquidity DOUBLE,
+            expense_ratio DOUBLE,
+            aum DOUBLE,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS fund_holdings (
+            fid INTEGER NOT NULL,
+            disclosure_date DATE NOT NULL,
+            isin VARCHAR NOT NULL,
+            security_name VARCHAR,
+            weight DOUBLE NOT NULL,
+            PRIMARY KEY (fid, disclosure_date, isin)
+        );
+        CREATE TABLE IF NOT EXISTS fund_style_weights (
+            fid INTEGER NOT NULL,
+            window_end DATE NOT NULL,
+            window_start DATE NOT NULL,
+            factor VARCHAR NOT NULL,
+            weight DOUBLE NOT NULL,
+            r_squared DOUBLE,
+            observations INTEGER,
+            PRIMARY KEY (fid, window_end, factor)
+        );
+        CREATE TABLE IF NOT EXISTS upcoming_ipos (
+            symbol VARCHAR PRIMARY KEY,
+            company_name VARCHAR,
+            sector VARCHAR,
+            open_date DATE,
+            close_date DATE,
+            listing_date DATE,
+            price_band_low DOUBLE,
+            price_band_high DOUBLE,
+            lot_size INTEGER,
+            issue_size_cr DOUBLE,
+            eps DOUBLE,
+            pe_ratio DOUBLE,
+            sector_pe DOUBLE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS ipo_subscriptions (
+            symbol VARCHAR PRIMARY KEY,
+            subscription DOUBLE,
+            qib DOUBLE,
+            nii DOUBLE,
+            retail DOUBLE,
+            gmp DOUBLE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS listing_prices (
+            symbol VARCHAR PRIMARY KEY,
+            listing_date DATE,
+            issue_price DOUBLE,
+            listing_price DOUBLE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS ipo_subscription_snapshots (
+            symbol VARCHAR NOT NULL,
+            captured_at TIMESTAMP NOT NULL,
+            qib DOUBLE,
+            nii DOUBLE,
+            retail DOUBLE,
+            employee DOUBLE,
+            total DOUBLE,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol, captured_at)
+        );
+        CREATE TABLE IF NOT EXISTS event_study_stats (
+            event_type VARCHAR NOT NULL,
+            sector VARCHAR NOT NULL,
+            cap_bucket VARCHAR NOT NULL,
+            n_events INTEGER NOT NULL,
+            mean_car DOUBLE,
+            median_car DOUBLE,
+            std_car DOUBLE,
+            hit_rate DOUBLE,
+            t_stat DOUBLE,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (event_type, sector, cap_bucket)
+        );
+        CREATE TABLE IF NOT EXISTS event_car (
+            event_id BIGINT PRIMARY KEY,
+            symbol VARCHAR NOT NULL,
+            event_type VARCHAR NOT NULL,
+            event_date DATE NOT NULL,
+            car DOUBLE,
+            car_pre DOUBLE,
+            car_post DOUBLE,
+            alpha DOUBLE,
+            beta DOUBLE,
+            estimation_days INTEGER,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS universe_membership (
+            symbol VARCHAR NOT NULL,
+            valid_from DATE NOT NULL,
+            valid_to DATE,
+            name VARCHAR,
+            exchange VARCHAR,
+            sector VARCHAR,
+            industry VARCHAR,
+            isin VARCHAR,
+            segment VARCHAR,
+            listing_date DATE,
+            PRIMARY KEY (symbol, valid_from)
+        );
+        CREATE TABLE IF NOT EXISTS exchange_reconciliation (
+            company VARCHAR PRIMARY KEY,
+            isin VARCHAR,
+            nse_symbol VARCHAR,
+            bse_symbol VARCHAR,
+            nse_price DOUBLE,
+            bse_price DOUBLE,
+            nse_volume BIGINT,
+            bse_volume BIGINT,
+            nse_timestamp TIMESTAMP,
+            bse_timestamp TIMESTAMP,
+            best_bid DOUBLE,
+            best_ask DOUBLE,
+            staleness_gap_seconds DOUBLE,
+            spread DOUBLE,
+            spread_bps DOUBLE,
+            best_exchange VARCHAR,
+            best_price DOUBLE,
+            stale BOOLEAN,
+            divergent BOOLEAN,
+            reconciled_at TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS walkforward_results (
+            strategy_hash VARCHAR NOT NULL,
+            is_start DATE NOT NULL,
+            is_end DATE NOT NULL,
+            oos_start DATE NOT NULL,
+            oos_end DATE NOT NULL,
+            strategy VARCHAR,
+            params JSON,
+            is_stats JSON,
+            oos_stats JSON,
+            oos_returns DOUBLE[],
+            candidates INTEGER,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (strategy_hash, is_start, oos_end)
+        );
+        ALTER TABLE quotes ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP;
+        ALTER TABLE quotes ADD COLUMN IF NOT EXISTS repeat_count INTEGER DEFAULT 0;
+        ALTER TABLE quotes ADD COLUMN IF NOT EXISTS sec_id INTEGER;
+        ALTER TABLE watchlist ADD COLUMN IF NOT EXISTS sec_id INTEGER;
+        ALTER TABLE corporate_actions ADD COLUMN IF NOT EXISTS sec_id INTEGER;
+        ALTER TABLE corporate_actions ADD COLUMN IF NOT EXISTS event_date DATE;
+        ALTER TABLE corporate_actions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+        UPDATE corporate_actions SET updated_at = created_at WHERE updated_at IS NULL;
+        ALTER TABLE portfolio_snapshots ADD COLUMN IF NOT EXISTS xirr DOUBLE;
+        ALTER TABLE event_study_stats ADD COLUMN IF NOT EXISTS mean_car_pre DOUBLE;
+        ALTER TABLE event_study_stats ADD COLUMN IF NOT EXISTS mean_car_post DOUBLE;
+        UPDATE corporate_actions SET event_date = CASE WHEN type IN ('AGM', 'EGM') THEN COALESCE(date, ex_date) ELSE COALESCE(ex_date, date) END WHERE event_date IS NULL;
         CREATE INDEX IF NOT EXISTS idx_quotes_symbol_timestamp ON quotes(symbol, timestamp DESC);
         CREATE INDEX IF NOT EXISTS idx_quotes_timestamp ON quotes(timestamp DESC);
+        CREATE INDEX IF NOT EXISTS idx_quotes_sec_id_timestamp ON quotes(sec_id, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS idx_security_aliases_sec_id ON security_aliases(sec_id);
+        CREATE INDEX IF NOT EXISTS idx_watchlist_sec_id ON watchlist(sec_id);
+        CREATE INDEX IF NOT EXISTS idx_corporate_actions_sec_id ON corporate_actions(sec_id, ex_date);
+        CREATE INDEX IF NOT EXISTS idx_corporate_actions_event_date ON corporate_actions(event_date, type);
+        CREATE INDEX IF NOT EXISTS idx_catalyst_cards_event_date ON catalyst_cards(event_date);
+        CREATE INDEX IF NOT EXISTS idx_portfolio_user_id ON portfolio(user_id);
+        CREATE INDEX IF NOT EXISTS idx_fund_metrics_kind_category ON fund_metrics(kind, category);
+        CREATE INDEX IF NOT EXISTS idx_fund_holdings_isin ON fund_holdings(isin);
+        CREATE INDEX IF NOT EXISTS idx_ipo_snapshots_ingested_at ON ipo_subscription_snapshots(ingested_at);
+        CREATE INDEX IF NOT EXISTS idx_universe_membership_valid ON universe_membership(valid_from, valid_to);
+        CREATE INDEX IF NOT EXISTS idx_daily_bars_sec_id_date ON daily_bars(sec_id, date);
         CREATE INDEX IF NOT EXISTS idx_stocks_exchange ON stocks(exchange);
         CREATE INDEX IF NOT EXISTS idx_stocks_sector ON stocks(sector);
         CREATE INDEX IF NOT EXISTS idx_gold_rates_date ON gold_rates(date DESC);
@@ -131,13 +487,59 @@ class DuckDBManager:
             logger.error(f"Failed to create database schema: {e}")
             raise
 
-    @contextmanager
-    def get_connection(self):
+    def _rekey_stocks(self):
+        """
+        Move a database created with `stocks` keyed on symbol alone to the
+        (symbol, exchange) key, before the schema is (re)applied. quotes and watchlist
+        reference stocks, so all three are copied aside, recreated and reloaded;
+        listings seen only in quotes get their own stocks row (same company
+        attributes, their exchange).
+        """
+        key = self.connection.execute(
+            "SELECT constraint_column_names FROM duckdb_constraints() "
+            "WHERE table_name = 'stocks' AND constraint_type = 'PRIMARY KEY'"
+        ).fetchone()
+        if key is None or list(key[0]) != ["symbol"]:
+            return
+        tables = ("watchlist", "quotes", "stocks")  # dependents first
+        conn = self.connection
+        conn.execute("BEGIN TRANSACTION")
         try:
-            yield self.connection
-        except Exception as e:
-            logger.error(f"Database operation failed: {e}")
+            for table in tables:
+                conn.execute(f"CREATE TEMP TABLE rekey_{table} AS SELECT * FROM {table}")
+            for table in tables:
+                conn.execute(f"DROP TABLE {table}")
+            self._create_schema()
+            conn.execute("INSERT INTO stocks BY NAME SELECT * FROM rekey_stocks")
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO stocks BY NAME
+                SELECT DISTINCT ON (q.symbol, q.exchange) s.* REPLACE (q.exchange AS exchange)
+                FROM rekey_quotes q JOIN rekey_stocks s ON s.symbol = q.symbol
+                """
+            )
+            for table in ("quotes", "watchlist"):
+                conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM rekey_{table}")
+            for table in tables:
+                conn.execute(f"DROP TABLE rekey_{table}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
             raise
+        logger.info("Re-keyed stocks on (symbol, exchange)")
+
+    @contextmanager
+    def get_connection(self):
+        if self.connection is None:
+            with self._connect_lock:
+                if self.connection is None:
+                    self._initialize_database()
+        with self._lock:
+            try:
+                yield self.connection
+            except Exception as e:
+                logger.error(f"Database operation failed: {e}")
+                raise
 
     def execute_query(self, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
         try:
@@ -159,10 +561,64 @@ class DuckDBManager:
             logger.error(f"Insert execution failed: {query[:100]}... Error: {e}")
             raise
 
+    @contextmanager
+    def transaction(self):
+        with self.get_connection() as conn:
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def bulk_insert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[Sequence[Any]],
+        on_conflict: str = "",
+        chunk_size: int = 50000,
+    ) -> int:
+        """
+        Insert many rows in one statement per chunk by binding each column as a list
+        and UNNESTing them side by side (columnar; no per-row round trips).
+        `on_conflict` is appended verbatim, e.g. "ON CONFLICT (symbol) DO NOTHING".
+        """
+        if not rows:
+            return 0
+        query = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"SELECT {', '.join(['UNNEST(?)'] * len(columns))} {on_conflict}"
+        )
+        total = 0
+        try:
+            with self.get_connection() as conn:
+                for i in range(0, len(rows), chunk_size):
+                    chunk = rows[i:i + chunk_size]
+                    conn.execute(query, [list(col) for col in zip(*chunk)])
+                    total += len(chunk)
+            return total
+        except Exception as e:
+            logger.error(f"Bulk insert into {table} failed ({len(rows)} rows): {e}")
+            raise
+
+    def register_shutdown_hook(self, hook: Callable[[], Any]):
+        """Run `hook` (e.g. a write-buffer flush) before the connection is closed at exit."""
+        self._shutdown_hooks.append(hook)
+
     def close(self):
-        if self.connection:
-            self.connection.close()
-            logger.info("Database connection closed")
+        for hook in self._shutdown_hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"Shutdown hook {getattr(hook, '__qualname__', hook)} failed: {e}")
+        self._shutdown_hooks = []
+        with self._lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+                logger.info("Database connection closed")
 
 
 db_manager = DuckDBManager()
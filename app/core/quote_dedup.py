@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+# Fields that define "the quote changed"; timestamp/data_source are deliberately excluded
+FINGERPRINT_FIELDS = [
+    "price", "change_amount", "change_percent", "volume", "value",
+    "high", "low", "open", "close", "bid", "ask", "delivery_qty", "delivery_percent",
+]
+
+
+class DedupMode:
+    OFF = "off"
+    SKIP = "skip"   # drop quotes identical to the latest stored snapshot, advancing only its last_seen_at
+    RLE = "rle"     # as skip, and also count the repeats (repeat_count)
+
+
+def _fingerprint(row: Dict[str, Any]) -> Tuple:
+    # Prices are stored as DECIMAL(10,2); compare at storage precision to ignore float noise
+    return tuple(
+        round(v, 2) if isinstance(v, float) else v
+        for v in (row.get(f) for f in FINGERPRINT_FIELDS)
+    )
+
+
+class QuoteDeduplicator:
+    """
+    Change-only filter for the quote write path.
+
+    Keeps the fingerprint and id of the latest stored quote per (symbol, exchange),
+    seeded once from the database, and passes through only rows that differ.
+    Unchanged rows become extensions of the latest stored row: its last_seen_at
+    always advances (freshness checks read it, so quiet symbols are not stale),
+    and in RLE mode its repeat_count also grows.
+    """
+
+    def __init__(self, mode: str = None):
+        self.mode = (mode or settings.QUOTE_DEDUP_MODE).lower()
+        self._lock = threading.Lock()
+        self._latest: Dict[Tuple[str, str], Tuple[Tuple, int]] = {}
+        self._seeded = False
+        self.rows_seen = 0
+        self.rows_skipped = 0
+
+    def _seed(self):
+        try:
+            rows = db_manager.execute_query(
+                f"""
+                SELECT id, symbol, exchange, {", ".join(FINGERPRINT_FIELDS)}
+                FROM quotes
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol, exchange ORDER BY timestamp DESC, id DESC) = 1
+                """
+            )
+        except Exception as e:
+            logger.warning(f"Quote dedup snapshot seed failed; starting empty: {e}")
+            rows = []
+        for r in rows:
+            stored = {f: float(r[f]) if isinstance(r[f], Decimal) else r[f] for f in FINGERPRINT_FIELDS}
+            self._latest[(r["symbol"], r["exchange"])] = (_fingerprint(stored), r["id"])
+        self._seeded = True
+        logger.info(f"Quote dedup snapshot seeded with {len(rows)} keys (mode={self.mode})")
+
+    def filter(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[int, Tuple[Any, int]]]:
+        """
+        Split rows (which must already carry their 'id') into rows to store and
+        run extensions {latest_row_id: (last_seen_at, repeats)}; repeats are 0 in skip mode.
+        """
+        if self.mode == DedupMode.OFF:
+            return rows, {}
+        changed: List[Dict[str, Any]] = []
+        extensions: Dict[int, Tuple[Any, int]] = {}
+        with self._lock:
+            if not self._seeded:
+                self._seed()
+            for row in rows:
+                key = (row["symbol"], row["exchange"])
+                fp = _fingerprint(row)
+                latest: Optional[Tuple[Tuple, int]] = self._latest.get(key)
+                if latest is not None and latest[0] == fp:
+                    self.rows_skipped += 1
+                    _, repeats = extensions.get(latest[1], (None, 0))
+                    step = 1 if self.mode == DedupMode.RLE else 0
+                    extensions[latest[1]] = (row.get("timestamp") or datetime.now(), repeats + step)
+                    continue
+                self._latest[key] = (fp, row["id"])
+                changed.append(row)
+            self.rows_seen += len(rows)
+        return changed, extensions
+
+    def forget(self, rows: Iterable[Dict[str, Any]]):
+        """Drop the snapshot of rows that were never stored, so their next quote is not skipped."""
+        with self._lock:
+            for row in rows:
+                key = (row["symbol"], row["exchange"])
+                latest = self._latest.get(key)
+                if latest is not None and latest[1] == row.get("id"):
+                    del self._latest[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "keys": len(self._latest),
+            "rows_seen": self.rows_seen,
+            "rows_skipped": self.rows_skipped,
+        }
@@ -0,0 +1,274 @@
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+from app.core.database import db_manager
+
+Listing = Tuple[str, str]  # (exchange, symbol)
+
+
+class SecurityMaster:
+    """
+    ISIN-based security identity with dense integer sec_ids.
+
+    `securities` holds one row per instrument (ISIN may be unknown at first, for
+    listings seen only through quotes); `security_aliases` maps (exchange, symbol)
+    listings onto sec_ids with valid_from/valid_to history, so NSE and BSE tickers
+    never collide and renames keep the same sec_id. Until a listing's ISIN is
+    known it pairs by symbol with a listing on the other exchange, and the first
+    ISIN seen for either links them; a listing whose ISIN turns out to differ is
+    split off onto its own security. Open listings are held in an in-memory
+    bidirectional lookup, loaded once.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_listing: Dict[Listing, int] = {}
+        self._listings_by_id: Dict[int, List[Listing]] = {}
+        self._id_by_isin: Dict[str, int] = {}
+        self._isin_by_id: Dict[int, Optional[str]] = {}
+        self._id_by_symbol: Dict[str, int] = {}  # security an unlinked listing of this symbol pairs with
+        self.loaded = False
+
+    # ---------- lookup ----------
+
+    def load(self):
+        rows = db_manager.execute_query(
+            """
+            SELECT s.sec_id, s.isin, a.exchange, a.symbol
+            FROM securities s
+            LEFT JOIN security_aliases a ON a.sec_id = s.sec_id AND a.valid_to IS NULL
+            ORDER BY s.isin NULLS LAST, s.sec_id
+            """
+        )
+        by_listing, listings_by_id, id_by_isin, isin_by_id, id_by_symbol = {}, {}, {}, {}, {}
+        for r in rows:
+            isin_by_id[r["sec_id"]] = r["isin"]
+            if r["isin"]:
+                id_by_isin[r["isin"]] = r["sec_id"]
+            if r["symbol"] is not None:
+                listing = (r["exchange"], r["symbol"])
+                by_listing[listing] = r["sec_id"]
+                listings_by_id.setdefault(r["sec_id"], []).append(listing)
+                id_by_symbol.setdefault(r["symbol"], r["sec_id"])  # ISIN-linked securities first
+        with self._lock:
+            self._by_listing, self._listings_by_id = by_listing, listings_by_id
+            self._id_by_isin, self._isin_by_id = id_by_isin, isin_by_id
+            self._id_by_symbol = id_by_symbol
+            self.loaded = True
+        logger.info(f"Security master loaded | securities={len(isin_by_id)} listings={len(by_listing)}")
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def resolve(self, symbol: str, exchange: str) -> Optional[int]:
+        self._ensure_loaded()
+        return self._by_listing.get((exchange, symbol))
+
+    def sec_id_for_isin(self, isin: str) -> Optional[int]:
+        self._ensure_loaded()
+        return self._id_by_isin.get(isin)
+
+    def isin(self, sec_id: int) -> Optional[str]:
+        self._ensure_loaded()
+        return self._isin_by_id.get(sec_id)
+
+    def listings(self, sec_id: int) -> List[Listing]:
+        self._ensure_loaded()
+        return list(self._listings_by_id.get(sec_id, []))
+
+    # ---------- registration ----------
+
+    def _new_ids(self, n: int) -> List[int]:
+        if not n:
+            return []
+        return [r["sec_id"] for r in db_manager.execute_query("SELECT nextval('sec_id_seq') AS sec_id FROM range(?)", [n])]
+
+    def register_listings(self, listings: Iterable[Tuple[str, str, Optional[str]]]) -> Dict[Listing, int]:
+        """
+        Resolve (symbol, exchange, isin) triples to sec_ids, creating securities and
+        aliases in bulk for any listing not seen before. Listings sharing an ISIN
+        share a sec_id; a listing without one pairs with the security of the same
+        symbol, if any. An ISIN on an already registered, unlinked listing links it.
+        Runs inside the caller's transaction, if any. Returns the mapping for every
+        requested listing.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            result: Dict[Listing, int] = {}
+            pending: Dict[Listing, Optional[str]] = {}
+            for symbol, exchange, isin in listings:
+                listing = (exchange, symbol)
+                sec_id = self._by_listing.get(listing)
+                if sec_id is None:
+                    pending[listing] = pending.get(listing) or isin or None
+                elif isin and self._isin_by_id.get(sec_id) != isin:
+                    result[listing] = self._link(symbol, exchange, isin, sec_id)
+                else:
+                    result[listing] = sec_id
+            if not pending:
+                return result
+
+            # Unknown ISINs: adopt an unlinked security of the same symbol, else allocate
+            adopted: Dict[str, int] = {}
+            new_isins: List[str] = []
+            for (_, symbol), isin in pending.items():
+                if not isin or isin in self._id_by_isin or isin in adopted or isin in new_isins:
+                    continue
+                candidate = self._id_by_symbol.get(symbol)
+                if candidate is not None and self._isin_by_id.get(candidate) is None and candidate not in adopted.values():
+                    adopted[isin] = candidate
+                else:
+                    new_isins.append(isin)
+            isin_ids = dict(zip(new_isins, self._new_ids(len(new_isins))))
+            isin_ids.update(adopted)
+
+            by_symbol: Dict[str, int] = {}
+            for (_, symbol), isin in pending.items():
+                if isin:
+                    by_symbol.setdefault(symbol, isin_ids.get(isin) or self._id_by_isin[isin])
+            unlinked = sorted({
+                symbol for (_, symbol), isin in pending.items()
+                if not isin and symbol not in self._id_by_symbol and symbol not in by_symbol
+            })
+            provisional_ids = dict(zip(unlinked, self._new_ids(len(unlinked))))
+
+            db_manager.bulk_insert(
+                "securities", ["sec_id", "isin"],
+                [[isin_ids[i], i] for i in new_isins] + [[sid, None] for sid in provisional_ids.values()],
+            )
+            if adopted:
+                db_manager.execute_insert(
+                    "UPDATE securities SET isin = u.isin FROM (SELECT UNNEST(?) AS sec_id, UNNEST(?) AS isin) u "
+                    "WHERE securities.sec_id = u.sec_id",
+                    [list(adopted.values()), list(adopted)],
+                )
+            aliases = []
+            for (exchange, symbol), isin in pending.items():
+                if isin:
+                    sec_id = isin_ids.get(isin) or self._id_by_isin[isin]
+                else:
+                    sec_id = self._id_by_symbol.get(symbol) or by_symbol.get(symbol) or provisional_ids[symbol]
+                aliases.append([sec_id, exchange, symbol, date.today()])
+                result[(exchange, symbol)] = sec_id
+            db_manager.bulk_insert("security_aliases", ["sec_id", "exchange", "symbol", "valid_from"], aliases)
+
+            for isin, sec_id in isin_ids.items():
+                self._id_by_isin[isin] = sec_id
+                self._isin_by_id[sec_id] = isin
+            for sec_id in provisional_ids.values():
+                self._isin_by_id[sec_id] = None
+            for sec_id, exchange, symbol, _ in aliases:
+                self._by_listing[(exchange, symbol)] = sec_id
+                self._listings_by_id.setdefault(sec_id, []).append((exchange, symbol))
+                self._id_by_symbol.setdefault(symbol, sec_id)
+            n_new = len(new_isins) + len(provisional_ids)
+            logger.info(f"Registered {len(aliases)} listings ({n_new} new securities, {len(adopted)} linked by symbol)")
+            return result
+
+    def rename(self, exchange: str, old_symbol: str, new_symbol: str, effective: Optional[date] = None):
+        """Close the old alias and open a new one on the same sec_id (symbol history is kept)."""
+        effective = effective or date.today()
+        sec_id = self.resolve(old_symbol, exchange)
+        if sec_id is None:
+            raise KeyError(f"Unknown listing {exchange}:{old_symbol}")
+        with self._lock, db_manager.transaction():
+            db_manager.execute_insert(
+                "UPDATE security_aliases SET valid_to = ? WHERE exchange = ? AND symbol = ? AND valid_to IS NULL",
+                [effective, exchange, old_symbol],
+            )
+            db_manager.execute_insert(
+                "INSERT INTO security_aliases (sec_id, exchange, symbol, valid_from) VALUES (?, ?, ?, ?)",
+                [sec_id, exchange, new_symbol, effective],
+            )
+            del self._by_listing[(exchange, old_symbol)]
+            self._by_listing[(exchange, new_symbol)] = sec_id
+            self._id_by_symbol.setdefault(new_symbol, sec_id)
+            listings = self._listings_by_id.setdefault(sec_id, [])
+            listings[:] = [l for l in listings if l != (exchange, old_symbol)] + [(exchange, new_symbol)]
+
+    def _link(self, symbol: str, exchange: str, isin: str, sec_id: int) -> int:
+        """Attach an ISIN to a registered listing; caller holds the lock and any transaction."""
+        current = self._isin_by_id.get(sec_id)
+        target = self._id_by_isin.get(isin)
+        if target is None and current is None:
+            # Provisional security takes the ISIN, together with any listing paired to it by symbol
+            db_manager.execute_insert("UPDATE securities SET isin = ? WHERE sec_id = ?", [isin, sec_id])
+            self._id_by_isin[isin] = sec_id
+            self._isin_by_id[sec_id] = isin
+            return sec_id
+        if target is None:
+            # Paired by symbol with a different instrument: split this listing off
+            target = self._new_ids(1)[0]
+            db_manager.execute_insert("INSERT INTO securities (sec_id, isin) VALUES (?, ?)", [target, isin])
+            self._id_by_isin[isin] = target
+            self._isin_by_id[target] = isin
+        db_manager.execute_insert(
+            "UPDATE security_aliases SET sec_id = ? WHERE exchange = ? AND symbol = ? AND valid_to IS NULL",
+            [target, exchange, symbol],
+        )
+        for table in ("quotes", "daily_bars"):
+            db_manager.execute_insert(
+                f"UPDATE {table} SET sec_id = ? WHERE sec_id = ? AND exchange = ? AND symbol = ?",
+                [target, sec_id, exchange, symbol],
+            )
+        if exchange == "NSE":  # corporate actions are keyed to the NSE listing
+            db_manager.execute_insert(
+                "UPDATE corporate_actions SET sec_id = ?, updated_at = now() WHERE sec_id = ? AND symbol = ?",
+                [target, sec_id, symbol],
+            )
+        remaining = [l for l in self._listings_by_id.get(sec_id, []) if l != (exchange, symbol)]
+        if not remaining:
+            db_manager.execute_insert("UPDATE watchlist SET sec_id = ? WHERE sec_id = ?", [target, sec_id])
+            self._listings_by_id.pop(sec_id, None)
+        else:
+            self._listings_by_id[sec_id] = remaining
+        self._by_listing[(exchange, symbol)] = target
+        self._listings_by_id.setdefault(target, []).append((exchange, symbol))
+        self._id_by_symbol[symbol] = target
+        return target
+
+    def link_isin(self, symbol: str, exchange: str, isin: str) -> int:
+        """
+        Attach an ISIN to a listing. A provisional security simply takes the ISIN;
+        if the ISIN already belongs to another security, the listing (and its
+        quotes, bars and corporate actions) is re-pointed to that sec_id.
+        """
+        sec_id = self.resolve(symbol, exchange)
+        if sec_id is None:
+            return self.register_listings([(symbol, exchange, isin)])[(exchange, symbol)]
+        with self._lock:
+            if self._isin_by_id.get(sec_id) == isin:
+                return sec_id
+            with db_manager.transaction():
+                return self._link(symbol, exchange, isin, sec_id)
+
+    # ---------- startup sync ----------
+
+    def sync_from_stocks(self) -> int:
+        """Register every stocks row, then backfill sec_id on rows written before the master existed."""
+        stocks = db_manager.execute_query("SELECT symbol, exchange, isin FROM stocks")
+        self.register_listings((r["symbol"], r["exchange"], r["isin"]) for r in stocks)
+        for table in ("quotes", "corporate_actions"):
+            db_manager.execute_insert(
+                f"""
+                UPDATE {table} SET sec_id = a.sec_id
+                FROM security_aliases a
+                WHERE {table}.sec_id IS NULL AND a.valid_to IS NULL
+                  AND a.symbol = {table}.symbol AND a.exchange = {'quotes.exchange' if table == 'quotes' else "'NSE'"}
+                """
+            )
+        # Watchlist rows carry no exchange; any open alias of the symbol identifies the security
+        db_manager.execute_insert(
+            """
+            UPDATE watchlist SET sec_id = a.sec_id
+            FROM (SELECT symbol, MIN(sec_id) AS sec_id FROM security_aliases WHERE valid_to IS NULL GROUP BY symbol) a
+            WHERE watchlist.sec_id IS NULL AND a.symbol = watchlist.symbol
+            """
+        )
+        logger.info(f"Security master synced from {len(stocks)} stocks rows")
+        return len(stocks)
+
+
+security_master = SecurityMaster()
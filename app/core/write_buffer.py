@@ -0,0 +1,269 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.quote_dedup import QuoteDeduplicator
+from app.core.security_master import security_master
+from app.validation.quote_batch import validate_quote_batch
+
+QUOTE_COLUMNS = [
+    "symbol", "exchange", "price", "change_amount", "change_percent", "volume", "value",
+    "high", "low", "open", "close", "bid", "ask", "delivery_qty", "delivery_percent",
+    "timestamp", "data_source", "sec_id",
+]
+
+
+class QuoteWriteBuffer:
+    """
+    In-memory staging buffer for quote writes.
+
+    Incoming rows are first validated as one columnar batch (validate_quote_batch);
+    rejected rows are counted and dropped.
+    Rows accumulate until QUOTE_BUFFER_MAX_ROWS is reached or the oldest row is
+    older than QUOTE_BUFFER_MAX_AGE_SECONDS, then are flushed in one transaction:
+    a bulk stocks upsert (FK safety, same semantics as _ensure_stock_row) followed
+    by a bulk quotes insert. Rows identical to the latest stored quote for their
+    (symbol, exchange) are dropped by the dedup stage and only advance the latest
+    row's last_seen_at (and, in RLE mode, its repeat_count). Each row is stamped with its integer
+    sec_id from the security master at flush time. Callers may attach a token (e.g. an
+    ingest queue batch id) to each add(); flush listeners receive the tokens once
+    their rows are durable, and a token that is already staged (a redelivered
+    batch) is not staged twice.
+
+    If a flush fails while the database is reachable, the batch is bisected into
+    separately committed halves until the rejected rows are isolated; those go to
+    the dead-letter listeners and the rest is written, so one bad row cannot
+    block the buffer. If the database itself is unreachable, rows stay staged.
+    """
+
+    def __init__(self, max_rows: int = None, max_age_seconds: float = None, deduplicator: QuoteDeduplicator = None):
+        self.max_rows = max_rows or settings.QUOTE_BUFFER_MAX_ROWS
+        self.max_age_seconds = max_age_seconds or settings.QUOTE_BUFFER_MAX_AGE_SECONDS
+        self._lock = threading.RLock()
+        self.deduplicator = deduplicator or QuoteDeduplicator()
+        self._rows: List[Dict[str, Any]] = []
+        self._run_updates: Dict[int, List[Any]] = {}
+        self._tokens: List[Hashable] = []
+        self._staged_tokens: Set[Hashable] = set()
+        self._oldest_at: Optional[float] = None
+        self._last_id = 0
+        self._listeners: List[Callable[[List[Hashable]], Any]] = []
+        self._batch_listeners: List[Callable[[int, int], Any]] = []
+        self._dead_letter_listeners: List[Callable[[List[Dict[str, Any]], str], Any]] = []
+        self.rows_rejected = 0
+        self.rows_dead_lettered = 0
+        self.rejects_by_check: Dict[str, int] = {}
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.last_flush_latency_ms: Optional[float] = None
+        self.max_flush_latency_ms = 0.0
+        self.last_flush_at: Optional[float] = None
+
+    def add_flush_listener(self, listener: Callable[[List[Hashable]], Any]):
+        self._listeners.append(listener)
+
+    def add_batch_listener(self, listener: Callable[[int, int], Any]):
+        """Called with (min_id, max_id) of the quote rows written by each flush."""
+        self._batch_listeners.append(listener)
+
+    def add_dead_letter_listener(self, listener: Callable[[List[Dict[str, Any]], str], Any]):
+        """Called with (rows, error) for rows the database rejected on their own."""
+        self._dead_letter_listeners.append(listener)
+
+    def add(self, rows: List[Dict[str, Any]], token: Hashable = None) -> int:
+        """
+        Validate, dedup and stage rows; flushes synchronously if the size threshold
+        is hit. Returns the number of rows accepted for storage.
+        """
+        accepted = 0
+        with self._lock:
+            if token is not None and token in self._staged_tokens:
+                return 0  # redelivered while the original is still staged
+            if rows:
+                rows = self._validate(rows)
+            if rows:
+                rows = [dict(row, id=pk) for pk, row in zip(self._next_ids(len(rows)), rows)]
+                rows, extensions = self.deduplicator.filter(rows)
+                for row_id, (last_seen_at, repeats) in extensions.items():
+                    pending = self._run_updates.setdefault(row_id, [last_seen_at, 0])
+                    pending[0] = last_seen_at
+                    pending[1] += repeats
+                if (rows or extensions) and self._oldest_at is None:
+                    self._oldest_at = time.monotonic()
+                self._rows.extend(rows)
+                accepted = len(rows)
+            if token is not None:
+                self._tokens.append(token)
+                self._staged_tokens.add(token)
+            if len(self._rows) >= self.max_rows:
+                self.flush()
+        return accepted
+
+    def _validate(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = validate_quote_batch(rows)
+        if not result.rejected:
+            return rows
+        self.rows_rejected += result.rejected
+        for check, count in result.counts().items():
+            self.rejects_by_check[check] = self.rejects_by_check.get(check, 0) + count
+        logger.warning(f"Rejected {result.rejected}/{len(rows)} quotes in batch validation: {result.counts()}")
+        return [row for row, rejected in zip(rows, result.reject) if not rejected]
+
+    def flush_if_due(self) -> int:
+        with self._lock:
+            if self._oldest_at is None:
+                if self._tokens:
+                    return self.flush()
+                return 0
+            if time.monotonic() - self._oldest_at >= self.max_age_seconds:
+                return self.flush()
+        return 0
+
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        # One stocks row per listing; a later row's ISIN fills a missing one
+        stocks: Dict[Tuple[str, str], List[Any]] = {}
+        for row in rows:
+            listing = (row["symbol"], row["exchange"])
+            if listing not in stocks:
+                stocks[listing] = [row["symbol"], row.get("name") or row["symbol"], row["exchange"], row.get("isin")]
+            elif stocks[listing][3] is None:
+                stocks[listing][3] = row.get("isin")
+        db_manager.bulk_insert(
+            "stocks", ["symbol", "name", "exchange", "isin"], list(stocks.values()),
+            on_conflict="ON CONFLICT (symbol, exchange) DO UPDATE SET isin = COALESCE(stocks.isin, EXCLUDED.isin)",
+        )
+        sec_ids = security_master.register_listings(
+            (row["symbol"], row["exchange"], row.get("isin")) for row in rows
+        )
+        for row in rows:
+            row["sec_id"] = sec_ids[(row["exchange"], row["symbol"])]
+        db_manager.bulk_insert("quotes", ["id", *QUOTE_COLUMNS], [[row["id"], *[row.get(c) for c in QUOTE_COLUMNS]] for row in rows])
+
+    def _extend_runs(self, run_updates: Dict[int, List[Any]]):
+        ids = list(run_updates)
+        db_manager.execute_insert(
+            """
+            UPDATE quotes SET
+                last_seen_at = u.last_seen_at,
+                repeat_count = COALESCE(quotes.repeat_count, 0) + u.repeats
+            FROM (
+                SELECT UNNEST(?) AS id, CAST(UNNEST(?) AS TIMESTAMP) AS last_seen_at, UNNEST(?) AS repeats
+            ) u
+            WHERE quotes.id = u.id
+            """,
+            [ids, [run_updates[i][0] for i in ids], [run_updates[i][1] for i in ids]],
+        )
+
+    def _next_ids(self, n: int) -> List[int]:
+        # Monotonic time-based ids; a plain time.time_ns() // 1000 collides inside a batch
+        base = max(time.time_ns() // 1000, self._last_id + 1)
+        self._last_id = base + n - 1
+        return list(range(base, base + n))
+
+    def _write_isolating(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+        """Write rows in bisected transactions; returns (written, [(rejected row, error)])."""
+        try:
+            with db_manager.transaction():
+                self._write_rows(rows)
+            return rows, []
+        except Exception as e:
+            if len(rows) == 1:
+                return [], [(rows[0], str(e))]
+        mid = len(rows) // 2
+        written_a, rejected_a = self._write_isolating(rows[:mid])
+        written_b, rejected_b = self._write_isolating(rows[mid:])
+        return written_a + written_b, rejected_a + rejected_b
+
+    def _recover(self, rows: List[Dict[str, Any]], run_updates: Dict[int, List[Any]], error: Exception) -> List[Dict[str, Any]]:
+        """Failed flush: keep everything staged if the database is down, else isolate the bad rows."""
+        try:
+            db_manager.execute_query("SELECT 1")
+        except Exception:
+            logger.error(f"Quote buffer flush failed ({len(rows)} rows kept staged): {error}")
+            raise error
+        logger.warning(f"Quote buffer flush failed ({len(rows)} rows); isolating rejected rows: {error}")
+        # The rolled-back transaction may have registered listings in memory only
+        security_master.load()
+        written, rejected = self._write_isolating(rows) if rows else ([], [])
+        if run_updates:
+            try:
+                with db_manager.transaction():
+                    self._extend_runs(run_updates)
+            except Exception as e:
+                logger.error(f"Dropped {len(run_updates)} quote run extensions: {e}")
+        if rejected:
+            self.rows_dead_lettered += len(rejected)
+            self.deduplicator.forget(row for row, _ in rejected)
+            logger.error(f"Dead-lettered {len(rejected)}/{len(rows)} quotes, e.g. {rejected[0][1]}")
+            for listener in self._dead_letter_listeners:
+                try:
+                    listener([row for row, _ in rejected], rejected[0][1])
+                except Exception as e:
+                    logger.error(f"Quote buffer dead-letter listener failed: {e}")
+        return written
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, tokens, run_updates = self._rows, self._tokens, self._run_updates
+            if not rows and not tokens and not run_updates:
+                return 0
+            started = time.perf_counter()
+            try:
+                with db_manager.transaction():
+                    if rows:
+                        self._write_rows(rows)
+                    if run_updates:
+                        self._extend_runs(run_updates)
+            except Exception as e:
+                self.flush_errors += 1
+                rows = self._recover(rows, run_updates, e)
+
+            self._rows, self._tokens, self._run_updates, self._oldest_at = [], [], {}, None
+            self._staged_tokens = set()
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.rows_flushed += len(rows)
+            self.last_flush_latency_ms = round(latency_ms, 3)
+            self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+            self.last_flush_at = time.time()
+        logger.debug(f"Flushed {len(rows)} quotes in {latency_ms:.1f} ms")
+
+        for listener in self._listeners:
+            try:
+                listener(tokens)
+            except Exception as e:
+                logger.error(f"Quote buffer flush listener failed: {e}")
+        if rows:
+            for listener in self._batch_listeners:
+                try:
+                    listener(rows[0]["id"], rows[-1]["id"])
+                except Exception as e:
+                    logger.error(f"Quote buffer batch listener failed: {e}")
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest_age = time.monotonic() - self._oldest_at if self._oldest_at is not None else 0.0
+            return {
+                "backlog_rows": len(self._rows),
+                "pending_run_extensions": len(self._run_updates),
+                "backlog_age_seconds": round(oldest_age, 3),
+                "flush_count": self.flush_count,
+                "rows_flushed": self.rows_flushed,
+                "flush_errors": self.flush_errors,
+                "last_flush_latency_ms": self.last_flush_latency_ms,
+                "max_flush_latency_ms": round(self.max_flush_latency_ms, 3),
+                "last_flush_at": self.last_flush_at,
+                "rows_rejected": self.rows_rejected,
+                "rows_dead_lettered": self.rows_dead_lettered,
+                "rejects_by_check": dict(self.rejects_by_check),
+                "dedup": self.deduplicator.get_stats(),
+            }
+
+
+quote_buffer = QuoteWriteBuffer()
+# Flush whatever is staged before DuckDBManager closes the connection at exit
+db_manager.register_shutdown_hook(quote_buffer.flush)
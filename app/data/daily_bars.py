@@ -0,0 +1,38 @@
+from datetime import date
+from typing import Optional
+from loguru import logger
+from app.core.database import db_manager
+
+# Intraday quote snapshots -> one OHLCV bar per listing (sec_id, exchange) per day,
+# so NSE and BSE prints are never mixed. Quote high/low are already the day's
+# running extremes; volume is the day's cumulative total, so the last snapshot's
+# value is the day's volume. Readers use the primary_daily_bars view.
+ROLLUP_SQL = """
+INSERT OR REPLACE INTO daily_bars (sec_id, exchange, date, symbol, open, high, low, close, volume)
+SELECT sec_id,
+       exchange,
+       CAST(timestamp AS DATE) AS date,
+       arg_max(symbol, timestamp),
+       CAST(COALESCE(arg_min(open, timestamp), arg_min(price, timestamp)) AS DOUBLE),
+       CAST(GREATEST(MAX(high), MAX(price)) AS DOUBLE),
+       CAST(LEAST(MIN(low), MIN(price)) AS DOUBLE),
+       CAST(arg_max(price, timestamp) AS DOUBLE),
+       arg_max(volume, timestamp)
+FROM quotes
+WHERE timestamp >= ? AND sec_id IS NOT NULL
+GROUP BY sec_id, exchange, CAST(timestamp AS DATE)
+"""
+
+
+def rollup_daily_bars(since: Optional[date] = None) -> int:
+    """
+    Roll quotes up into daily_bars from `since` (default: the latest bar date
+    already stored, so each run only re-rolls the current day). Returns the
+    number of bars now stored for the rolled-up range.
+    """
+    if since is None:
+        since = db_manager.execute_query("SELECT MAX(date) AS d FROM daily_bars")[0]["d"] or date(1970, 1, 1)
+    db_manager.execute_insert(ROLLUP_SQL, [since])
+    bars = db_manager.execute_query("SELECT COUNT(*) AS n FROM daily_bars WHERE date >= ?", [since])[0]["n"]
+    logger.info(f"Daily bars rolled up since {since}: {bars} bars")
+    return bars
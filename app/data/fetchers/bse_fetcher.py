@@ -6,7 +6,7 @@ from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_exponential
 from app.data.fetchers.base_fetcher import BaseFetcher
 from app.core.config import settings, BSE_ENDPOINTS
-from app.core.models import Quote, Exchange, DataSource
+from app.core.models import Exchange, DataSource
 
 class BSEFetcher(BaseFetcher):
     def __init__(self):
@@ -54,7 +54,7 @@ class BSEFetcher(BaseFetcher):
             logger.error(f"BSE universe fetch error: {e}")
             return []
 
-    async def fetch_equity_quote(self, symbol: str) -> Optional[Quote]:
+    async def fetch_equity_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
         Fetch live quote for individual stock symbol.
         Parsing of HTML response needed to extract actual values.
@@ -80,26 +80,26 @@ class BSEFetcher(BaseFetcher):
                 "data_source": DataSource.BSE_HTML,
                 "timestamp": datetime.now(),
             }
-            return Quote(**quote_data)
+            return quote_data
         except Exception as e:
             logger.error(f"BSE quote fetch error for {symbol}: {e}")
             return None
 
-    async def fetch_multiple_quotes(self, symbols: List[str]) -> List[Quote]:
+    async def fetch_multiple_quotes(self, symbols: List[str]) -> List[Dict[str, Any]]:
         """
         Fetch multiple quotes concurrently with limited concurrency.
         """
         if not symbols:
             return []
         semaphore = asyncio.Semaphore(5)
-        async def fetch(symbol: str) -> Optional[Quote]:
+        async def fetch(symbol: str) -> Optional[Dict[str, Any]]:
             async with semaphore:
                 await asyncio.sleep(0.1)
                 return await self.fetch_equity_quote(symbol)
         results = await asyncio.gather(*(fetch(s) for s in symbols), return_exceptions=True)
         quotes = []
         for result in results:
-            if isinstance(result, Quote):
+            if isinstance(result, dict):
                 quotes.append(result)
             else:
                 logger.error(f"Error fetching BSE quote: {result}")
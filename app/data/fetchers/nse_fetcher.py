@@ -1,17 +1,17 @@
 import httpx
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from bs4 import BeautifulSoup
 import json
 import re
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from loguru import logger
 
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.data.fetchers.base_fetcher import BaseFetcher
 from app.core.config import settings, NSE_ENDPOINTS
-from app.core.models import Quote, Exchange, DataSource
+from app.core.models import Exchange, DataSource
 
 
 class NSEFetcher(BaseFetcher):
@@ -77,7 +77,7 @@ class NSEFetcher(BaseFetcher):
             logger.error(f"NSE market status fetch error: {e}")
             return {}
 
-    async def fetch_equity_quote(self, symbol: str) -> Optional[Quote]:
+    async def fetch_equity_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
         endpoint = f"{NSE_ENDPOINTS['equity_info']}{symbol}"
         url = f"{self.base_url}{endpoint}"
         try:
@@ -91,7 +91,8 @@ class NSEFetcher(BaseFetcher):
                     data = response.json()
                     quote_data = self._parse_equity_quote(data, symbol)
                     if quote_data:
-                        return Quote(**quote_data)
+                        # Plain row; bounds are checked batch-wise in the write path
+                        return quote_data
                 else:
                     logger.warning(
                         f"NSE quote fetch failed for {symbol}: {response.status_code}"
@@ -108,6 +109,7 @@ class NSEFetcher(BaseFetcher):
             price_info = data.get("priceInfo", {})
             quote_data = {
                 "symbol": symbol,
+                "isin": info.get("isin") or None,
                 "exchange": Exchange.NSE,
                 "price": float(price_info.get("lastPrice", 0)),
                 "change_amount": float(price_info.get("change", 0)),
@@ -130,21 +132,49 @@ class NSEFetcher(BaseFetcher):
             logger.error(f"Error parsing NSE quote for {symbol}: {e}")
             return None
 
-    async def fetch_multiple_quotes(self, symbols: List[str]) -> List[Quote]:
+    async def fetch_index_history(self, index_name: str, start: date, end: date) -> List[Tuple[date, float]]:
+        """Daily closing levels of an NSE index, fetched in one-year chunks (the API's range limit)."""
+        url = f"{self.base_url}{NSE_ENDPOINTS['index_history']}"
+        levels: List[Tuple[date, float]] = []
+        if not self.session_cookies:
+            await self.initialize_session()
+        async with httpx.AsyncClient(timeout=30) as client:
+            chunk_start = start
+            while chunk_start <= end:
+                chunk_end = min(chunk_start + timedelta(days=364), end)
+                params = {
+                    "indexType": index_name,
+                    "from": chunk_start.strftime("%d-%m-%Y"),
+                    "to": chunk_end.strftime("%d-%m-%Y"),
+                }
+                response = await client.get(url, params=params, headers=self.headers, cookies=self.session_cookies)
+                if response.status_code != 200:
+                    logger.warning(f"NSE index history fetch failed for {index_name}: {response.status_code}")
+                    break
+                for record in response.json().get("data", {}).get("indexCloseOnlineRecords", []):
+                    try:
+                        day = datetime.strptime(record["EOD_TIMESTAMP"], "%d-%b-%Y").date()
+                        levels.append((day, float(record["EOD_CLOSE_INDEX_VAL"])))
+                    except (KeyError, ValueError, TypeError):
+                        continue
+                chunk_start = chunk_end + timedelta(days=1)
+        return levels
+
+    async def fetch_multiple_quotes(self, symbols: List[str]) -> List[Dict[str, Any]]:
         if not symbols:
             return []
         semaphore = asyncio.Semaphore(5)
 
-        async def fetch(symbol: str) -> Optional[Quote]:
+        async def fetch(symbol: str) -> Optional[Dict[str, Any]]:
             async with semaphore:
                 await asyncio.sleep(0.1)
                 return await self.fetch_equity_quote(symbol)
 
         tasks = [fetch(sym) for sym in symbols]
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        quotes: List[Quote] = []
+        quotes: List[Dict[str, Any]] = []
         for res in results:
-            if isinstance(res, Quote):
+            if isinstance(res, dict):
                 quotes.append(res)
             else:
                 logger.error(f"Error fetching quote: {res}")
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+# One pass over the recent quotes: latest snapshot per (symbol, exchange), keyed by
+# sec_id (falling back to symbol for rows not yet mapped), NSE and BSE sides
+# full-outer-joined per company, with divergence/staleness flags and the best price.
+# A snapshot's time is when it was last seen, since unchanged quotes only advance
+# last_seen_at of the stored row.
+RECONCILE_SQL = """
+WITH latest AS (
+    SELECT COALESCE(CAST(q.sec_id AS VARCHAR), q.symbol) AS company, sec.isin,
+           q.symbol, q.exchange, q.price, q.bid, q.ask, q.volume,
+           COALESCE(q.last_seen_at, q.timestamp) AS timestamp
+    FROM quotes q
+    LEFT JOIN securities sec ON sec.sec_id = q.sec_id
+    WHERE COALESCE(q.last_seen_at, q.timestamp) >= $since
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY q.symbol, q.exchange ORDER BY q.timestamp DESC, q.id DESC) = 1
+),
+nse AS (SELECT * FROM latest WHERE exchange = 'NSE'),
+bse AS (SELECT * FROM latest WHERE exchange = 'BSE'),
+paired AS (
+    SELECT COALESCE(n.company, b.company) AS company, COALESCE(n.isin, b.isin) AS isin,
+           n.symbol AS nse_symbol, b.symbol AS bse_symbol,
+           CAST(n.price AS DOUBLE) AS nse_price, CAST(b.price AS DOUBLE) AS bse_price,
+           n.volume AS nse_volume, b.volume AS bse_volume,
+           n.timestamp AS nse_timestamp, b.timestamp AS bse_timestamp,
+           CAST(GREATEST(n.bid, b.bid) AS DOUBLE) AS best_bid,
+           CAST(LEAST(n.ask, b.ask) AS DOUBLE) AS best_ask,
+           ABS(epoch(n.timestamp) - epoch(b.timestamp)) AS staleness_gap_seconds
+    FROM nse n
+    FULL OUTER JOIN bse b ON n.company = b.company
+),
+flagged AS (
+    SELECT *,
+           nse_price - bse_price AS spread,
+           (nse_price - bse_price) / LEAST(nse_price, bse_price) * 10000 AS spread_bps,
+           CASE
+               WHEN nse_price IS NULL THEN 'BSE'
+               WHEN bse_price IS NULL THEN 'NSE'
+               WHEN staleness_gap_seconds > $max_gap THEN CASE WHEN nse_timestamp >= bse_timestamp THEN 'NSE' ELSE 'BSE' END
+               WHEN COALESCE(bse_volume, 0) > COALESCE(nse_volume, 0) THEN 'BSE'
+               ELSE 'NSE'
+           END AS best_exchange,
+           COALESCE(nse_price IS NOT NULL AND bse_price IS NOT NULL AND staleness_gap_seconds > $max_gap, FALSE) AS stale
+    FROM paired
+)
+SELECT company, isin, nse_symbol, bse_symbol, nse_price, bse_price, nse_volume, bse_volume,
+       nse_timestamp, bse_timestamp, best_bid, best_ask, staleness_gap_seconds, spread, spread_bps,
+       best_exchange,
+       CASE WHEN best_exchange = 'NSE' THEN nse_price ELSE bse_price END AS best_price,
+       stale,
+       -- Only compare prices that were observed close together in time
+       COALESCE(NOT stale AND ABS(spread_bps) > $max_bps, FALSE) AS divergent,
+       $reconciled_at AS reconciled_at
+FROM flagged
+"""
+
+RESULT_COLUMNS = """
+company, isin, nse_symbol, bse_symbol, nse_price, bse_price, nse_volume, bse_volume,
+nse_timestamp, bse_timestamp, best_bid, best_ask, staleness_gap_seconds, spread, spread_bps,
+best_exchange, best_price, stale, divergent, reconciled_at
+"""
+
+
+class CrossExchangeReconciler:
+    """
+    Compares the latest NSE and BSE snapshots per security (sec_id) once per cycle.
+
+    Produces spreads (absolute and in bps), the timestamp gap between the two
+    sides, divergence/staleness flags and a best-price view (fresher side when the
+    quotes are far apart in time, otherwise the more liquid side). Each pass
+    replaces the exchange_reconciliation table in one transaction, so every
+    process serves the same, latest result whichever process reconciled.
+    """
+
+    def reconcile(self) -> Dict[str, Any]:
+        now = datetime.now()  # quotes carry the fetchers' local wall-clock time
+        params = {
+            "since": now - timedelta(seconds=settings.RECON_LOOKBACK_SECONDS),
+            "max_gap": settings.RECON_MAX_STALENESS_SECONDS,
+            "max_bps": settings.RECON_MAX_SPREAD_BPS,
+            "reconciled_at": now,
+        }
+        with db_manager.transaction():
+            db_manager.execute_insert("DELETE FROM exchange_reconciliation")
+            db_manager.execute_insert(
+                f"INSERT INTO exchange_reconciliation ({RESULT_COLUMNS}) {RECONCILE_SQL}", params
+            )
+        summary = db_manager.execute_query(
+            """
+            SELECT COUNT(*) AS companies,
+                   COUNT(*) FILTER (WHERE divergent) AS divergent,
+                   COUNT(*) FILTER (WHERE stale) AS stale
+            FROM exchange_reconciliation
+            """
+        )[0]
+        if summary["divergent"]:
+            logger.warning(f"Cross-exchange reconciliation flagged divergences: {summary}")
+        else:
+            logger.info(f"Cross-exchange reconciliation complete: {summary}")
+        return summary
+
+    @property
+    def last_run_at(self) -> Optional[datetime]:
+        return db_manager.execute_query("SELECT MAX(reconciled_at) AS t FROM exchange_reconciliation")[0]["t"]
+
+    def best_prices(self, symbols: List[str]) -> List[Dict[str, Any]]:
+        return db_manager.execute_query(
+            f"""
+            SELECT {RESULT_COLUMNS} FROM exchange_reconciliation
+            WHERE nse_symbol IN (SELECT UNNEST(?)) OR bse_symbol IN (SELECT UNNEST(?))
+            """,
+            [list(symbols), list(symbols)],
+        )
+
+    def divergences(self, include_stale: bool = False) -> List[Dict[str, Any]]:
+        return db_manager.execute_query(
+            f"""
+            SELECT {RESULT_COLUMNS} FROM exchange_reconciliation
+            WHERE divergent OR (? AND stale)
+            ORDER BY ABS(COALESCE(spread_bps, 0)) DESC
+            """,
+            [include_stale],
+        )
+
+    def is_suspect(self, symbol: str) -> bool:
+        """True when the symbol's latest NSE/BSE prices disagree beyond RECON_MAX_SPREAD_BPS."""
+        rows = db_manager.execute_query(
+            "SELECT divergent FROM exchange_reconciliation WHERE nse_symbol = ? OR bse_symbol = ? LIMIT 1",
+            [symbol, symbol],
+        )
+        return bool(rows and rows[0]["divergent"])
+
+
+reconciler = CrossExchangeReconciler()
@@ -0,0 +1,144 @@
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+from loguru import logger
+from app.core.database import db_manager
+from app.core.security_master import security_master
+
+# Per-action price multipliers (applied to closes *before* the ex-date):
+#   SPLIT  n:d (n new shares for d old) -> d / n
+#   BONUS  n:d (n bonus shares per d held) -> d / (n + d)
+#   DIVIDEND amount -> 1 - amount / previous close (total-return series only)
+# Cumulative factors are products over all actions with ex_date >= the row's,
+# so a bar dated t is adjusted by the first factor row with ex_date > t.
+FACTORS_SQL = """
+WITH actions AS (
+    SELECT a.sec_id, a.ex_date,
+           CASE a.type
+               WHEN 'SPLIT' THEN a.ratio_denominator / a.ratio_numerator
+               WHEN 'BONUS' THEN a.ratio_denominator / (a.ratio_numerator + a.ratio_denominator)
+               ELSE 1.0
+           END AS split_factor,
+           CASE WHEN a.type = 'DIVIDEND' AND b.close > a.amount
+                THEN 1.0 - CAST(a.amount AS DOUBLE) / b.close
+                ELSE 1.0
+           END AS dividend_factor
+    FROM corporate_actions a
+    ASOF LEFT JOIN primary_daily_bars b ON a.symbol = b.symbol AND a.ex_date > b.date
+    WHERE a.sec_id IS NOT NULL AND a.ex_date IS NOT NULL
+      AND a.type IN ('SPLIT', 'BONUS', 'DIVIDEND')
+      AND (a.type = 'DIVIDEND' OR (a.ratio_numerator > 0 AND a.ratio_denominator > 0))
+      {filter}
+),
+per_date AS (
+    SELECT sec_id, ex_date, product(split_factor) AS split_factor, product(dividend_factor) AS dividend_factor
+    FROM actions
+    GROUP BY sec_id, ex_date
+)
+SELECT sec_id, ex_date, split_factor, dividend_factor,
+       exp(SUM(ln(split_factor)) OVER w) AS cum_split_factor,
+       exp(SUM(ln(split_factor * dividend_factor)) OVER w) AS cum_total_factor
+FROM per_date
+WINDOW w AS (PARTITION BY sec_id ORDER BY ex_date DESC ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+"""
+
+SERIES_SQL = """
+SELECT b.symbol, b.date, b.close,
+       b.close * COALESCE(f.cum_split_factor, 1.0) AS adj_close,
+       b.close * COALESCE(f.cum_total_factor, 1.0) AS total_return_close,
+       b.volume / COALESCE(f.cum_split_factor, 1.0) AS adj_volume
+FROM primary_daily_bars b
+ASOF LEFT JOIN adjustment_factors f ON b.sec_id = f.sec_id AND b.date < f.ex_date
+WHERE b.symbol IN (SELECT UNNEST(?)) AND b.date BETWEEN ? AND ?
+ORDER BY b.symbol, b.date
+"""
+
+
+def _sec_id(symbol: str) -> Optional[int]:
+    return security_master.resolve(symbol, "NSE") or security_master.resolve(symbol, "BSE")
+
+
+class AdjustmentEngine:
+    """
+    Split/bonus (and dividend, for total-return series) adjusted daily closes.
+
+    Cumulative factors per security live in adjustment_factors and are rebuilt
+    per sec_id when an action is added, so reads are one as-of join of
+    daily_bars against a handful of factor rows instead of replaying actions.
+    Factors are keyed by sec_id, so an action adjusts both the NSE and BSE series.
+    """
+
+    def rebuild(self, sec_ids: Optional[Sequence[int]] = None) -> int:
+        """Recompute cumulative factors for the given securities (all when None)."""
+        params: List[Any] = []
+        filter_sql, delete_sql = "", "DELETE FROM adjustment_factors"
+        if sec_ids is not None:
+            if not sec_ids:
+                return 0
+            filter_sql = "AND a.sec_id IN (SELECT UNNEST(?))"
+            delete_sql += " WHERE sec_id IN (SELECT UNNEST(?))"
+            params = [list(sec_ids)]
+        with db_manager.transaction():
+            db_manager.execute_insert(delete_sql, params or None)
+            db_manager.execute_insert(
+                "INSERT INTO adjustment_factors (sec_id, ex_date, split_factor, dividend_factor, cum_split_factor, cum_total_factor) "
+                + FACTORS_SQL.format(filter=filter_sql),
+                params or None,
+            )
+        count = db_manager.execute_query(
+            "SELECT COUNT(*) AS n FROM adjustment_factors" + (" WHERE sec_id IN (SELECT UNNEST(?))" if params else ""),
+            params or None,
+        )[0]["n"]
+        logger.info(f"Adjustment factors rebuilt for {len(sec_ids) if sec_ids is not None else 'all'} securities: {count} rows")
+        return count
+
+    def add_action(self, action: Dict[str, Any]) -> int:
+        """Insert a corporate action and update only its security's factors. Returns the action id."""
+        symbol = action["symbol"]
+        action_type = action["type"].upper()
+        sec_id = action.get("sec_id") or _sec_id(symbol)
+        # Calendar date: the meeting date for AGM/EGM, otherwise the ex-date
+        if action_type in ("AGM", "EGM"):
+            event_date = action.get("date") or action.get("ex_date")
+        else:
+            event_date = action.get("ex_date") or action.get("date")
+        row = db_manager.execute_query(
+            """
+            INSERT INTO corporate_actions
+                (sec_id, symbol, type, date, ex_date, record_date, amount, ratio_numerator, ratio_denominator, event_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+            """,
+            [
+                sec_id, symbol, action_type, action.get("date"), action.get("ex_date"),
+                action.get("record_date"), action.get("amount"),
+                action.get("ratio_numerator"), action.get("ratio_denominator"), event_date,
+            ],
+        )[0]
+        if sec_id is not None:
+            self.rebuild([sec_id])
+        return row["id"]
+
+    def adjusted_series(
+        self, symbols: Sequence[str], start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Adjusted daily closes for many symbols in one query, ordered by symbol then date."""
+        return db_manager.execute_query(
+            SERIES_SQL, [list(symbols), start or date(1970, 1, 1), end or date.today()]
+        )
+
+    def factor_on(self, symbol: str, on: date, total_return: bool = False) -> float:
+        """Multiplier that converts a close dated `on` into today's basis."""
+        rows = db_manager.execute_query(
+            f"""
+            SELECT {'cum_total_factor' if total_return else 'cum_split_factor'} AS factor
+            FROM adjustment_factors
+            WHERE sec_id = ? AND ex_date > ?
+            ORDER BY ex_date
+            LIMIT 1
+            """,
+            [_sec_id(symbol), on],
+        )
+        return rows[0]["factor"] if rows else 1.0
+
+
+adjustment_engine = AdjustmentEngine()
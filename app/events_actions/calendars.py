@@ -1,15 +1,43 @@
-from typing import List, Dict
+from datetime import date, timedelta
+from typing import List, Dict, Optional, Sequence
 from app.core.database import db_manager
 
+EVENT_TYPES = ("DIVIDEND", "AGM", "EGM", "SPLIT", "BONUS", "RIGHTS", "BUYBACK")
+
+
 class CalendarService:
-    def get_dividends(self, days: int = 7) -> List[Dict]:
-        return db_manager.execute_query(
-            "SELECT symbol, amount, record_date, ex_date FROM corporate_actions "
-            "WHERE type='DIVIDEND' AND ex_date BETWEEN CURRENT_DATE AND DATE('now','+? days')", [days]
+    """Range queries over corporate_actions by event_date (ex-date, or meeting date for AGM/EGM)."""
+
+    def get_events(
+        self,
+        start: date,
+        end: date,
+        types: Optional[Sequence[str]] = None,
+        symbols: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        query = (
+            "SELECT id, symbol, type, event_date, ex_date, record_date, date, amount, "
+            "ratio_numerator, ratio_denominator FROM corporate_actions "
+            "WHERE event_date BETWEEN ? AND ?"
         )
+        params: list = [start, end]
+        if types:
+            query += " AND type IN (SELECT UNNEST(?))"
+            params.append([t.upper() for t in types])
+        if symbols is not None:
+            query += " AND symbol IN (SELECT UNNEST(?))"
+            params.append(list(symbols))
+        return db_manager.execute_query(query + " ORDER BY event_date, symbol", params)
+
+    def upcoming(self, days: int, types: Optional[Sequence[str]] = None) -> List[Dict]:
+        today = date.today()
+        return self.get_events(today, today + timedelta(days=days), types)
+
+    def get_dividends(self, days: int = 7) -> List[Dict]:
+        return [
+            {"symbol": e["symbol"], "amount": e["amount"], "record_date": e["record_date"], "ex_date": e["ex_date"]}
+            for e in self.upcoming(days, ["DIVIDEND"])
+        ]
 
     def get_agm(self, days: int = 7) -> List[Dict]:
-        return db_manager.execute_query(
-            "SELECT symbol, date AS agm_date FROM corporate_actions "
-            "WHERE type IN ('AGM','EGM') AND date BETWEEN CURRENT_DATE AND DATE('now','+? days')", [days]
-        )
+        return [{"symbol": e["symbol"], "agm_date": e["date"]} for e in self.upcoming(days, ["AGM", "EGM"])]
@@ -1,20 +1,113 @@
-from typing import Dict
+from typing import Dict, Optional, Sequence
+from loguru import logger
 from app.core.database import db_manager
+from app.scoring.event_study import study_match_sql
+
+# Upcoming actions joined with per-symbol features (latest quote, 20-day split-adjusted
+# momentum from daily_bars) and the empirical reaction of similar past actions from the
+# event study. A card is (re)generated when it is missing, when its action is newer than
+# the card or was edited, when a newer quote exists than the one it was scored on, or
+# when the event-study statistics were recomputed.
+REFRESH_SQL = """
+INSERT OR REPLACE INTO catalyst_cards
+WITH upcoming AS (
+    SELECT id, sec_id, symbol, type, event_date, impact_fund_score, impact_tech_score, created_at
+    FROM corporate_actions
+    WHERE event_date >= CURRENT_DATE {filter}
+),
+studied AS (""" + study_match_sql("SELECT *, type AS event_type FROM upcoming") + """),
+latest AS (
+    SELECT symbol, CAST(price AS DOUBLE) AS price, CAST(change_percent AS DOUBLE) AS change_percent,
+           CAST(delivery_percent AS DOUBLE) AS delivery_percent, timestamp
+    FROM quotes
+    WHERE symbol IN (SELECT symbol FROM upcoming)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC, id DESC) = 1
+),
+bars AS (
+    SELECT b.symbol, b.date, b.close * COALESCE(f.cum_split_factor, 1.0) AS adj_close
+    FROM primary_daily_bars b
+    ASOF LEFT JOIN adjustment_factors f ON b.sec_id = f.sec_id AND b.date < f.ex_date
+    WHERE b.date >= CURRENT_DATE - INTERVAL 30 DAY AND b.symbol IN (SELECT symbol FROM upcoming)
+),
+momentum AS (
+    SELECT symbol, arg_max(adj_close, date) / arg_min(adj_close, date) - 1 AS ret_20d
+    FROM bars GROUP BY symbol
+),
+scored AS (
+    SELECT u.id AS event_id, u.sec_id, u.symbol, u.type AS event_type, u.event_date,
+           COALESCE(u.impact_fund_score, u.study_fund_score) AS score_fund,
+           COALESCE(u.impact_tech_score, LEAST(100, GREATEST(0, 50 + m.ret_20d * 250)), 0) AS score_tech,
+           u.study_events, u.study_impact_prob,
+           l.price AS last_price, l.change_percent, l.delivery_percent, m.ret_20d,
+           l.timestamp AS price_at
+    FROM studied u
+    LEFT JOIN latest l ON l.symbol = u.symbol
+    LEFT JOIN momentum m ON m.symbol = u.symbol
+    LEFT JOIN catalyst_cards c ON c.event_id = u.id
+    WHERE c.event_id IS NULL
+       OR u.created_at > c.generated_at
+       OR c.event_date IS DISTINCT FROM u.event_date
+       OR c.score_fund IS DISTINCT FROM COALESCE(u.impact_fund_score, u.study_fund_score)
+       OR (u.impact_tech_score IS NOT NULL AND c.score_tech IS DISTINCT FROM u.impact_tech_score)
+       OR l.timestamp > COALESCE(c.price_at, TIMESTAMP '1970-01-01')
+       OR u.study_computed_at > c.generated_at
+),
+probs AS (
+    -- Empirical hit rate of similar past actions when there is one, else the blended score
+    SELECT *, CASE WHEN study_events > 0 THEN study_impact_prob
+                   ELSE LEAST(1.0, (score_fund + score_tech) / 200) END AS impact_prob
+    FROM scored
+)
+SELECT event_id, sec_id, symbol, event_type, event_date, score_fund, score_tech, impact_prob,
+       CASE WHEN impact_prob > 0.6 THEN 'BUY'
+            WHEN impact_prob > 0.4 THEN 'HOLD'
+            ELSE 'AVOID' END AS recommendation,
+       last_price, change_percent, delivery_percent, ret_20d, price_at,
+       CURRENT_TIMESTAMP AS generated_at
+FROM probs
+RETURNING event_id
+"""
+
+CARD_COLUMNS = """
+    symbol, event_type AS event, event_date, score_fund AS "scoreFund", score_tech AS "scoreTech",
+    impact_prob AS "impactProb", recommendation, last_price, ret_20d, event_id, generated_at
+"""
+
 
 class CatalystCardsService:
-    def generate_card(self, symbol: str, event_id: int) -> Dict:
-        event = db_manager.execute_query(
-            "SELECT * FROM corporate_actions WHERE id = ?", [event_id]
-        )[0]
-        fund = event.get('impact_fund_score', 0)
-        tech = event.get('impact_tech_score', 0)
-        prob = min(1.0, (fund + tech) / 200)
-        rec  = "BUY" if prob > 0.6 else "HOLD" if prob > 0.4 else "AVOID"
-        return {
-            "symbol": symbol,
-            "event": event['type'],
-            "scoreFund": fund,
-            "scoreTech": tech,
-            "impactProb": prob,
-            "recommendation": rec
-        }
+    """
+    Catalyst cards for every upcoming corporate action, precomputed in batch.
+
+    refresh() scores all stale cards in one set-based statement; reads page
+    through catalyst_cards without recomputing anything.
+    """
+
+    def refresh(self, event_ids: Optional[Sequence[int]] = None) -> int:
+        """(Re)generate stale cards, optionally only for the given events. Returns cards written."""
+        params = None
+        filter_sql = ""
+        if event_ids is not None:
+            filter_sql = "AND id IN (SELECT UNNEST(?))"
+            params = [list(event_ids)]
+        with db_manager.transaction():
+            db_manager.execute_insert("DELETE FROM catalyst_cards WHERE event_date < CURRENT_DATE")
+            written = len(db_manager.execute_query(REFRESH_SQL.format(filter=filter_sql), params))
+        if written:
+            logger.info(f"Catalyst cards refreshed: {written}")
+        return written
+
+    def get_cards(self, page: int = 1, page_size: int = 50) -> Dict:
+        total = db_manager.execute_query("SELECT COUNT(*) AS n FROM catalyst_cards")[0]["n"]
+        cards = db_manager.execute_query(
+            f"SELECT {CARD_COLUMNS} FROM catalyst_cards ORDER BY event_date, impact_prob DESC, event_id LIMIT ? OFFSET ?",
+            [page_size, (page - 1) * page_size],
+        )
+        return {"page": page, "page_size": page_size, "total": total, "cards": cards}
+
+    def generate_card(self, symbol: str, event_id: int) -> Optional[Dict]:
+        """Refresh and return one card; None when the action is missing or already past."""
+        self.refresh([event_id])
+        rows = db_manager.execute_query(f"SELECT {CARD_COLUMNS} FROM catalyst_cards WHERE event_id = ?", [event_id])
+        if not rows:
+            return None
+        return {**rows[0], "symbol": symbol}
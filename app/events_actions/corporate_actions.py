@@ -1,5 +1,8 @@
+from datetime import timedelta
 from typing import List, Dict
 from app.core.database import db_manager
+from app.events_actions.adjustments import adjustment_engine
+from app.events_actions.catalyst import CatalystCardsService
 
 class CorporateActionsService:
     def fetch_actions(self) -> List[Dict]:
@@ -7,6 +10,11 @@ class CorporateActionsService:
             "SELECT * FROM corporate_actions WHERE ex_date >= CURRENT_DATE"
         )
 
+    def add_action(self, action: Dict) -> Dict:
+        action_id = adjustment_engine.add_action(action)
+        CatalystCardsService().refresh([action_id])
+        return {"id": action_id, **action}
+
     def simulate_impact(self, symbol: str, action_id: int) -> Dict:
         action = db_manager.execute_query(
             "SELECT * FROM corporate_actions WHERE id = ?", [action_id]
@@ -14,4 +22,13 @@ class CorporateActionsService:
         factor = 1.0
         if action['type'] == 'BONUS':
             factor = (action['ratio_numerator'] + action['ratio_denominator']) / action['ratio_denominator']
-        return {"symbol": symbol, "action_id": action_id, "adjustment_factor": factor}
+        elif action['type'] == 'SPLIT':
+            factor = action['ratio_numerator'] / action['ratio_denominator']
+        # Cumulative price multiplier for history before this action's ex-date
+        price_factor = adjustment_engine.factor_on(symbol, action['ex_date'] - timedelta(days=1)) if action['ex_date'] else 1.0
+        return {
+            "symbol": symbol,
+            "action_id": action_id,
+            "adjustment_factor": factor,
+            "cumulative_price_factor": price_factor,
+        }
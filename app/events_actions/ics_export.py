@@ -1,22 +1,88 @@
+import hashlib
+import threading
 from icalendar import Calendar, Event
-from datetime import datetime
-from typing import List
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.core.database import db_manager
 from app.events_actions.calendars import CalendarService
 
+# Order-independent digest of the exported fields: catches edits that bypass updated_at
+ACTIONS_VERSION_SQL = """
+SELECT COUNT(*) AS n, MAX(updated_at) AS changed,
+       bit_xor(hash(id, symbol, type, date, ex_date, record_date, amount, event_date)) AS digest
+FROM corporate_actions
+"""
+
+
 class ICSScheduler:
-    def export(self, days: int = 30) -> bytes:
+    """
+    ICS feeds of upcoming corporate actions, optionally limited to a user's watchlist.
+
+    Feeds are cached per (user, window) under a version key built from aggregates
+    over corporate_actions (row count, latest updated_at and a content digest, so
+    edits to an existing action count too) and the user's watchlist plus today's
+    date, so polling clients get the cached bytes (or a 304 via the ETag) until an
+    action or the watchlist actually changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[Optional[str], int], Tuple[str, bytes]] = {}
+        self.calendar = CalendarService()
+
+    def _version(self, user_id: Optional[str], days: int) -> str:
+        row = db_manager.execute_query(ACTIONS_VERSION_SQL)[0]
+        key = [row["n"], row["changed"], row["digest"], date.today(), days]
+        if user_id is not None:
+            wl = db_manager.execute_query(
+                "SELECT COUNT(*) AS n, MAX(added_at) AS changed, bit_xor(hash(symbol)) AS digest "
+                "FROM watchlist WHERE user_id = ?",
+                [user_id],
+            )[0]
+            key += [user_id, wl["n"], wl["changed"], wl["digest"]]
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def etag(self, user_id: Optional[str] = None, days: int = 30) -> str:
+        return f'"{self._version(user_id, days)}"'
+
+    def _build(self, events: List[Dict]) -> bytes:
         cal = Calendar()
-        cs = CalendarService()
-        events = cs.get_dividends(days) + cs.get_agm(days)
+        cal.add("prodid", "-//Elite Stock Engine//Corporate Actions//EN")
+        cal.add("version", "2.0")
         for d in events:
             ev = Event()
-            summary = f"{d.get('symbol', '')} "
-            if 'amount' in d:
+            summary = f"{d['symbol']} "
+            if d["type"] == "DIVIDEND":
                 summary += f"Dividend {d['amount']}"
-            else:
+            elif d["type"] in ("AGM", "EGM"):
                 summary += "AGM/EGM"
+            else:
+                summary += d["type"].title()
+            ev.add("uid", f"{d['id']}-{d['type'].lower()}@elite-stock-engine")
             ev.add("summary", summary)
-            event_date = d.get('ex_date') or d.get('agm_date')
-            ev.add("dtstart", datetime.fromisoformat(event_date))
+            ev.add("dtstart", d["event_date"])
             cal.add_component(ev)
         return cal.to_ical()
+
+    def feed(self, user_id: Optional[str] = None, days: int = 30) -> Tuple[bytes, str]:
+        """Return (ics_bytes, etag), regenerating only when the version key changed."""
+        version = self._version(user_id, days)
+        with self._lock:
+            cached = self._cache.get((user_id, days))
+        if cached and cached[0] == version:
+            return cached[1], f'"{version}"'
+        symbols = None
+        if user_id is not None:
+            symbols = [
+                r["symbol"] for r in db_manager.execute_query(
+                    "SELECT DISTINCT symbol FROM watchlist WHERE user_id = ?", [user_id]
+                )
+            ]
+        today = date.today()
+        content = self._build(self.calendar.get_events(today, today + timedelta(days=days), symbols=symbols))
+        with self._lock:
+            self._cache[(user_id, days)] = (version, content)
+        return content, f'"{version}"'
+
+    def export(self, days: int = 30) -> bytes:
+        return self.feed(None, days)[0]
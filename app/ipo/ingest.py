@@ -0,0 +1,45 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Sequence
+from app.core.database import db_manager
+
+IPO_COLUMNS = [
+    "symbol", "company_name", "sector", "open_date", "close_date", "listing_date", "price_band_low",
+    "price_band_high", "lot_size", "issue_size_cr", "eps", "pe_ratio", "sector_pe",
+]
+SUBSCRIPTION_COLUMNS = ["symbol", "subscription", "qib", "nii", "retail", "gmp"]
+LISTING_COLUMNS = ["symbol", "listing_date", "issue_price", "listing_price"]
+DATE_COLUMNS = {"open_date", "close_date", "listing_date"}
+
+
+def _as_date(value: Any) -> Any:
+    # JSON records carry ISO strings; bind real dates so EXCLUDED matches the DATE columns
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _upsert(table: str, columns: List[str], records: Sequence[Dict[str, Any]]) -> int:
+    """Bulk upsert on symbol; fields missing from a record keep their stored value."""
+    if not records:
+        return 0
+    updates = ", ".join(f"{c} = COALESCE(EXCLUDED.{c}, {table}.{c})" for c in columns[1:])
+    db_manager.bulk_insert(
+        table,
+        columns,
+        [[_as_date(r.get(c)) if c in DATE_COLUMNS else r.get(c) for c in columns] for r in records],
+        on_conflict=f"ON CONFLICT (symbol) DO UPDATE SET {updates}, updated_at = now()",
+    )
+    return len(records)
+
+
+def upsert_ipos(records: Sequence[Dict[str, Any]]) -> int:
+    return _upsert("upcoming_ipos", IPO_COLUMNS, records)
+
+
+def upsert_subscriptions(records: Sequence[Dict[str, Any]]) -> int:
+    """Latest overall/category subscription (times) and grey market premium per issue."""
+    return _upsert("ipo_subscriptions", SUBSCRIPTION_COLUMNS, records)
+
+
+def upsert_listings(records: Sequence[Dict[str, Any]]) -> int:
+    return _upsert("listing_prices", LISTING_COLUMNS, records)
@@ -1,12 +1,14 @@
 from typing import Dict
 from app.core.database import db_manager
+from app.ipo.tracker import subscription_tracker
 
 class IPOMonitor:
     def pre_list(self, symbol: str) -> Dict:
+        live = subscription_tracker.latest(symbol)
         sub = db_manager.execute_query(
-            "SELECT subscription, gmp FROM ipo_subscriptions WHERE symbol=?", [symbol]
+            "SELECT subscription, qib, nii, retail, gmp, updated_at FROM ipo_subscriptions WHERE symbol=?", [symbol]
         )
-        return {"symbol": symbol, **(sub[0] if sub else {})}
+        return {"symbol": symbol, **(sub[0] if sub else {}), **({"live": live} if live else {})}
 
     def post_list(self, symbol: str) -> Dict:
         price = db_manager.execute_query(
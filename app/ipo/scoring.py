@@ -1,14 +1,70 @@
-from typing import List, Dict
+import hashlib
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
 from app.core.database import db_manager
 
+# All upcoming issues scored in one pass. Components (max 100):
+#   subscription  35  log-scaled overall times subscribed (100x ~ full marks), QIB demand weighted in
+#   gmp           25  grey market premium over the upper price band, 0% -> 0, 50%+ -> full
+#   valuation     25  discount of the issue P/E to its sector P/E
+#   earnings      15  positive EPS, scaled by earnings yield at the upper band
+SCORE_SQL = """
+WITH f AS (
+    SELECT u.*, s.subscription, s.qib, s.nii, s.retail, s.gmp,
+           s.updated_at AS subscription_updated_at,
+           s.gmp / NULLIF(u.price_band_high, 0) AS gmp_pct,
+           (u.sector_pe - u.pe_ratio) / NULLIF(u.sector_pe, 0) AS pe_discount,
+           u.eps / NULLIF(u.price_band_high, 0) AS earnings_yield
+    FROM upcoming_ipos u
+    LEFT JOIN ipo_subscriptions s ON s.symbol = u.symbol
+    WHERE u.listing_date IS NULL OR u.listing_date >= CURRENT_DATE
+),
+scored AS (
+    SELECT *,
+           35 * LEAST(1.0, ln(1 + GREATEST(0.7 * COALESCE(subscription, 0) + 0.3 * COALESCE(qib, subscription, 0), 0)) / ln(101)) AS score_subscription,
+           25 * LEAST(1.0, GREATEST(0.0, COALESCE(gmp_pct, 0) / 0.5)) AS score_gmp,
+           CASE WHEN pe_ratio > 0 AND sector_pe > 0
+                THEN 25 * LEAST(1.0, GREATEST(0.0, 0.5 + pe_discount)) ELSE 0 END AS score_valuation,
+           CASE WHEN eps > 0 THEN 15 * LEAST(1.0, 0.5 + COALESCE(earnings_yield, 0) / 0.1) ELSE 0 END AS score_earnings
+    FROM f
+)
+SELECT *,
+       LEAST(100.0, score_subscription + score_gmp + score_valuation + score_earnings) AS score,
+       RANK() OVER (ORDER BY score_subscription + score_gmp + score_valuation + score_earnings DESC) AS rank
+FROM scored
+ORDER BY rank, symbol
+"""
+
+
 class IPOScoringEngine:
-    def score_upcoming(self) -> List[Dict]:
-        ipos = db_manager.execute_query("SELECT * FROM upcoming_ipos")
-        results = []
-        for ipo in ipos:
-            score = (ipo.get('eps', 0) * 25)
-            if ipo.get('pe_ratio', 0) < ipo.get('sector_pe', 100):
-                score += 15
-            score = min(score, 100)
-            results.append({**ipo, "score": score})
-        return results
+    """
+    Scores every upcoming issue in one set-based query. Rankings are cached under
+    a version key over upcoming_ipos and ipo_subscriptions (row counts and last
+    update), so bursts of reads during subscription windows are served from
+    memory until subscription or issue data actually changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Optional[Tuple[str, List[Dict]]] = None
+
+    def _version(self) -> str:
+        row = db_manager.execute_query(
+            """
+            SELECT (SELECT COUNT(*) FROM upcoming_ipos) AS issues,
+                   (SELECT MAX(updated_at) FROM upcoming_ipos) AS issues_changed,
+                   (SELECT COUNT(*) FROM ipo_subscriptions) AS subs,
+                   (SELECT MAX(updated_at) FROM ipo_subscriptions) AS subs_changed
+            """
+        )[0]
+        key = [row["issues"], row["issues_changed"], row["subs"], row["subs_changed"], date.today()]
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def score_upcoming(self, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            version = self._version()
+            if self._cache is None or self._cache[0] != version:
+                self._cache = (version, db_manager.execute_query(SCORE_SQL))
+            rankings = self._cache[1]
+        return rankings[:limit] if limit else rankings
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+from app.ipo.ingest import upsert_subscriptions
+
+CATEGORIES = ("qib", "nii", "retail", "employee", "total")
+SNAPSHOT_COLUMNS = ["symbol", "captured_at", *CATEGORIES]
+
+Point = Tuple[datetime, Dict[str, Optional[float]]]
+
+
+def _as_datetime(value: Any) -> datetime:
+    """Naive local datetime (the column type) from a datetime or an ISO 8601 string."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class SubscriptionTracker:
+    """
+    Intraday IPO subscription by category (times subscribed), as a time series in
+    ipo_subscription_snapshots plus an in-memory latest state per issue.
+
+    Each symbol keeps the points inside IPO_VELOCITY_WINDOW_MINUTES, from which
+    the rolling velocity (change in times subscribed per hour) is derived as
+    snapshots arrive. Reads are served from the map. Processes that do not ingest
+    pull only snapshots ingested since their watermark, at most every
+    IPO_TRACKER_SYNC_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.window = timedelta(minutes=settings.IPO_VELOCITY_WINDOW_MINUTES)
+        self._points: Dict[str, Deque[Point]] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._watermark: Optional[datetime] = None
+        self._loaded = False
+        self._last_sync = 0.0
+
+    def _apply(self, symbol: str, captured_at: datetime, values: Dict[str, Optional[float]]) -> bool:
+        points = self._points.setdefault(symbol, deque())
+        if points and captured_at <= points[-1][0]:
+            return False  # duplicate or out of order; the latest state only moves forward
+        points.append((captured_at, values))
+        while captured_at - points[0][0] > self.window:
+            points.popleft()
+        first_at, first = points[0]
+        hours = (captured_at - first_at).total_seconds() / 3600
+        velocity = {
+            c: (values[c] - first[c]) / hours
+            for c in CATEGORIES
+            if hours > 0 and values.get(c) is not None and first.get(c) is not None
+        }
+        self._latest[symbol] = {"symbol": symbol, "captured_at": captured_at, **values, "velocity_per_hour": velocity}
+        return True
+
+    def _apply_rows(self, rows: List[Dict[str, Any]]) -> int:
+        applied = 0
+        for r in rows:
+            applied += self._apply(r["symbol"], r["captured_at"], {c: r[c] for c in CATEGORIES})
+            if r.get("ingested_at") and (self._watermark is None or r["ingested_at"] > self._watermark):
+                self._watermark = r["ingested_at"]
+        return applied
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        rows = db_manager.execute_query(
+            f"""
+            SELECT * FROM ipo_subscription_snapshots
+            QUALIFY captured_at >= MAX(captured_at) OVER (PARTITION BY symbol) - INTERVAL {int(self.window.total_seconds())} SECOND
+            ORDER BY symbol, captured_at
+            """
+        )
+        self._apply_rows(rows)
+        self._loaded = True
+        self._last_sync = time.monotonic()
+        logger.debug(f"Subscription tracker loaded {len(self._latest)} issues")
+
+    def sync(self) -> int:
+        """Apply snapshots ingested by other processes since the watermark."""
+        with self._lock:
+            self._ensure_loaded()
+            rows = db_manager.execute_query(
+                "SELECT * FROM ipo_subscription_snapshots WHERE ingested_at >= ? ORDER BY captured_at",
+                [self._watermark or datetime.min],
+            )
+            self._last_sync = time.monotonic()
+            return self._apply_rows(rows)
+
+    def ingest(self, snapshots: Sequence[Dict[str, Any]]) -> int:
+        """
+        Store snapshots newer than the latest known one per symbol and update the
+        live state. The latest values also go to ipo_subscriptions, which
+        refreshes the IPO rankings. captured_at may be an ISO 8601 string
+        (ValueError if unparseable). Memory is only updated once the snapshots
+        are stored. Returns the number of new snapshots.
+        """
+        now = datetime.now()
+        batch = sorted(
+            ({**s, "captured_at": _as_datetime(s["captured_at"]) if s.get("captured_at") else now} for s in snapshots),
+            key=lambda s: s["captured_at"],
+        )
+        with self._lock:
+            self._ensure_loaded()
+            last_at = {symbol: points[-1][0] for symbol, points in self._points.items() if points}
+            fresh, latest = [], {}
+            for s in batch:
+                if s["symbol"] in last_at and s["captured_at"] <= last_at[s["symbol"]]:
+                    continue  # duplicate or out of order; the latest state only moves forward
+                last_at[s["symbol"]] = s["captured_at"]
+                fresh.append(s)
+                latest[s["symbol"]] = s
+            if not fresh:
+                return 0
+            with db_manager.transaction():
+                db_manager.bulk_insert(
+                    "ipo_subscription_snapshots",
+                    SNAPSHOT_COLUMNS,
+                    [[s.get(c) for c in SNAPSHOT_COLUMNS] for s in fresh],
+                    on_conflict="ON CONFLICT DO NOTHING",
+                )
+                upsert_subscriptions([
+                    {"symbol": symbol, "subscription": s.get("total"), "qib": s.get("qib"), "nii": s.get("nii"), "retail": s.get("retail")}
+                    for symbol, s in latest.items()
+                ])
+            for s in fresh:
+                self._apply(s["symbol"], s["captured_at"], {c: s.get(c) for c in CATEGORIES})
+            return len(fresh)
+
+    def _maybe_sync(self):
+        if not self._loaded or time.monotonic() - self._last_sync > settings.IPO_TRACKER_SYNC_SECONDS:
+            self.sync()
+
+    def latest(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._maybe_sync()
+            return self._latest.get(symbol)
+
+    def live(self) -> List[Dict[str, Any]]:
+        """Latest state of every tracked issue, most subscribed first."""
+        with self._lock:
+            self._maybe_sync()
+            return sorted(self._latest.values(), key=lambda s: s.get("total") or 0.0, reverse=True)
+
+    def history(self, symbol: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        return db_manager.execute_query(
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM ipo_subscription_snapshots "
+            "WHERE symbol = ? AND captured_at >= ? ORDER BY captured_at",
+            [symbol, since or datetime.min],
+        )
+
+
+subscription_tracker = SubscriptionTracker()
@@ -7,9 +7,10 @@ import uvicorn
 from fastapi import FastAPI
 
 from app.api import quotes, universe, gold, health, refresh
-from app.tasks.scheduler import start_scheduler
+from app.tasks.scheduler import start_scheduler, shutdown_scheduler
 from app.utils.logger import setup_logging
 from app.core.database import db_manager
+from app.core.config import settings
 
 # Feature routers (clear aliases to avoid collisions)
 from app.api.ultra_elite import router as ultra_router
@@ -74,7 +75,16 @@ app.include_router(compliance_router,     prefix="/api/v6/compliance",  tags=["C
 
 @app.on_event("startup")
 async def startup_event():
-    start_scheduler()
+    # This process owns the DuckDB file, so it always runs the database jobs (queue writer,
+    # end-of-day, ...). Fetching runs here too unless SCHEDULER_IN_API=false hands it to
+    # `python -m app.tasks.worker`.
+    if settings.SCHEDULER_ENABLED:
+        start_scheduler(fetch=settings.SCHEDULER_IN_API)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_scheduler()
 
 
 if __name__ == "__main__":
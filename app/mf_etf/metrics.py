@@ -1,6 +1,255 @@
-from typing import Dict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+# Precomputed per-scheme metrics for the screeners, recomputed once per NAV load.
+# Point-in-time returns use ASOF joins against nav_history (the last NAV on or
+# before each lookback date); risk figures use daily log returns over one year.
+# ETF tracking error is measured against the benchmark series in index_history
+# and liquidity is the 20-session average traded value from daily_bars.
+FUND_METRICS_SQL = """
+INSERT OR REPLACE INTO fund_metrics
+    (fid, kind, name, category, as_of, nav, ret_1m, ret_3m, ret_1y, cagr_3y, volatility_1y,
+     max_drawdown_1y, tracking_error_1y, liquidity, expense_ratio, aum, computed_at)
+WITH funds AS (
+    SELECT fid, 'MF' AS kind, name, category, expense_ratio, aum, benchmark, symbol FROM mutual_funds
+    UNION ALL
+    SELECT fid, 'ETF' AS kind, name, category, expense_ratio, aum, benchmark, symbol FROM etfs
+),
+latest AS (
+    SELECT fid, MAX(date) AS as_of, arg_max(nav, date) AS nav,
+           MAX(date) - INTERVAL 1 MONTH AS d_1m, MAX(date) - INTERVAL 3 MONTH AS d_3m,
+           MAX(date) - INTERVAL 1 YEAR AS d_1y, MAX(date) - INTERVAL 3 YEAR AS d_3y
+    FROM nav_history
+    GROUP BY fid
+),
+points AS (
+    SELECT l.fid, l.as_of, l.nav,
+           l.nav / p1m.nav - 1 AS ret_1m,
+           l.nav / p3m.nav - 1 AS ret_3m,
+           l.nav / p1y.nav - 1 AS ret_1y,
+           CASE WHEN p3y.date IS NOT NULL
+                THEN pow(l.nav / p3y.nav, 365.0 / (l.as_of - p3y.date)) - 1 END AS cagr_3y
+    FROM latest l
+    ASOF LEFT JOIN nav_history p1m ON p1m.fid = l.fid AND l.d_1m >= p1m.date
+    ASOF LEFT JOIN nav_history p3m ON p3m.fid = l.fid AND l.d_3m >= p3m.date
+    ASOF LEFT JOIN nav_history p1y ON p1y.fid = l.fid AND l.d_1y >= p1y.date
+    ASOF LEFT JOIN nav_history p3y ON p3y.fid = l.fid AND l.d_3y >= p3y.date
+),
+year AS (
+    SELECT n.fid, n.date, n.nav,
+           ln(n.nav / LAG(n.nav) OVER (PARTITION BY n.fid ORDER BY n.date)) AS r,
+           n.nav / MAX(n.nav) OVER (PARTITION BY n.fid ORDER BY n.date) - 1 AS drawdown
+    FROM nav_history n JOIN latest l ON l.fid = n.fid
+    WHERE n.date >= l.d_1y
+),
+risk AS (
+    SELECT fid, stddev_samp(r) * sqrt(252) AS volatility_1y, MIN(drawdown) AS max_drawdown_1y
+    FROM year GROUP BY fid
+),
+bench AS (
+    SELECT index_name, date,
+           ln(value / LAG(value) OVER (PARTITION BY index_name ORDER BY date)) AS r
+    FROM index_history
+    WHERE date >= (SELECT MIN(d_1y) FROM latest)
+),
+tracking AS (
+    SELECT y.fid, stddev_samp(y.r - b.r) * sqrt(252) AS tracking_error_1y
+    FROM year y
+    JOIN funds f ON f.fid = y.fid AND f.kind = 'ETF'
+    JOIN bench b ON b.index_name = f.benchmark AND b.date = y.date
+    GROUP BY y.fid
+),
+liquidity AS (
+    SELECT symbol, AVG(close * volume) AS liquidity
+    FROM (
+        SELECT symbol, close, volume
+        FROM primary_daily_bars
+        WHERE symbol IN (SELECT symbol FROM etfs WHERE symbol IS NOT NULL)
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY date DESC) <= 20
+    )
+    GROUP BY symbol
+)
+SELECT f.fid, f.kind, f.name, f.category, p.as_of, p.nav, p.ret_1m, p.ret_3m, p.ret_1y, p.cagr_3y,
+       r.volatility_1y, r.max_drawdown_1y, t.tracking_error_1y, q.liquidity, f.expense_ratio, f.aum,
+       CURRENT_TIMESTAMP
+FROM funds f
+JOIN points p ON p.fid = f.fid
+LEFT JOIN risk r ON r.fid = f.fid
+LEFT JOIN tracking t ON t.fid = f.fid
+LEFT JOIN liquidity q ON q.symbol = f.symbol
+"""
+
+
+def compute_fund_metrics() -> int:
+    """Recompute fund_metrics for every scheme with NAV history."""
+    with db_manager.transaction():
+        db_manager.execute_insert("DELETE FROM fund_metrics")
+        db_manager.execute_insert(FUND_METRICS_SQL)
+    count = db_manager.execute_query("SELECT COUNT(*) AS n FROM fund_metrics")[0]["n"]
+    logger.info(f"Fund metrics computed for {count} schemes")
+    return count
+
+
+def _project_simplex(v: np.ndarray) -> np.ndarray:
+    """Euclidean projection of each row of v onto {w >= 0, sum(w) = 1}."""
+    k = v.shape[1]
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1.0
+    rho = (u - css / np.arange(1, k + 1) > 0).sum(axis=1) - 1
+    theta = css[np.arange(len(v)), rho] / (rho + 1)
+    return np.maximum(v - theta[:, None], 0.0)
+
+
+def style_weights_batch(
+    factors: np.ndarray, funds: np.ndarray, mask: np.ndarray, max_iter: int = 500, tol: float = 1e-10
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sharpe style weights for N funds over one window in a single batched solve.
+
+    factors (T, k) and funds (T, N) are returns on a shared date axis; mask (T, N)
+    marks the days each fund has a return. Minimises ||r - F w||^2 per fund with
+    w >= 0, sum(w) = 1 by accelerated projected gradient on the per-fund normal
+    equations (N k x k Gram matrices, so each iteration is O(N k^2)). Returns
+    weights (N, k) and R^2 (N,).
+    """
+    m = mask.astype(np.float64)
+    y = np.where(mask, funds, 0.0)
+    gram = np.einsum("tn,ti,tj->nij", m, factors, factors)  # (N, k, k)
+    rhs = np.einsum("tn,ti->ni", y, factors)  # (N, k)
+    step = 1.0 / np.maximum(np.linalg.eigvalsh(gram)[:, -1], 1e-18)
+
+    n, k = rhs.shape
+    w = np.full((n, k), 1.0 / k)
+    z, t = w.copy(), 1.0
+    for _ in range(max_iter):
+        grad = np.matmul(gram, z[:, :, None])[:, :, 0] - rhs
+        w_next = _project_simplex(z - step[:, None] * grad)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + (t - 1) / t_next * (w_next - w)
+        delta = np.abs(w_next - w).max() if n else 0.0
+        w, t = w_next, t_next
+        if delta < tol:
+            break
+
+    resid = y - (factors @ w.T) * m
+    count = np.maximum(m.sum(axis=0), 1.0)
+    mean = y.sum(axis=0) / count
+    sst = (((y - mean) * m) ** 2).sum(axis=0)
+    r_squared = np.where(sst > 0, 1 - (resid ** 2).sum(axis=0) / np.where(sst > 0, sst, 1.0), np.nan)
+    return w, r_squared
+
 
 class Attribution:
-    def style(self, fid: int) -> Dict:
-        # Placeholder attribution scores
-        return {"value": 0.3, "growth": 0.4, "momentum": 0.3}
+    """
+    Returns-based style attribution (Sharpe style analysis) against the
+    STYLE_FACTORS index series, over rolling STYLE_WINDOW_DAYS windows that end
+    every STYLE_STEP_DAYS trading days. Every fund is solved together per window
+    and the weights are stored in fund_style_weights, so lookups are a read.
+    """
+
+    def __init__(self, factors: Optional[Dict[str, str]] = None):
+        self.factors = factors or settings.STYLE_FACTORS
+        self.window = settings.STYLE_WINDOW_DAYS
+        self.step = settings.STYLE_STEP_DAYS
+
+    def _factor_returns(self, since: Optional[date]) -> pd.DataFrame:
+        rows = db_manager.execute_query(
+            "SELECT index_name, date, value FROM index_history WHERE index_name IN (SELECT UNNEST(?)) AND date >= ?",
+            [list(self.factors.values()), since or date(1900, 1, 1)],
+        )
+        if not rows:
+            return pd.DataFrame()
+        levels = pd.DataFrame(rows).pivot(index="date", columns="index_name", values="value").sort_index()
+        levels = levels.dropna(how="any")  # days every factor has a level
+        names = {index: style for style, index in self.factors.items()}
+        return levels.pct_change().rename(columns=names)
+
+    def _fund_returns(self, dates: pd.Index) -> pd.DataFrame:
+        rows = db_manager.execute_query(
+            "SELECT fid, date, nav FROM nav_history WHERE date >= ? AND date <= ?", [dates[0], dates[-1]]
+        )
+        if not rows:
+            return pd.DataFrame(index=dates[1:])
+        navs = pd.DataFrame(rows).pivot(index="date", columns="fid", values="nav")
+        # Returns between consecutive factor dates; a fund missing either NAV has no return that day
+        return navs.reindex(dates).pct_change(fill_method=None).iloc[1:]
+
+    def run(self, rebuild: bool = False) -> int:
+        """Solve every window not stored yet (all windows with rebuild=True); returns windows solved."""
+        last = None if rebuild else db_manager.execute_query(
+            "SELECT MAX(window_end) AS d FROM fund_style_weights"
+        )[0]["d"]
+        # Enough history for the first new window to be complete
+        since = last - timedelta(days=int(self.window * 1.6) + 10) if last else None
+        factors = self._factor_returns(since)
+        level_dates, factors = factors.index, factors.iloc[1:]
+        if len(factors) < self.window or len(factors.columns) < 2:
+            logger.warning(f"Style analysis skipped: {len(factors)} factor days, factors={list(factors.columns)}")
+            return 0
+        # Window ends on a fixed STYLE_STEP_DAYS grid continuing from the last stored window
+        first = self.window - 1
+        if last is not None:
+            first = max(first, int(factors.index.searchsorted(last, side="right")) - 1 + self.step)
+        ends = list(range(first, len(factors), self.step))
+        if not ends:
+            return 0
+
+        funds = self._fund_returns(level_dates)
+        styles = list(factors.columns)
+        x_all, y_all = factors.to_numpy(), funds.to_numpy()
+        fids = funds.columns.to_numpy()
+        rows: List[List[Any]] = []
+        for e in ends:
+            lo = e - self.window + 1
+            x, y = x_all[lo:e + 1], y_all[lo:e + 1]
+            mask = np.isfinite(y)
+            observations = mask.sum(axis=0)
+            keep = observations >= self.window * settings.STYLE_MIN_COVERAGE
+            if not keep.any():
+                continue
+            weights, r2 = style_weights_batch(x, y[:, keep], mask[:, keep])
+            start, end = factors.index[lo], factors.index[e]
+            for fid, w, fit, obs in zip(fids[keep], weights, r2, observations[keep]):
+                fit = None if np.isnan(fit) else float(fit)
+                rows.extend([int(fid), end, start, s, float(v), fit, int(obs)] for s, v in zip(styles, w))
+
+        with db_manager.transaction():
+            if rebuild:
+                db_manager.execute_insert("DELETE FROM fund_style_weights")
+            db_manager.bulk_insert(
+                "fund_style_weights",
+                ["fid", "window_end", "window_start", "factor", "weight", "r_squared", "observations"],
+                rows,
+                on_conflict="ON CONFLICT DO NOTHING",
+            )
+        logger.info(f"Style analysis solved {len(ends)} windows ({len(rows) // max(len(styles), 1)} fund fits)")
+        return len(ends)
+
+    def style(self, fid: int, window_end: Optional[date] = None) -> Dict:
+        """Stored style weights for a fund: the latest window, or the one ending on/before window_end."""
+        rows = db_manager.execute_query(
+            """
+            SELECT window_start, window_end, factor, weight, r_squared, observations
+            FROM fund_style_weights
+            WHERE fid = ? AND window_end = (
+                SELECT MAX(window_end) FROM fund_style_weights WHERE fid = ? AND window_end <= ?
+            )
+            ORDER BY weight DESC
+            """,
+            [fid, fid, window_end or date.max],
+        )
+        if not rows:
+            return {"fid": fid, "weights": {}}
+        return {
+            "fid": fid,
+            "window_start": rows[0]["window_start"],
+            "window_end": rows[0]["window_end"],
+            "r_squared": rows[0]["r_squared"],
+            "observations": rows[0]["observations"],
+            "weights": {r["factor"]: r["weight"] for r in rows},
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import httpx
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+from app.data.fetchers.nse_fetcher import NSEFetcher
+
+AMFI_NAV_URL = "https://www.amfiindia.com/spages/NAVAll.txt"
+
+_CATEGORY_RE = re.compile(r"^(Open|Close|Interval)[^;]*Schemes?\s*\((?P<category>.+)\)\s*$", re.IGNORECASE)
+_DATE_FORMATS = ("%d-%b-%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+
+def _parse_date(value: str) -> Optional[date]:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_nav(value: str) -> Optional[float]:
+    try:
+        nav = float(value.replace(",", "").strip())
+    except ValueError:
+        return None  # "N.A.", "-", blanks
+    return nav if nav > 0 else None
+
+
+_FOF_RE = re.compile(r"\bFOF\b|FUND OF FUNDS?\b|FUND-OF-FUNDS?\b")
+
+
+def _is_etf(category: Optional[str], name: str) -> bool:
+    text = f"{category or ''} {name}".upper()
+    if _FOF_RE.search(text):
+        return False  # "ETF Fund of Fund" schemes are unlisted funds that hold ETFs
+    return "EXCHANGE TRADED" in text or " ETF" in text or text.endswith("ETF")
+
+
+def parse_amfi_nav(text: str) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, List[Any]]]:
+    """
+    Parse an AMFI NAV text file into scheme metadata and columnar NAV rows.
+
+    Handles both the daily NAVAll.txt layout
+        Scheme Code;ISIN Growth;ISIN Reinvestment;Scheme Name;Net Asset Value;Date
+    and the NAV history report layout
+        Scheme Code;Scheme Name;ISIN Growth;ISIN Reinvestment;Net Asset Value;Repurchase Price;Sale Price;Date
+    Category headers ("Open Ended Schemes(Equity Scheme - Large Cap Fund)") and AMC
+    name lines between them are carried onto the following schemes. Rows with an
+    unparseable NAV or date are skipped.
+    """
+    schemes: Dict[int, Dict[str, Any]] = {}
+    navs: Dict[str, List[Any]] = {"fid": [], "date": [], "nav": []}
+    history_layout = False
+    category: Optional[str] = None
+    amc: Optional[str] = None
+    skipped = 0
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if ";" not in line:
+            match = _CATEGORY_RE.match(line)
+            if match:
+                category = match.group("category").strip()
+            else:
+                amc = line
+            continue
+        parts = [p.strip() for p in line.split(";")]
+        if parts[0].lower().startswith("scheme code"):
+            history_layout = len(parts) >= 8 or parts[1].lower().startswith("scheme name")
+            continue
+        if history_layout and len(parts) >= 8:
+            code, name, isin_growth, isin_reinvest, nav, nav_date = parts[0], parts[1], parts[2], parts[3], parts[4], parts[7]
+        elif len(parts) >= 6:
+            code, isin_growth, isin_reinvest, name, nav, nav_date = parts[:6]
+        else:
+            skipped += 1
+            continue
+        try:
+            fid = int(code)
+        except ValueError:
+            skipped += 1
+            continue
+        value, day = _parse_nav(nav), _parse_date(nav_date)
+        schemes[fid] = {
+            "fid": fid,
+            "name": name,
+            "amc": amc,
+            "category": category,
+            "isin_growth": isin_growth if isin_growth not in ("", "-") else None,
+            "isin_reinvest": isin_reinvest if isin_reinvest not in ("", "-") else None,
+            "is_etf": _is_etf(category, name),
+        }
+        if value is None or day is None:
+            skipped += 1
+            continue
+        navs["fid"].append(fid)
+        navs["date"].append(day)
+        navs["nav"].append(value)
+
+    if skipped:
+        logger.debug(f"AMFI NAV parse skipped {skipped} rows")
+    return schemes, navs
+
+
+def load_amfi_nav(text: str) -> Dict[str, int]:
+    """Parse AMFI NAV text and bulk-load scheme metadata, latest NAVs and nav_history."""
+    schemes, navs = parse_amfi_nav(text)
+    if not navs["fid"]:
+        return {"schemes": len(schemes), "navs": 0}
+
+    latest: Dict[int, Tuple[date, float]] = {}
+    for fid, day, nav in zip(navs["fid"], navs["date"], navs["nav"]):
+        if fid not in latest or day >= latest[fid][0]:
+            latest[fid] = (day, nav)
+
+    columns = ["fid", "name", "amc", "category", "isin_growth", "isin_reinvest", "nav", "nav_date"]
+    upsert = (
+        "ON CONFLICT (fid) DO UPDATE SET name = EXCLUDED.name, amc = COALESCE(EXCLUDED.amc, amc), "
+        "category = COALESCE(EXCLUDED.category, category), isin_growth = EXCLUDED.isin_growth, "
+        "isin_reinvest = EXCLUDED.isin_reinvest, "
+        "nav = CASE WHEN EXCLUDED.nav_date >= nav_date OR nav_date IS NULL THEN EXCLUDED.nav ELSE nav END, "
+        "nav_date = GREATEST(EXCLUDED.nav_date, nav_date), updated_at = now()"
+    )
+    rows = {True: [], False: []}
+    for fid, s in schemes.items():
+        day, nav = latest.get(fid, (None, None))
+        rows[s["is_etf"]].append([fid, s["name"], s["amc"], s["category"], s["isin_growth"], s["isin_reinvest"], nav, day])
+
+    with db_manager.transaction():
+        db_manager.bulk_insert("mutual_funds", columns, rows[False], on_conflict=upsert)
+        db_manager.bulk_insert("etfs", columns, rows[True], on_conflict=upsert)
+        db_manager.execute_insert(
+            "INSERT OR REPLACE INTO nav_history (fid, date, nav) SELECT UNNEST(?), UNNEST(?), UNNEST(?)",
+            [navs["fid"], navs["date"], navs["nav"]],
+        )
+    result = {"schemes": len(schemes), "funds": len(rows[False]), "etfs": len(rows[True]), "navs": len(navs["fid"])}
+    logger.info(f"AMFI NAV load complete: {result}")
+    return result
+
+
+def upsert_index_history(index_name: str, dates: Sequence[date], values: Sequence[float]) -> int:
+    """Bulk-load benchmark/factor index levels (used for tracking error and style analysis)."""
+    if not dates:
+        return 0
+    db_manager.execute_insert(
+        "INSERT OR REPLACE INTO index_history (index_name, date, value) SELECT ?, UNNEST(?), UNNEST(?)",
+        [index_name, list(dates), list(values)],
+    )
+    return len(dates)
+
+
+def update_fund_attributes(records: Sequence[Dict[str, Any]]) -> int:
+    """
+    Set attributes that are not in the NAV file (expense_ratio, aum, benchmark, and
+    the exchange symbol for ETFs) from records keyed by fid, for funds and ETFs alike.
+    """
+    if not records:
+        return 0
+    cols = ["expense_ratio", "aum", "benchmark", "symbol"]
+    params = [[r["fid"] for r in records]] + [[r.get(c) for r in records] for c in cols]
+    for table in ("mutual_funds", "etfs"):
+        db_manager.execute_insert(
+            f"""
+            UPDATE {table} SET
+                expense_ratio = COALESCE(u.expense_ratio, {table}.expense_ratio),
+                aum = COALESCE(u.aum, {table}.aum),
+                benchmark = COALESCE(u.benchmark, {table}.benchmark),
+                symbol = COALESCE(u.symbol, {table}.symbol)
+            FROM (
+                SELECT UNNEST(?) AS fid, CAST(UNNEST(?) AS DOUBLE) AS expense_ratio, CAST(UNNEST(?) AS DOUBLE) AS aum,
+                       CAST(UNNEST(?) AS VARCHAR) AS benchmark, CAST(UNNEST(?) AS VARCHAR) AS symbol
+            ) u
+            WHERE {table}.fid = u.fid
+            """,
+            params,
+        )
+    return len(records)
+
+
+async def fetch_index_levels(index_names: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """
+    Fetch new daily levels of the style factor and event-study market indices from
+    NSE into index_history: from the day after each series' last stored level, or
+    INDEX_HISTORY_BACKFILL_DAYS back for a new series. Returns rows loaded per index.
+    """
+    names = list(index_names or dict.fromkeys([*settings.STYLE_FACTORS.values(), settings.EVENT_STUDY_MARKET_INDEX]))
+    # Database work runs in a thread so the event loop only waits on the HTTP fetches
+    last = {
+        r["index_name"]: r["d"]
+        for r in await asyncio.to_thread(
+            db_manager.execute_query,
+            "SELECT index_name, MAX(date) AS d FROM index_history WHERE index_name IN (SELECT UNNEST(?)) GROUP BY 1",
+            [names],
+        )
+    }
+    today = date.today()
+    fetcher = NSEFetcher()
+    loaded: Dict[str, int] = {}
+    for name in names:
+        start = last[name] + timedelta(days=1) if name in last else today - timedelta(days=settings.INDEX_HISTORY_BACKFILL_DAYS)
+        if start > today:
+            loaded[name] = 0
+            continue
+        try:
+            levels = await fetcher.fetch_index_history(name, start, today)
+        except Exception as e:
+            logger.error(f"Index history fetch failed for {name}: {e}")
+            continue
+        loaded[name] = await asyncio.to_thread(upsert_index_history, name, [d for d, _ in levels], [v for _, v in levels])
+    logger.info(f"Index history refreshed: {loaded}")
+    return loaded
+
+
+async def fetch_amfi_nav() -> Dict[str, int]:
+    """Download today's NAVAll.txt from AMFI and load it."""
+    async with httpx.AsyncClient(timeout=60, headers={"User-Agent": settings.USER_AGENT}) as client:
+        response = await client.get(AMFI_NAV_URL)
+        response.raise_for_status()
+    return await asyncio.to_thread(load_amfi_nav, response.text)
@@ -1,6 +1,131 @@
-from typing import List, Dict
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+# Each fund's latest disclosed portfolio
+CURRENT_HOLDINGS_SQL = """
+SELECT fid, isin, weight
+FROM fund_holdings
+WHERE weight > 0
+QUALIFY disclosure_date = MAX(disclosure_date) OVER (PARTITION BY fid)
+"""
+
+
+def load_holdings(fid: int, disclosure_date: date, holdings: Sequence[Dict[str, Any]]) -> int:
+    """
+    Store one portfolio disclosure. Weights are fractions of NAV (a "% to NAV" of
+    4.5 is given as 0.045); rows for the same ISIN are summed.
+    """
+    merged: Dict[str, Tuple[Optional[str], float]] = {}
+    for h in holdings:
+        name, weight = merged.get(h["isin"], (h.get("security_name"), 0.0))
+        merged[h["isin"]] = (name, weight + float(h["weight"]))
+    with db_manager.transaction():
+        db_manager.execute_insert("DELETE FROM fund_holdings WHERE fid = ? AND disclosure_date = ?", [fid, disclosure_date])
+        db_manager.bulk_insert(
+            "fund_holdings",
+            ["fid", "disclosure_date", "isin", "security_name", "weight"],
+            [[fid, disclosure_date, isin, name, weight] for isin, (name, weight) in merged.items()],
+        )
+    return len(merged)
+
 
 class OverlapChecker:
+    """
+    Pairwise portfolio overlap, sum over securities of min(weight_a, weight_b).
+
+    Current holdings are kept as a sparse (fund x security) weight matrix. A few
+    funds are compared exactly on a dense slice of it. The all-funds matrix uses
+    min(a, b) = step * sum_k [a >= k*step][b >= k*step]: each weight is expanded
+    into indicator columns for its FUND_OVERLAP_WEIGHT_STEP levels, so the whole
+    matrix is one sparse product B B'. Both are rebuilt when the disclosure
+    version (row count and latest disclosure) changes.
+    """
+
+    def __init__(self, step: Optional[float] = None):
+        self.step = step or settings.FUND_OVERLAP_WEIGHT_STEP
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple] = None
+        self.fids = np.empty(0, dtype=np.int64)
+        self._row: Dict[int, int] = {}
+        self.weights = sparse.csr_matrix((0, 0))
+        self._overlap: Optional[sparse.csr_matrix] = None
+
+    def _current_version(self) -> Tuple:
+        row = db_manager.execute_query(
+            "SELECT COUNT(*) AS n, MAX(disclosure_date) AS latest, SUM(weight) AS total FROM fund_holdings"
+        )[0]
+        return row["n"], row["latest"], row["total"]
+
+    def _refresh(self):
+        version = self._current_version()
+        if version == self._version:
+            return
+        rows = db_manager.execute_query(CURRENT_HOLDINGS_SQL)
+        fid_col = np.array([r["fid"] for r in rows], dtype=np.int64)
+        isins = np.array([r["isin"] for r in rows], dtype=object)
+        weight = np.array([r["weight"] for r in rows], dtype=np.float64)
+        self.fids, fund_idx = np.unique(fid_col, return_inverse=True)
+        _, sec_idx = np.unique(isins, return_inverse=True) if len(isins) else (None, np.empty(0, dtype=np.int64))
+        n_sec = int(sec_idx.max()) + 1 if len(sec_idx) else 0
+        self._row = {int(f): i for i, f in enumerate(self.fids)}
+        self.weights = sparse.csr_matrix((weight, (fund_idx, sec_idx)), shape=(len(self.fids), n_sec))
+        self._overlap = self._all_pairs(fund_idx, sec_idx, weight, n_sec)
+        self._version = version
+        logger.info(
+            f"Fund overlap matrix rebuilt | funds={len(self.fids)} securities={n_sec} pairs={self._overlap.nnz}"
+        )
+
+    def _all_pairs(self, fund_idx: np.ndarray, sec_idx: np.ndarray, weight: np.ndarray, n_sec: int) -> sparse.csr_matrix:
+        n = len(self.fids)
+        if not len(weight):
+            return sparse.csr_matrix((n, n))
+        levels = np.maximum(np.rint(weight / self.step).astype(np.int64), 1)
+        # Column block per security, as wide as its largest level count
+        width = np.zeros(n_sec, dtype=np.int64)
+        np.maximum.at(width, sec_idx, levels)
+        offset = np.concatenate(([0], np.cumsum(width)[:-1]))
+        rows = np.repeat(fund_idx, levels)
+        starts = np.repeat(offset[sec_idx], levels)
+        ranks = np.arange(levels.sum()) - np.repeat(np.cumsum(levels) - levels, levels)
+        ind = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, starts + ranks)), shape=(n, int(width.sum()))
+        )
+        return (ind @ ind.T).tocsr().astype(np.float64) * self.step
+
     def funds(self, fids: List[int]) -> Dict:
-        # Simplified overlap matrix example
-        return {"matrix": [[1.0, 0.25], [0.25, 1.0]]}
+        """Exact overlap matrix for a handful of funds (rows/cols in the order given)."""
+        with self._lock:
+            self._refresh()
+            known = [f for f in fids if f in self._row]
+            w = self.weights[[self._row[f] for f in known]]
+            w = w[:, np.unique(w.indices)].toarray()
+            matrix = np.minimum(w[:, None, :], w[None, :, :]).sum(axis=2)
+            return {
+                "fids": known,
+                "matrix": matrix.round(6).tolist(),
+                "missing": [f for f in fids if f not in self._row],
+            }
+
+    def similar(self, fid: int, limit: int = 10, min_overlap: float = 0.0) -> List[Dict[str, Any]]:
+        """Funds with the highest overlap with `fid`, read from the cached all-funds matrix."""
+        with self._lock:
+            self._refresh()
+            i = self._row.get(fid)
+            if i is None:
+                return []
+            row = self._overlap.getrow(i)
+            order = np.argsort(-row.data, kind="stable")
+            out = []
+            for j, value in zip(row.indices[order], row.data[order]):
+                if j == i or value < min_overlap:
+                    continue
+                out.append({"fid": int(self.fids[j]), "overlap": round(float(value), 6)})
+                if len(out) >= limit:
+                    break
+            return out
@@ -1,7 +1,10 @@
+import asyncio
 from fastapi import APIRouter, Body
-from typing import Dict, List
+from datetime import date
+from typing import Dict, List, Optional
 from .screener import MFScreener, ETFScreener
-from .metrics import Attribution
+from .metrics import Attribution, compute_fund_metrics
+from .nav_ingest import fetch_amfi_nav, fetch_index_levels, update_fund_attributes, upsert_index_history
 from .overlap import OverlapChecker
 
 router = APIRouter(prefix="/api/v3/mf_etf", tags=["MF_ETF"])
@@ -18,10 +21,38 @@ def mf_screen(filters: Dict = Body(...)):
 def etf_screen(filters: Dict = Body(...)):
     return etf.run(filters)
 
+@router.post("/nav/refresh")
+async def nav_refresh():
+    loaded = await fetch_amfi_nav()
+    return {**loaded, "metrics": await asyncio.to_thread(compute_fund_metrics)}
+
+@router.post("/attributes")
+def fund_attributes(records: List[Dict] = Body(...)):
+    """expense_ratio / aum / benchmark / symbol per fid, which the AMFI NAV file lacks."""
+    updated = update_fund_attributes(records)
+    return {"updated": updated, "metrics": compute_fund_metrics()}
+
+@router.post("/index/refresh")
+async def index_refresh():
+    """Fetch new style-factor and market index levels from NSE and solve any new style windows."""
+    loaded = await fetch_index_levels()
+    return {"loaded": loaded, "style_windows": await asyncio.to_thread(attrib.run)}
+
+@router.post("/index/{index_name}")
+def index_levels(index_name: str, levels: List[Dict] = Body(...)):
+    """Benchmark or style-factor index levels as [{"date", "value"}] records."""
+    dates = [date.fromisoformat(str(r["date"])) for r in levels]
+    loaded = upsert_index_history(index_name, dates, [float(r["value"]) for r in levels])
+    return {"index_name": index_name, "loaded": loaded, "metrics": compute_fund_metrics()}
+
 @router.get("/mf/attribution")
-def mf_attr(fid: int):
-    return attrib.style(fid)
+def mf_attr(fid: int, window_end: Optional[date] = None):
+    return attrib.style(fid, window_end)
 
 @router.post("/overlap")
 def check_overlap(fids: List[int] = Body(...)):
     return overlap.funds(fids)
+
+@router.get("/overlap/similar/{fid}")
+def similar_funds(fid: int, limit: int = 10, min_overlap: float = 0.0):
+    return overlap.similar(fid, limit, min_overlap)
@@ -1,12 +1,77 @@
-from typing import Dict, List
+from typing import Any, Dict, List, Tuple
 from app.core.database import db_manager
 
-class MFScreener:
-    def run(self, filters: Dict) -> List[Dict]:
-        sql = "SELECT * FROM mutual_funds WHERE nav > ? AND expense_ratio < ?"
-        return db_manager.execute_query(sql, [filters.get('min_nav', 0), filters.get('max_er', 0.05)])
+# Screens read the precomputed fund_metrics table only; nav_history is never scanned here.
+SCREEN_COLUMNS = (
+    "fid, name, category, as_of, nav, ret_1m, ret_3m, ret_1y, cagr_3y, volatility_1y, "
+    "max_drawdown_1y, tracking_error_1y, liquidity, expense_ratio, aum"
+)
+SORTABLE = {
+    "name", "nav", "ret_1m", "ret_3m", "ret_1y", "cagr_3y", "volatility_1y", "max_drawdown_1y",
+    "tracking_error_1y", "liquidity", "expense_ratio", "aum",
+}
+MAX_PAGE_SIZE = 500
 
-class ETFScreener:
-    def run(self, filters: Dict) -> List[Dict]:
-        sql = "SELECT * FROM etfs WHERE tracking_error < ? AND liquidity > ?"
-        return db_manager.execute_query(sql, [filters.get('max_te', 0.02), filters.get('min_liq', 10000)])
+# filter key -> (column, operator)
+COMMON_FILTERS = {
+    "min_nav": ("nav", ">"),
+    "max_er": ("expense_ratio", "<"),
+    "min_ret_1y": ("ret_1y", ">="),
+    "min_cagr_3y": ("cagr_3y", ">="),
+    "max_vol": ("volatility_1y", "<="),
+    "min_aum": ("aum", ">="),
+}
+
+
+class _FundScreener:
+    kind = ""
+    filters: Dict[str, Tuple[str, str]] = COMMON_FILTERS
+    defaults: Dict[str, Any] = {}
+    default_sort = "ret_1y"
+
+    def run(self, filters: Dict) -> Dict[str, Any]:
+        clauses = ["kind = ?"]
+        params: List[Any] = [self.kind]
+        for key, (column, op) in self.filters.items():
+            if filters.get(key) is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(filters[key])
+            elif self.defaults.get(key) is not None:
+                # Defaults only exclude funds known to fail; attributes may not be loaded yet
+                clauses.append(f"({column} IS NULL OR {column} {op} ?)")
+                params.append(self.defaults[key])
+        if filters.get("category"):
+            clauses.append("category ILIKE ?")
+            params.append(f"%{filters['category']}%")
+
+        sort = filters.get("sort_by", self.default_sort)
+        if sort not in SORTABLE:
+            sort = self.default_sort
+        direction = "ASC" if str(filters.get("order", "desc")).lower() == "asc" else "DESC"
+        page = max(int(filters.get("page", 1)), 1)
+        page_size = min(max(int(filters.get("page_size", 50)), 1), MAX_PAGE_SIZE)
+
+        where = " AND ".join(clauses)
+        total = db_manager.execute_query(f"SELECT COUNT(*) AS n FROM fund_metrics WHERE {where}", params)[0]["n"]
+        rows = db_manager.execute_query(
+            f"""
+            SELECT {SCREEN_COLUMNS} FROM fund_metrics
+            WHERE {where}
+            ORDER BY {sort} {direction} NULLS LAST, fid
+            LIMIT ? OFFSET ?
+            """,
+            params + [page_size, (page - 1) * page_size],
+        )
+        return {"page": page, "page_size": page_size, "total": total, "results": rows}
+
+
+class MFScreener(_FundScreener):
+    kind = "MF"
+    defaults = {"min_nav": 0, "max_er": 0.05}
+
+
+class ETFScreener(_FundScreener):
+    kind = "ETF"
+    filters = {**COMMON_FILTERS, "max_te": ("tracking_error_1y", "<"), "min_liq": ("liquidity", ">")}
+    defaults = {"max_te": 0.02, "min_liq": 10000}
+    default_sort = "liquidity"
@@ -0,0 +1,240 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.write_buffer import quote_buffer
+
+Price = Tuple[float, float]  # (last price, previous close)
+
+LATEST_PRICES_SQL = """
+SELECT symbol,
+       CAST(arg_max(price, id) AS DOUBLE) AS price,
+       CAST(arg_max(price - COALESCE(change_amount, 0), id) AS DOUBLE) AS prev_close
+FROM quotes
+WHERE id > ? AND id <= ? AND symbol IN (SELECT UNNEST(?))
+GROUP BY symbol
+"""
+
+
+@dataclass
+class Position:
+    quantity: float = 0.0
+    cost: float = 0.0
+    sector: str = "Unknown"
+
+
+@dataclass
+class Book:
+    """Running aggregates for one user; every field is maintained by +/- contributions."""
+    positions: Dict[str, Position] = field(default_factory=dict)
+    holdings: Dict[int, Tuple[str, float, float, Any]] = field(default_factory=dict)  # id -> (symbol, qty, cost, added_at)
+    market_value: float = 0.0
+    cost_basis: float = 0.0
+    priced_cost: float = 0.0
+    day_pnl: float = 0.0
+    sum_sq_value: float = 0.0
+    sector_values: Dict[str, float] = field(default_factory=dict)
+    version: Tuple[int, int] = (0, 0)  # (holding count, sum of holding ids) the book reflects
+    checked_at: float = 0.0
+
+    def apply(self, pos: Position, px: Optional[Price], sign: int):
+        """Add (sign=+1) or remove (sign=-1) one position's contribution at price px."""
+        self.cost_basis += sign * pos.cost
+        if px is None:
+            return
+        price, prev_close = px
+        value = pos.quantity * price
+        self.market_value += sign * value
+        self.priced_cost += sign * pos.cost
+        self.day_pnl += sign * pos.quantity * (price - prev_close)
+        self.sum_sq_value += sign * value * value
+        self.sector_values[pos.sector] = self.sector_values.get(pos.sector, 0.0) + sign * value
+
+
+class PortfolioAnalytics:
+    """
+    Per-user running portfolio aggregates: market value, cost basis, day P&L,
+    concentration (HHI over positions) and sector weights.
+
+    A user's book is loaded once from the database. After that, holding changes
+    and price ticks adjust only the affected positions' contributions, so reads
+    are O(1). Prices are pulled incrementally (quotes with id greater than the
+    last seen) on each quote buffer flush and, in processes that do not write
+    quotes, at most every PORTFOLIO_PRICE_SYNC_SECONDS on read. Holdings are
+    only ever inserted or deleted, so (count, sum of ids) versions a book; it is
+    compared with the database at most every PORTFOLIO_PRICE_SYNC_SECONDS and
+    the book reloaded when another process changed the user's holdings.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._books: Dict[str, Book] = {}
+        self._prices: Dict[str, Price] = {}
+        self._holders: Dict[str, Set[str]] = {}
+        self._last_quote_id = 0
+        self._last_sync = 0.0
+
+    # ---------- loading ----------
+
+    def _load_user(self, user_id: str) -> Book:
+        rows = db_manager.execute_query(
+            """
+            SELECT p.id, p.symbol, p.quantity, p.avg_price, p.added_at, COALESCE(s.sector, 'Unknown') AS sector
+            FROM portfolio p LEFT JOIN primary_stocks s ON s.symbol = p.symbol
+            WHERE p.user_id = ?
+            """,
+            [user_id],
+        )
+        book = Book(version=(len(rows), sum(r["id"] for r in rows)), checked_at=time.monotonic())
+        self._books[user_id] = book
+        if not self._last_quote_id:
+            self._last_quote_id = self._max_quote_id()
+        self._fetch_prices({r["symbol"] for r in rows} - set(self._prices), 0, self._last_quote_id)
+        for r in rows:
+            self._add_holding(user_id, book, r["id"], r["symbol"], r["quantity"], r["avg_price"], r["added_at"], r["sector"])
+        logger.debug(f"Portfolio analytics loaded {len(rows)} holdings for {user_id}")
+        return book
+
+    def _book(self, user_id: str) -> Book:
+        book = self._books.get(user_id)
+        if book is None:
+            return self._load_user(user_id)
+        if time.monotonic() - book.checked_at > settings.PORTFOLIO_PRICE_SYNC_SECONDS:
+            if self._holdings_version(user_id) != book.version:
+                self._unload_user(user_id, book)
+                return self._load_user(user_id)
+            book.checked_at = time.monotonic()
+        return book
+
+    def _holdings_version(self, user_id: str) -> Tuple[int, int]:
+        row = db_manager.execute_query(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(id), 0) AS ids FROM portfolio WHERE user_id = ?", [user_id]
+        )[0]
+        return row["n"], row["ids"]
+
+    def _unload_user(self, user_id: str, book: Book):
+        for symbol in book.positions:
+            self._holders[symbol].discard(user_id)
+        del self._books[user_id]
+
+    def _max_quote_id(self) -> int:
+        return db_manager.execute_query("SELECT COALESCE(MAX(id), 0) AS id FROM quotes")[0]["id"]
+
+    def _fetch_prices(self, symbols: Set[str], since_id: int, upto_id: int) -> int:
+        """Apply the latest quote in (since_id, upto_id] for each symbol."""
+        if not symbols:
+            return 0
+        rows = db_manager.execute_query(LATEST_PRICES_SQL, [since_id, upto_id, sorted(symbols)])
+        for r in rows:
+            self._set_price(r["symbol"], (r["price"], r["prev_close"]))
+        return len(rows)
+
+    # ---------- incremental updates ----------
+
+    def _set_price(self, symbol: str, px: Price):
+        old = self._prices.get(symbol)
+        self._prices[symbol] = px
+        for user_id in self._holders.get(symbol, ()):
+            book = self._books[user_id]
+            pos = book.positions[symbol]
+            book.apply(pos, old, -1)
+            book.apply(pos, px, +1)
+
+    def _add_holding(self, user_id, book, holding_id, symbol, quantity, avg_price, added_at, sector):
+        pos = book.positions.get(symbol)
+        px = self._prices.get(symbol)
+        if pos is None:
+            pos = book.positions[symbol] = Position(sector=sector)
+            self._holders.setdefault(symbol, set()).add(user_id)
+        else:
+            book.apply(pos, px, -1)
+        pos.quantity += quantity
+        pos.cost += quantity * avg_price
+        book.apply(pos, px, +1)
+        book.holdings[holding_id] = (symbol, quantity, quantity * avg_price, added_at)
+
+    def on_holding_added(self, user_id: str, holding_id: int, symbol: str, quantity: float, avg_price: float, added_at=None):
+        with self._lock:
+            book = self._books.get(user_id)
+            if book is None:
+                return  # not loaded yet; the first read loads it with this holding
+            if symbol not in self._prices:
+                self._fetch_prices({symbol}, 0, self._last_quote_id)
+            sector = db_manager.execute_query("SELECT COALESCE(MAX(sector), 'Unknown') AS s FROM primary_stocks WHERE symbol = ?", [symbol])[0]["s"]
+            self._add_holding(user_id, book, holding_id, symbol, quantity, avg_price, added_at, sector)
+            book.version = (book.version[0] + 1, book.version[1] + holding_id)
+
+    def on_holding_removed(self, user_id: str, holding_id: int):
+        with self._lock:
+            book = self._books.get(user_id)
+            if book is None or holding_id not in book.holdings:
+                return
+            symbol, quantity, cost, _ = book.holdings.pop(holding_id)
+            book.version = (book.version[0] - 1, book.version[1] - holding_id)
+            pos = book.positions[symbol]
+            px = self._prices.get(symbol)
+            book.apply(pos, px, -1)
+            pos.quantity -= quantity
+            pos.cost -= cost
+            if any(h[0] == symbol for h in book.holdings.values()):
+                book.apply(pos, px, +1)
+            else:
+                del book.positions[symbol]
+                self._holders[symbol].discard(user_id)
+
+    def sync_prices(self) -> int:
+        """Apply quotes written since the last sync to every held symbol."""
+        with self._lock:
+            high = self._max_quote_id()
+            updated = self._fetch_prices(set(self._holders), self._last_quote_id, high)
+            self._last_quote_id = high
+            self._last_sync = time.monotonic()
+            return updated
+
+    def on_quotes_written(self, min_id: int, max_id: int):
+        if self._holders:
+            self.sync_prices()
+
+    # ---------- reads ----------
+
+    def snapshot(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            if time.monotonic() - self._last_sync > settings.PORTFOLIO_PRICE_SYNC_SECONDS:
+                self.sync_prices()
+            book = self._book(user_id)
+            mv = book.market_value
+            n = sum(1 for s in book.positions if s in self._prices)
+            hhi = book.sum_sq_value / (mv * mv) if mv else 0.0
+            return {
+                "user_id": user_id,
+                "market_value": mv,
+                "cost_basis": book.cost_basis,
+                "unrealized_pnl": mv - book.priced_cost,
+                "day_pnl": book.day_pnl,
+                "positions": len(book.positions),
+                "hhi": hhi,
+                # 1 - HHI normalised to [0, 100]; 100 = equal-weighted across all positions
+                "diversification_score": (1 - hhi) / (1 - 1 / n) * 100 if n > 1 else 0.0,
+                "sector_weights": {s: v / mv for s, v in book.sector_values.items() if mv and abs(v) > 1e-9},
+            }
+
+    def positions(self, user_id: str) -> Dict[str, float]:
+        """Current market value per priced position."""
+        with self._lock:
+            book = self._book(user_id)
+            return {
+                s: pos.quantity * self._prices[s][0] for s, pos in book.positions.items() if s in self._prices
+            }
+
+    def cash_flows(self, user_id: str) -> List[Tuple[Any, float]]:
+        """(buy date, cost) per holding with a known price, for XIRR."""
+        with self._lock:
+            book = self._book(user_id)
+            return [(h[3], h[2]) for h in book.holdings.values() if h[0] in self._prices]
+
+
+portfolio_analytics = PortfolioAnalytics()
+quote_buffer.add_batch_listener(portfolio_analytics.on_quotes_written)
@@ -1,13 +1,17 @@
+from datetime import date
 from typing import List, Dict
 from app.core.database import db_manager
+from app.core.security_master import security_master
 from .models import HoldingCreate
+from .analytics import portfolio_analytics
 
 def create_holding(user_id:str, h:HoldingCreate) -> int:
-    sql = """INSERT INTO portfolio(user_id,symbol,quantity,avg_price,added_at)
-             VALUES(?,?,?,?,CURRENT_DATE)"""
-    db_manager.execute_insert(sql, [user_id, h.symbol, h.quantity, h.avg_price])
-    # Return inserted record id or count (simplified here)
-    return 1
+    sec_id = security_master.resolve(h.symbol, "NSE") or security_master.resolve(h.symbol, "BSE")
+    sql = """INSERT INTO portfolio(user_id,symbol,sec_id,quantity,avg_price,added_at)
+             VALUES(?,?,?,?,?,CURRENT_DATE) RETURNING id"""
+    hid = db_manager.execute_query(sql, [user_id, h.symbol, sec_id, h.quantity, h.avg_price])[0]['id']
+    portfolio_analytics.on_holding_added(user_id, hid, h.symbol, h.quantity, h.avg_price, date.today())
+    return hid
 
 def list_holdings(user_id:str) -> List[Dict]:
     sql = "SELECT * FROM portfolio WHERE user_id=?"
@@ -16,3 +20,4 @@ def list_holdings(user_id:str) -> List[Dict]:
 def delete_holding(user_id:str, hid:int):
     sql = "DELETE FROM portfolio WHERE user_id=? AND id=?"
     db_manager.execute_insert(sql, [user_id, hid])
+    portfolio_analytics.on_holding_removed(user_id, hid)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date
 
 class HoldingCreate(BaseModel):
@@ -8,11 +8,25 @@ class HoldingCreate(BaseModel):
     avg_price: float
 
 class Holding(HoldingCreate):
-    id: Optional[int]
-    user_id: Optional[str]
-    added_at: Optional[date]
-    current_value: Optional[float]
-    unrealized_pnl: Optional[float]
+    id: Optional[int] = None
+    user_id: Optional[str] = None
+    added_at: Optional[date] = None
+    sector: Optional[str] = None
+    price: Optional[float] = None
+    current_value: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    unrealized_pnl_pct: Optional[float] = None
+    weight: Optional[float] = None
+
+class PortfolioValuation(BaseModel):
+    user_id: str
+    total_value: float
+    total_cost: float
+    unrealized_pnl: float
+    unrealized_pnl_pct: float
+    unpriced: List[str]
+    sector_exposure: Dict[str, float]
+    holdings: List[Holding]
 
 class PortfolioHealth(BaseModel):
     total_value: float
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+ADJUSTED_CLOSES_SQL = """
+SELECT b.symbol, b.date, b.close * COALESCE(f.cum_split_factor, 1.0) AS adj_close
+FROM primary_daily_bars b
+ASOF LEFT JOIN adjustment_factors f ON b.sec_id = f.sec_id AND b.date < f.ex_date
+WHERE b.date >= ?
+"""
+
+
+class RiskModel:
+    """
+    Universe-wide Ledoit-Wolf shrunk covariance of daily returns, shared by all users.
+
+    Returns (split-adjusted, zero-mean assumption as usual for daily risk) are kept
+    for a rolling window of RISK_WINDOW_DAYS together with the running sums the
+    estimator needs: sum of x x' and sum of ||x||^4. A new trading day adds one row
+    and drops the oldest, so the daily update is O(p^2) instead of a full rescan.
+    Shrinkage targets the scaled identity (Ledoit & Wolf, 2004).
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window or settings.RISK_WINDOW_DAYS
+        self._lock = threading.RLock()
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._seen: set = set()  # every symbol considered at the last rebuild, incl. filtered ones
+        self._rows: Deque[Tuple[date, np.ndarray]] = deque()
+        self._sum_xx: Optional[np.ndarray] = None
+        self._sum_norm4 = 0.0
+        self._last_close: Optional[pd.Series] = None
+        self.last_date: Optional[date] = None
+        self.covariance: Optional[np.ndarray] = None
+        self.shrinkage: Optional[float] = None
+        self._checked_at = 0.0
+
+    # ---------- estimation ----------
+
+    def _closes(self, since: date) -> pd.DataFrame:
+        rows = db_manager.execute_query(ADJUSTED_CLOSES_SQL, [since])
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).pivot(index="date", columns="symbol", values="adj_close").sort_index()
+
+    def _add_row(self, day: date, x: np.ndarray):
+        self._rows.append((day, x))
+        self._sum_xx += np.outer(x, x)
+        self._sum_norm4 += float(x @ x) ** 2
+        while len(self._rows) > self.window:
+            _, old = self._rows.popleft()
+            self._sum_xx -= np.outer(old, old)
+            self._sum_norm4 -= float(old @ old) ** 2
+
+    def _estimate(self):
+        n = len(self._rows)
+        p = len(self.symbols)
+        if n < 2 or not p:
+            self.covariance, self.shrinkage = None, None
+            return
+        s = self._sum_xx / n
+        mu = np.trace(s) / p
+        target = mu * np.eye(p)
+        d2 = float(((s - target) ** 2).sum())
+        # (1/n^2) sum_k ||x_k x_k' - S||_F^2, with ||x x'||_F^2 = ||x||^4
+        b2_bar = max(0.0, (self._sum_norm4 / n - float((s ** 2).sum())) / n)
+        shrink = min(b2_bar, d2) / d2 if d2 > 0 else 1.0
+        self.covariance = shrink * target + (1 - shrink) * s
+        self.shrinkage = shrink
+
+    def rebuild(self):
+        """Full estimate from the last RISK_WINDOW_DAYS trading days of daily_bars."""
+        with self._lock:
+            closes = self._closes(date.today() - timedelta(days=int(self.window * 1.6) + 10))
+            returns = closes.pct_change().iloc[1:]
+            # Symbols with too little history would only add noise to the shared matrix
+            returns = returns.loc[:, returns.count() >= min(settings.RISK_MIN_OBSERVATIONS, len(returns))]
+            returns = returns.tail(self.window)
+            self.symbols = list(returns.columns)
+            self._seen = set(closes.columns)
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+            self._rows = deque()
+            self._sum_xx = np.zeros((len(self.symbols), len(self.symbols)))
+            self._sum_norm4 = 0.0
+            for day, values in zip(returns.index, returns.fillna(0.0).to_numpy()):
+                self._add_row(day, values)
+            self._last_close = closes[self.symbols].ffill().iloc[-1] if len(closes) else None
+            self.last_date = closes.index[-1] if len(closes) else None
+            self._estimate()
+            logger.info(
+                f"Risk model rebuilt | symbols={len(self.symbols)} days={len(self._rows)} shrinkage={self.shrinkage}"
+            )
+
+    def update(self):
+        """Roll the window forward over any trading days added to daily_bars since the last update."""
+        with self._lock:
+            if self.last_date is None:
+                return self.rebuild()
+            closes = self._closes(self.last_date)
+            if closes.empty or closes.index[-1] <= self.last_date:
+                return
+            if set(closes.columns) - self._seen:
+                # Universe changed: re-select symbols over the full window
+                return self.rebuild()
+            closes = closes.reindex(columns=self.symbols)
+            # The fetch starts at last_date, so each new return divides two closes adjusted by
+            # the same (current) factors; symbols without a bar that day use the stored close
+            prev = closes.iloc[0].fillna(self._last_close)
+            for day, row in closes.iloc[1:].iterrows():
+                x = (row / prev - 1.0).fillna(0.0).to_numpy()
+                self._add_row(day, x)
+                prev = row.fillna(prev)
+            self._last_close = prev
+            self.last_date = closes.index[-1]
+            self._estimate()
+            logger.info(f"Risk model rolled forward to {self.last_date} (shrinkage={self.shrinkage:.3f})")
+
+    def ensure_current(self):
+        """Bring the model up to date with daily_bars; checked at most every RISK_CHECK_SECONDS."""
+        with self._lock:
+            if self.covariance is not None and time.monotonic() - self._checked_at < settings.RISK_CHECK_SECONDS:
+                return
+            self._checked_at = time.monotonic()
+            latest = db_manager.execute_query("SELECT MAX(date) AS d FROM daily_bars")[0]["d"]
+            if self.last_date is None or (latest is not None and latest > self.last_date):
+                self.update()
+
+    # ---------- portfolio risk ----------
+
+    def portfolio_risk(
+        self, positions_batch: Sequence[Dict[str, float]], confidence: float = 0.95, horizon_days: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        VaR/CVaR (parametric and historical) and marginal risk contributions for many
+        portfolios at once. Each portfolio is {symbol: market value}; values in symbols
+        without enough history are reported as uncovered.
+        """
+        self.ensure_current()
+        with self._lock:
+            p = len(self.symbols)
+            k = len(positions_batch)
+            values = np.zeros((k, p))
+            uncovered: List[Dict[str, float]] = []
+            for i, positions in enumerate(positions_batch):
+                missing = {}
+                for symbol, value in positions.items():
+                    j = self._index.get(symbol)
+                    if j is None:
+                        missing[symbol] = value
+                    else:
+                        values[i, j] += value
+                uncovered.append(missing)
+            if self.covariance is None or not p:
+                return [{"covered_value": 0.0, "uncovered": u} for u in uncovered]
+
+            totals = values.sum(axis=1)
+            safe_totals = np.where(totals != 0, totals, 1.0)
+            weights = values / safe_totals[:, None]
+            cov_w = weights @ self.covariance            # (k, p)
+            sigma_1d = np.sqrt(np.maximum(np.einsum("ij,ij->i", cov_w, weights), 0.0))
+            sigma = sigma_1d * np.sqrt(horizon_days)
+            z = norm.ppf(confidence)
+            var_param = z * sigma
+            cvar_param = norm.pdf(z) / (1 - confidence) * sigma
+
+            history = np.array([x for _, x in self._rows])  # (n, p)
+            pnl = history @ weights.T * np.sqrt(horizon_days)  # (n, k) portfolio returns
+            cutoff = np.quantile(pnl, 1 - confidence, axis=0)
+            var_hist = -cutoff
+            tail = np.where(pnl <= cutoff, pnl, np.nan)
+            cvar_hist = -np.nanmean(tail, axis=0)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                marginal = np.nan_to_num(cov_w / sigma_1d[:, None])  # d sigma / d w (1-day)
+            component = weights * marginal  # sums to sigma_1d over the holdings
+
+            results = []
+            for i in range(k):
+                held = np.flatnonzero(values[i])
+                total_sigma = component[i, held].sum()
+                results.append({
+                    "covered_value": float(totals[i]),
+                    "volatility": float(sigma[i]),
+                    "var_parametric": float(var_param[i]),
+                    "cvar_parametric": float(cvar_param[i]),
+                    "var_historical": float(var_hist[i]),
+                    "cvar_historical": float(cvar_hist[i]),
+                    "var_parametric_amount": float(var_param[i] * totals[i]),
+                    "var_historical_amount": float(var_hist[i] * totals[i]),
+                    "risk_contributions": {
+                        self.symbols[j]: {
+                            "weight": float(weights[i, j]),
+                            "marginal": float(marginal[i, j]),
+                            "contribution_pct": float(component[i, j] / total_sigma * 100) if total_sigma else 0.0,
+                        }
+                        for j in held
+                    },
+                    "uncovered": uncovered[i],
+                })
+            return results
+
+
+risk_model = RiskModel()
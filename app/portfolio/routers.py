@@ -1,25 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
-from .models import Holding, HoldingCreate, PortfolioHealth
-from .crud import create_holding, list_holdings, delete_holding
+from .models import Holding, HoldingCreate, PortfolioHealth, PortfolioValuation
+from .crud import create_holding, delete_holding
 from .services import compute_health
+from .valuation import valuation_engine
+from .analytics import portfolio_analytics
+from .risk import risk_model
 from app.core.security import get_current_user
 
 router = APIRouter(prefix="/api/v3/portfolio", tags=["Portfolio"])
 
 @router.post("/holdings", response_model=int)
 def add_holding(h: HoldingCreate, user=Depends(get_current_user)):
-    return create_holding(user.id, h)
+    return create_holding(user.username, h)
 
 @router.get("/holdings", response_model=List[Holding])
 def get_holdings(user=Depends(get_current_user)):
-    return list_holdings(user.id)
+    return valuation_engine.value_portfolio(user.username)["holdings"]
 
 @router.delete("/holdings/{hid}")
 def remove_holding(hid: int, user=Depends(get_current_user)):
-    delete_holding(user.id, hid)
+    delete_holding(user.username, hid)
     return {"status": "deleted"}
 
 @router.get("/health", response_model=PortfolioHealth)
 def health(user=Depends(get_current_user)):
-    return compute_health(user.id)
+    return compute_health(user.username)
+
+@router.get("/analytics")
+def analytics(user=Depends(get_current_user)):
+    return portfolio_analytics.snapshot(user.username)
+
+@router.get("/risk")
+def risk(
+    confidence: float = Query(0.95, gt=0.5, lt=1.0),
+    horizon_days: int = Query(1, ge=1, le=250),
+    user=Depends(get_current_user),
+):
+    positions = portfolio_analytics.positions(user.username)
+    return risk_model.portfolio_risk([positions], confidence, horizon_days)[0]
+
+@router.get("/valuation", response_model=PortfolioValuation)
+def valuation(user=Depends(get_current_user)):
+    return valuation_engine.value_portfolio(user.username)
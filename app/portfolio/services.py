@@ -1,44 +1,33 @@
 from datetime import datetime
 from typing import List
-from .crud import list_holdings
 from .models import PortfolioHealth
-from app.core.database import db_manager
+from .analytics import portfolio_analytics
+from .risk import risk_model
+from .xirr import xirr as solve_xirr
 
-def calculate_xirr(dates, amounts) -> float:
-    # Simplified placeholder XIRR calculation
-    return 12.5
+def calculate_xirr(dates, amounts, guess=None) -> float:
+    # Annualised XIRR in percent; 0.0 when undefined (no outflow/inflow pair)
+    rate = solve_xirr(dates, amounts, guess)
+    return rate * 100 if rate is not None else 0.0
 
-def diversification_score(holdings) -> float:
-    # Simplified diversification scoring
-    return 75.0
-
-def risk_exposure(holdings) -> float:
-    # Simplified risk scoring
-    return 30.0
+def risk_exposure(user_id: str) -> float:
+    # 1-day 95% parametric VaR as a percent of the covered portfolio value
+    risk = risk_model.portfolio_risk([portfolio_analytics.positions(user_id)])[0]
+    return risk.get('var_parametric', 0.0) * 100
 
 def compute_health(user_id: str) -> PortfolioHealth:
-    holdings = list_holdings(user_id)
-    total_value = 0.0
-    dates, amts = [], []
-
-    for h in holdings:
-        latest_quote = db_manager.execute_query(
-            "SELECT price FROM quotes WHERE symbol=? ORDER BY timestamp DESC LIMIT 1", [h['symbol']]
-        )
-        price = latest_quote[0]['price'] if latest_quote else 0
-        current_val = price * h['quantity']
-        total_value += current_val
-        dates.append(h['added_at'])
-        amts.append(-h['avg_price'] * h['quantity'])
-    dates.append(datetime.utcnow().date())
-    amts.append(total_value)
+    snap = portfolio_analytics.snapshot(user_id)
+    flows = portfolio_analytics.cash_flows(user_id)
+    today = datetime.utcnow().date()
+    dates = [d or today for d, _ in flows] + [today]
+    amts = [-cost for _, cost in flows] + [snap['market_value']]
 
     xirr = calculate_xirr(dates, amts)
 
     return PortfolioHealth(
-        total_value=total_value,
+        total_value=snap['market_value'],
         xirr=xirr,
-        health_score=diversification_score(holdings),
-        diversification_score=diversification_score(holdings),
-        risk_exposure=risk_exposure(holdings)
+        health_score=snap['diversification_score'],
+        diversification_score=snap['diversification_score'],
+        risk_exposure=risk_exposure(user_id)
     )
@@ -0,0 +1,157 @@
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+from loguru import logger
+from app.core.database import db_manager
+from .xirr import xirr_batch
+
+# One pass: holdings of the requested users joined with the latest price per held
+# symbol (latest quote, falling back to the last daily close) and the stock's sector.
+# Market value, cost, P&L and weights are computed column-wise by DuckDB.
+VALUATION_SQL = """
+WITH h AS (
+    SELECT * FROM portfolio {filter}
+),
+px AS (
+    SELECT symbol, CAST(price AS DOUBLE) AS price, timestamp AS priced_at
+    FROM quotes
+    WHERE symbol IN (SELECT DISTINCT symbol FROM h)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC, id DESC) = 1
+),
+eod AS (
+    SELECT symbol, arg_max(close, date) AS close, MAX(date) AS priced_on
+    FROM primary_daily_bars
+    WHERE symbol IN (SELECT DISTINCT symbol FROM h)
+    GROUP BY symbol
+),
+valued AS (
+    SELECT h.id, h.user_id, h.symbol, h.sec_id, h.quantity, h.avg_price, h.added_at,
+           COALESCE(s.sector, 'Unknown') AS sector,
+           COALESCE(px.price, eod.close) AS price,
+           COALESCE(px.priced_at, CAST(eod.priced_on AS TIMESTAMP)) AS priced_at,
+           h.quantity * h.avg_price AS cost_value,
+           h.quantity * COALESCE(px.price, eod.close) AS current_value
+    FROM h
+    LEFT JOIN px ON px.symbol = h.symbol
+    LEFT JOIN eod ON eod.symbol = h.symbol
+    LEFT JOIN primary_stocks s ON s.symbol = h.symbol
+)
+SELECT *,
+       current_value - cost_value AS unrealized_pnl,
+       (current_value - cost_value) / NULLIF(cost_value, 0) * 100 AS unrealized_pnl_pct,
+       current_value / NULLIF(SUM(current_value) OVER (PARTITION BY user_id), 0) AS weight
+FROM valued
+ORDER BY user_id, current_value DESC NULLS LAST
+"""
+
+
+def _summarize(user_id: str, holdings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    priced = [h for h in holdings if h["price"] is not None]
+    total_value = sum(h["current_value"] for h in priced)
+    total_cost = sum(h["cost_value"] or 0.0 for h in holdings)
+    # P&L only over priced holdings; an unpriced holding is not a 100% loss
+    priced_cost = sum(h["cost_value"] or 0.0 for h in priced)
+    pnl = total_value - priced_cost
+    sectors: Dict[str, float] = {}
+    for h in holdings:
+        if h["weight"] is not None:
+            sectors[h["sector"]] = sectors.get(h["sector"], 0.0) + h["weight"]
+    return {
+        "user_id": user_id,
+        "total_value": total_value,
+        "total_cost": total_cost,
+        "unrealized_pnl": pnl,
+        "unrealized_pnl_pct": pnl / priced_cost * 100 if priced_cost else 0.0,
+        "unpriced": [h["symbol"] for h in holdings if h["price"] is None],
+        "sector_exposure": dict(sorted(sectors.items(), key=lambda kv: kv[1], reverse=True)),
+        "holdings": holdings,
+    }
+
+
+def portfolio_flows(valuation: Dict[str, Any], as_of: date):
+    """Cash flows for a portfolio XIRR: each priced holding's cost on its buy date, terminal value on as_of."""
+    priced = [h for h in valuation["holdings"] if h["price"] is not None]
+    dates = [h["added_at"] or as_of for h in priced] + [as_of]
+    amounts = [-h["cost_value"] for h in priced] + [valuation["total_value"]]
+    return dates, amounts
+
+
+def _previous(table: str, key: str, as_of: date) -> Dict[Any, float]:
+    rows = db_manager.execute_query(
+        f"""
+        SELECT {key} AS k, xirr FROM {table}
+        WHERE snapshot_date = (SELECT MAX(snapshot_date) FROM {table} WHERE snapshot_date < ?)
+        """,
+        [as_of],
+    )
+    return {r["k"]: r["xirr"] for r in rows}
+
+
+class PortfolioValuationEngine:
+    """Values portfolios with one set-based query, for one user or every user at once."""
+
+    def _value(self, user_ids: Optional[Sequence[str]]) -> Dict[str, Dict[str, Any]]:
+        params = None
+        filter_sql = ""
+        if user_ids is not None:
+            filter_sql = "WHERE user_id IN (SELECT UNNEST(?))"
+            params = [list(user_ids)]
+        rows = db_manager.execute_query(VALUATION_SQL.format(filter=filter_sql), params)
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_user.setdefault(row["user_id"], []).append(row)
+        return {user_id: _summarize(user_id, holdings) for user_id, holdings in by_user.items()}
+
+    def value_portfolio(self, user_id: str) -> Dict[str, Any]:
+        return self._value([user_id]).get(user_id) or _summarize(user_id, [])
+
+    def value_all(self) -> Dict[str, Dict[str, Any]]:
+        return self._value(None)
+
+    def snapshot_all(self, as_of: Optional[date] = None) -> int:
+        """
+        Value every portfolio and store one portfolio_snapshots row per user and one
+        holding_snapshots row per holding for `as_of`. Portfolio and holding XIRRs are
+        solved in two batch calls, warm-started from the previous snapshot's values.
+        """
+        as_of = as_of or date.today()
+        valuations = list(self.value_all().values())
+        holdings = [h for v in valuations for h in v["holdings"]]
+
+        prev_users = _previous("portfolio_snapshots", "user_id", as_of)
+        user_xirr = xirr_batch(
+            [portfolio_flows(v, as_of) for v in valuations],
+            [prev_users.get(v["user_id"]) for v in valuations],
+        ) if valuations else []
+        prev_holdings = _previous("holding_snapshots", "holding_id", as_of)
+        holding_xirr = xirr_batch(
+            [([h["added_at"] or as_of, as_of], [-h["cost_value"], h["current_value"] or 0.0]) for h in holdings],
+            [prev_holdings.get(h["id"]) for h in holdings],
+        ) if holdings else []
+
+        def _rate(x):
+            return None if x != x else float(x)  # NaN -> NULL
+
+        with db_manager.transaction():
+            db_manager.execute_insert("DELETE FROM portfolio_snapshots WHERE snapshot_date = ?", [as_of])
+            db_manager.execute_insert("DELETE FROM holding_snapshots WHERE snapshot_date = ?", [as_of])
+            db_manager.bulk_insert(
+                "portfolio_snapshots",
+                ["snapshot_date", "user_id", "total_value", "total_cost", "unrealized_pnl", "holdings_count", "xirr"],
+                [
+                    [as_of, v["user_id"], v["total_value"], v["total_cost"], v["unrealized_pnl"], len(v["holdings"]), _rate(x)]
+                    for v, x in zip(valuations, user_xirr)
+                ],
+            )
+            db_manager.bulk_insert(
+                "holding_snapshots",
+                ["snapshot_date", "holding_id", "user_id", "symbol", "price", "current_value", "xirr"],
+                [
+                    [as_of, h["id"], h["user_id"], h["symbol"], h["price"], h["current_value"], _rate(x)]
+                    for h, x in zip(holdings, holding_xirr)
+                ],
+            )
+        logger.info(f"Portfolio snapshots written for {len(valuations)} users, {len(holdings)} holdings ({as_of})")
+        return len(valuations)
+
+
+valuation_engine = PortfolioValuationEngine()
@@ -0,0 +1,105 @@
+from datetime import date, datetime
+from typing import Optional, Sequence, Tuple, Union
+import numpy as np
+from scipy.optimize import brentq
+
+DateLike = Union[date, datetime, np.datetime64, str]
+CashFlows = Tuple[Sequence[DateLike], Sequence[float]]
+
+DAYS_PER_YEAR = 365.0
+MIN_RATE = -0.999999
+MAX_RATE = 1e6
+
+
+def _pack(flows: Sequence[CashFlows]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad N cash-flow series into (N, M) amount and year-fraction matrices (zero padding is NPV-neutral)."""
+    n = len(flows)
+    lengths = np.fromiter((len(amounts) for _, amounts in flows), dtype=np.int64, count=n)
+    m = int(lengths.max()) if n else 0
+    # Convert every date and amount in one pass, then scatter into the padded matrices
+    rows = np.repeat(np.arange(n), lengths)
+    cols = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = np.array(
+        [np.datetime64(d, "D") if isinstance(d, str) else d for dates, _ in flows for d in dates],
+        dtype="datetime64[D]",
+    ).astype(np.int64)
+    first = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(first, rows, days)
+    amounts = np.zeros((n, m))
+    years = np.zeros((n, m))
+    amounts[rows, cols] = np.fromiter((a for _, amts in flows for a in amts), dtype=np.float64, count=len(rows))
+    years[rows, cols] = (days - first[rows]) / DAYS_PER_YEAR
+    return amounts, years
+
+
+def _npv(rate: float, amounts: np.ndarray, years: np.ndarray) -> float:
+    return float((amounts * (1.0 + rate) ** -years).sum())
+
+
+def _brent(amounts: np.ndarray, years: np.ndarray) -> float:
+    lo, hi = MIN_RATE, 1.0
+    f_lo = _npv(lo, amounts, years)
+    while hi <= MAX_RATE and np.sign(_npv(hi, amounts, years)) == np.sign(f_lo):
+        hi *= 10
+    if hi > MAX_RATE:
+        return np.nan
+    return brentq(_npv, lo, hi, args=(amounts, years), xtol=1e-12, maxiter=200)
+
+
+def xirr_batch(
+    flows: Sequence[CashFlows],
+    guesses: Optional[Sequence[Optional[float]]] = None,
+    tol: float = 1e-9,
+    max_iter: int = 50,
+) -> np.ndarray:
+    """
+    Solve XIRR for many cash-flow series at once.
+
+    All series take vectorised Newton steps together on padded (N, M) arrays;
+    series that diverge or fail to converge fall back to a scalar Brent solve.
+    Warm-start with `guesses` (e.g. yesterday's XIRR). Returns annual rates as
+    fractions; NaN where no solution exists (flows without both signs).
+    """
+    amounts, years = _pack(flows)
+    n = len(flows)
+    rate = np.full(n, 0.1)
+    if guesses is not None:
+        g = np.array([np.nan if x is None else x for x in guesses], dtype=np.float64)
+        rate = np.where(np.isfinite(g) & (g > MIN_RATE), g, rate)
+
+    solvable = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+    active = solvable.copy()
+    converged = np.zeros(n, dtype=bool)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            r = rate[active]
+            a, t = amounts[active], years[active]
+            base = 1.0 + r[:, None]
+            disc = base ** -t
+            f = (a * disc).sum(axis=1)
+            df = (-t * a * disc / base).sum(axis=1)
+            step = f / df
+            new = r - step
+
+            idx = np.flatnonzero(active)
+            # Steps past -100% are damped to halfway towards -1 instead of abandoned
+            overshoot = np.isfinite(new) & (new <= -1.0)
+            new[overshoot] = (r[overshoot] - 1.0) / 2.0
+            bad = ~np.isfinite(new)
+            done = ~bad & (np.abs(step) <= tol * np.maximum(1.0, np.abs(new)))
+            rate[idx[~bad]] = new[~bad]
+            converged[idx[done]] = True
+            active[idx[bad | done]] = False
+
+    for i in np.flatnonzero(solvable & ~converged):
+        rate[i] = _brent(amounts[i], years[i])
+    rate[~solvable] = np.nan
+    return rate
+
+
+def xirr(dates: Sequence[DateLike], amounts: Sequence[float], guess: Optional[float] = None) -> Optional[float]:
+    """Annualised XIRR of one cash-flow series as a fraction, or None if undefined."""
+    rate = xirr_batch([(dates, amounts)], [guess])[0]
+    return None if np.isnan(rate) else float(rate)
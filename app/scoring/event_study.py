@@ -0,0 +1,211 @@
+import warnings
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app.core.config import settings
+from app.core.database import db_manager
+
+ESTIMATION_WINDOW = (-250, -31)  # trading days relative to the event day, inclusive
+EVENT_WINDOW = (-5, 20)
+PRIOR_EVENTS = 20  # empirical statistics are shrunk towards "no reaction" with this weight
+
+# Sector and market-cap bucket per symbol (rank-based like the SEBI categories:
+# top 100 large, next 150 mid, rest small) so no units are assumed for market_cap.
+STOCK_BUCKETS_SQL = """
+SELECT symbol, COALESCE(sector, 'Unknown') AS sector,
+       CASE WHEN market_cap IS NULL THEN 'UNKNOWN'
+            WHEN ROW_NUMBER() OVER (ORDER BY market_cap DESC NULLS LAST) <= 100 THEN 'LARGE'
+            WHEN ROW_NUMBER() OVER (ORDER BY market_cap DESC NULLS LAST) <= 250 THEN 'MID'
+            ELSE 'SMALL' END AS cap_bucket
+FROM primary_stocks
+"""
+
+TOTAL_RETURN_CLOSES_SQL = """
+SELECT b.symbol, b.date, b.close * COALESCE(f.cum_total_factor, 1.0) AS px
+FROM primary_daily_bars b
+ASOF LEFT JOIN adjustment_factors f ON b.sec_id = f.sec_id AND b.date < f.ex_date
+WHERE b.date >= ?
+"""
+
+STATS_SQL = f"""
+INSERT INTO event_study_stats
+    (event_type, sector, cap_bucket, n_events, mean_car, median_car, std_car, hit_rate, t_stat,
+     mean_car_pre, mean_car_post, computed_at)
+SELECT event_type, COALESCE(sector, 'ALL'), COALESCE(cap_bucket, 'ALL'),
+       COUNT(*), AVG(car), MEDIAN(car), STDDEV_SAMP(car),
+       AVG(CASE WHEN car > 0 THEN 1.0 ELSE 0.0 END),
+       AVG(car) / NULLIF(STDDEV_SAMP(car) / SQRT(COUNT(*)), 0),
+       AVG(car_pre), AVG(car_post), CURRENT_TIMESTAMP
+FROM (
+    SELECT c.event_type, c.car, c.car_pre, c.car_post,
+           COALESCE(s.sector, 'Unknown') AS sector, COALESCE(s.cap_bucket, 'UNKNOWN') AS cap_bucket
+    FROM event_car c LEFT JOIN ({STOCK_BUCKETS_SQL}) s USING (symbol)
+    WHERE c.car IS NOT NULL
+)
+GROUP BY GROUPING SETS ((event_type, sector, cap_bucket), (event_type, sector), (event_type))
+"""
+
+
+def study_match_sql(source: str) -> str:
+    """
+    Wrap a query with `symbol` and `event_type` columns, adding the symbol's sector
+    and cap bucket and the most specific event-study group available
+    (type+sector+cap, then type+sector, then type), plus the empirical scores
+    shrunk towards "no reaction" by PRIOR_EVENTS.
+    """
+    return f"""
+    SELECT m.*,
+           LEAST(100, GREATEST(0, 50 + 500 * COALESCE(m.mean_car, 0) * m.study_events / (m.study_events + {PRIOR_EVENTS}.0))) AS study_fund_score,
+           (COALESCE(m.hit_rate, 0.5) * m.study_events + 0.5 * {PRIOR_EVENTS}) / (m.study_events + {PRIOR_EVENTS}.0) AS study_impact_prob
+    FROM (
+        SELECT src.*,
+               COALESCE(b.sector, 'Unknown') AS sector, COALESCE(b.cap_bucket, 'UNKNOWN') AS cap_bucket,
+               CASE WHEN s1.event_type IS NOT NULL THEN 'type_sector_cap'
+                    WHEN s2.event_type IS NOT NULL THEN 'type_sector'
+                    WHEN s3.event_type IS NOT NULL THEN 'type' END AS study_level,
+               COALESCE(s1.n_events, s2.n_events, s3.n_events, 0) AS study_events,
+               COALESCE(s1.mean_car, s2.mean_car, s3.mean_car) AS mean_car,
+               COALESCE(s1.hit_rate, s2.hit_rate, s3.hit_rate) AS hit_rate,
+               COALESCE(s1.computed_at, s2.computed_at, s3.computed_at) AS study_computed_at
+        FROM ({source}) src
+        LEFT JOIN ({STOCK_BUCKETS_SQL}) b ON b.symbol = src.symbol
+        LEFT JOIN event_study_stats s1
+               ON s1.event_type = src.event_type AND s1.sector = b.sector AND s1.cap_bucket = b.cap_bucket
+        LEFT JOIN event_study_stats s2
+               ON s2.event_type = src.event_type AND s2.sector = b.sector AND s2.cap_bucket = 'ALL'
+        LEFT JOIN event_study_stats s3
+               ON s3.event_type = src.event_type AND s3.sector = 'ALL' AND s3.cap_bucket = 'ALL'
+    ) m
+    """
+
+
+class EventStudyJob:
+    """
+    Market-model event study over every past corporate action.
+
+    For each event, alpha and beta are fitted by OLS on trading days [-250, -31]
+    against EVENT_STUDY_MARKET_INDEX (or the equal-weighted universe), and
+    abnormal returns are summed over [-5, +20]. All events are solved together
+    on gathered (events x days) arrays. Per-event CARs are kept in event_car, so
+    a nightly run only computes events whose window has completed since the
+    last run. event_study_stats is then re-aggregated from event_car.
+    """
+
+    def _returns(self, since: date) -> pd.DataFrame:
+        rows = db_manager.execute_query(TOTAL_RETURN_CLOSES_SQL, [since])
+        if not rows:
+            return pd.DataFrame()
+        closes = pd.DataFrame(rows).pivot(index="date", columns="symbol", values="px").sort_index()
+        return closes.pct_change(fill_method=None)
+
+    def _market(self, returns: pd.DataFrame) -> np.ndarray:
+        rows = db_manager.execute_query(
+            "SELECT date, value FROM index_history WHERE index_name = ? AND date >= ? ORDER BY date",
+            [settings.EVENT_STUDY_MARKET_INDEX, returns.index[0]],
+        )
+        if rows:
+            levels = pd.Series({r["date"]: r["value"] for r in rows}).reindex(returns.index)
+            market = levels.pct_change(fill_method=None).to_numpy()
+            if np.isfinite(market).mean() > 0.9:
+                return market
+            logger.warning(f"{settings.EVENT_STUDY_MARKET_INDEX} history is patchy; using the equal-weighted universe")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # days without any return stay NaN
+            return np.nanmean(returns.to_numpy(), axis=1)
+
+    def run(self, rebuild: bool = False) -> int:
+        """Compute CARs for events not yet in event_car (all with rebuild=True); returns events added."""
+        if rebuild:
+            db_manager.execute_insert("DELETE FROM event_car")
+        events = db_manager.execute_query(
+            """
+            SELECT a.id, a.symbol, a.type, a.event_date
+            FROM corporate_actions a
+            LEFT JOIN event_car c ON c.event_id = a.id
+            WHERE c.event_id IS NULL AND a.event_date IS NOT NULL AND a.event_date < CURRENT_DATE
+            """
+        )
+        added = self._compute(events) if events else 0
+        with db_manager.transaction():
+            db_manager.execute_insert("DELETE FROM event_study_stats")
+            db_manager.execute_insert(STATS_SQL)
+        logger.info(f"Event study: {added} new events, statistics re-aggregated")
+        return added
+
+    def _compute(self, events) -> int:
+        first = min(e["event_date"] for e in events)
+        returns = self._returns(first - timedelta(days=int(-ESTIMATION_WINDOW[0] * 1.6) + 10))
+        if returns.empty:
+            return 0
+        market = self._market(returns)
+        r = returns.to_numpy()
+        n_days = len(returns)
+        col = {s: i for i, s in enumerate(returns.columns)}
+        days = returns.index.to_numpy()
+
+        # Event day = first trading day on or after the event date
+        t0 = np.searchsorted(days, np.array([e["event_date"] for e in events], dtype=object))
+        # Events whose window has not finished yet are left for a later run
+        complete = t0 + EVENT_WINDOW[1] < n_days
+        done = [(e, t) for e, t, ok in zip(events, t0, complete) if ok]
+        # A symbol without bars gets a row without a CAR, so the event is not retried every night
+        rows = [
+            [e["id"], e["symbol"], e["type"], e["event_date"], None, None, None, None, None, 0]
+            for e, _ in done if e["symbol"] not in col
+        ]
+        known = [e for e, _ in done if e["symbol"] in col]
+        if not known:
+            return self._store(rows)
+        sym = np.array([col[e["symbol"]] for e in known])
+        t0 = np.array([t for e, t in done if e["symbol"] in col])
+
+        def gather(offsets):
+            idx = t0[:, None] + np.arange(offsets[0], offsets[1] + 1)
+            inside = idx >= 0
+            idx = np.clip(idx, 0, n_days - 1)
+            y, x = r[idx, sym[:, None]], market[idx]
+            return np.where(inside, y, np.nan), np.where(inside, x, np.nan)
+
+        y, x = gather(ESTIMATION_WINDOW)
+        mask = np.isfinite(y) & np.isfinite(x)
+        obs = mask.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            xm = np.where(mask, x, 0).sum(axis=1) / obs
+            ym = np.where(mask, y, 0).sum(axis=1) / obs
+            dx = np.where(mask, x - xm[:, None], 0)
+            dy = np.where(mask, y - ym[:, None], 0)
+            beta = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+            alpha = ym - beta * xm
+
+        yw, xw = gather(EVENT_WINDOW)
+        ar = yw - alpha[:, None] - beta[:, None] * xw
+        present = np.isfinite(ar)
+        split = -EVENT_WINDOW[0]
+        car_pre = np.where(present[:, :split], ar[:, :split], 0).sum(axis=1)
+        car_post = np.where(present[:, split:], ar[:, split:], 0).sum(axis=1)
+        # Too short an estimation window or a window mostly without bars gives no CAR
+        valid = (obs >= settings.EVENT_STUDY_MIN_ESTIMATION_DAYS) & np.isfinite(beta) & (present.mean(axis=1) >= 0.9)
+
+        def val(v, i):
+            return float(v[i]) if valid[i] else None
+
+        rows += [
+            [e["id"], e["symbol"], e["type"], e["event_date"], val(car_pre + car_post, i), val(car_pre, i),
+             val(car_post, i), val(alpha, i), val(beta, i), int(obs[i])]
+            for i, e in enumerate(known)
+        ]
+        logger.debug(f"Event study solved {len(rows)} events ({int(valid.sum())} with a usable market model)")
+        return self._store(rows)
+
+    def _store(self, rows) -> int:
+        db_manager.bulk_insert(
+            "event_car",
+            ["event_id", "symbol", "event_type", "event_date", "car", "car_pre", "car_post", "alpha", "beta", "estimation_days"],
+            rows,
+            on_conflict="ON CONFLICT DO NOTHING",
+        )
+        return len(rows)
+
+
+event_study_job = EventStudyJob()
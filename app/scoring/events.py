@@ -1,13 +1,65 @@
-from typing import List, Dict
+from datetime import date
+from typing import Dict, List
+from app.core.database import db_manager
+from app.scoring.event_study import study_match_sql
+
+EVENT_FEATURES_SQL = """
+SELECT ev.*, f.date AS feature_date, f.close AS pre_close, f.ret_20d, f.volume_ratio
+FROM ev ASOF LEFT JOIN feats f ON f.symbol = ev.symbol AND ev.event_date > f.date
+"""
+
+# Score a batch of events in one pass: pre-event features from daily_bars (as of
+# the last bar before each event) and the most specific event-study statistics
+# available (see study_match_sql).
+SCORE_SQL = f"""
+WITH ev AS (
+    SELECT UNNEST(?) AS idx, UNNEST(?) AS event_id, UNNEST(?) AS symbol,
+           UNNEST(?) AS event_type, CAST(UNNEST(?) AS DATE) AS event_date
+),
+feats AS (
+    SELECT symbol, date, close,
+           close / LAG(close, 20) OVER w - 1 AS ret_20d,
+           AVG(volume) OVER (w ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)
+               / NULLIF(AVG(volume) OVER (w ROWS BETWEEN 59 PRECEDING AND CURRENT ROW), 0) AS volume_ratio
+    FROM primary_daily_bars
+    WHERE symbol IN (SELECT symbol FROM ev)
+    WINDOW w AS (PARTITION BY symbol ORDER BY date)
+),
+joined AS (
+    {study_match_sql(EVENT_FEATURES_SQL)}
+)
+SELECT *,
+       study_fund_score AS fund_score,
+       LEAST(100, GREATEST(0, 50 + 250 * COALESCE(ret_20d, 0) + 10 * COALESCE(CASE WHEN volume_ratio > 0 THEN ln(volume_ratio) END, 0))) AS tech_score,
+       study_impact_prob AS impact_prob
+FROM joined
+ORDER BY idx
+"""
+
+RESULT_FIELDS = (
+    "event_id", "symbol", "event_type", "event_date", "fund_score", "tech_score", "impact_prob",
+    "mean_car", "hit_rate", "study_events", "study_level", "sector", "cap_bucket",
+    "feature_date", "pre_close", "ret_20d", "volume_ratio",
+)
+
 
 class EventDrivenEngine:
+    """
+    Scores batches of events (results, dividends, splits, order wins, ...) in one
+    query against pre-event price/volume features and the event-study statistics
+    precomputed nightly by EventStudyJob, never per request.
+    """
+
     def run(self, payload: List[Dict]) -> List[Dict]:
-        results = []
-        for event in payload:
-            score = self._score_event(event)
-            results.append({"event_id": event.get("id"), "fund_score": score})
-        return results
-
-    def _score_event(self, event: Dict) -> float:
-        # Placeholder for fund/tech event scoring
-        return 65.0
+        if not payload:
+            return []
+        today = date.today()
+        params = [
+            list(range(len(payload))),
+            [e.get("id") for e in payload],
+            [str(e.get("symbol", "")).upper() for e in payload],
+            [str(e.get("type", "")).upper() for e in payload],
+            [e.get("date") or e.get("event_date") or today for e in payload],
+        ]
+        rows = db_manager.execute_query(SCORE_SQL, params)
+        return [{k: r[k] for k in RESULT_FIELDS} for r in rows]
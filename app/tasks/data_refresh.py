@@ -10,6 +10,19 @@ from app.core.database import db_manager
 from app.data.fetchers.nse_fetcher import NSEFetcher
 from app.data.fetchers.bse_fetcher import BSEFetcher
 from app.data.fetchers.gold_fetcher import GoldFetcher
+from app.core.config import settings
+from app.core.write_buffer import quote_buffer
+from app.tasks.ingest_queue import ingest_queue
+from app.validation.validators import QuoteValidator, GoldRateValidator
+
+# Queue batches are acknowledged only once their rows are durable in DuckDB
+quote_buffer.add_flush_listener(ingest_queue.ack)
+# Rows DuckDB rejects on their own are parked next to the queue instead of blocking it
+quote_buffer.add_dead_letter_listener(lambda rows, error: ingest_queue.dead_letter("quotes", rows, error))
+
+# Incremental data-quality checks over each flushed batch
+if settings.DQ_ENABLED:
+    quote_buffer.add_batch_listener(QuoteValidator().validate_quotes)
 
 
 # ---------------------------
@@ -38,22 +51,43 @@ def _get_attr(obj: Any, name: str, default: Any = None) -> Any:
     return getattr(obj, name, default)
 
 
-def _ensure_stock_row(symbol: str, name: Optional[str], exchange: str) -> None:
-    """
-    Ensure a minimal row exists in stocks to satisfy FK for quotes.
-    Uses ON CONFLICT DO NOTHING on (symbol) primary key.
-    """
-    try:
-        sql = """
-            INSERT INTO stocks (symbol, name, exchange)
-            VALUES (?, ?, ?)
-            ON CONFLICT (symbol) DO NOTHING
-        """
-        params = [symbol, name or symbol, exchange]
-        db_manager.execute_insert(sql, params)
-    except Exception as e:
-        # Don't block quotes insert if stocks upsert fails; log and continue.
-        logger.warning(f"stocks upsert skipped for {symbol} ({exchange}): {e}")
+def quote_to_row(q: Any, default_exchange: str) -> Dict[str, Any]:
+    """Flatten a fetched quote (model or dict) into a plain, queue-serializable row."""
+    exchange = _get_attr(q, "exchange", default=default_exchange)
+    if hasattr(exchange, "value"):
+        exchange = exchange.value
+    symbol = _get_attr(q, "symbol")
+    return {
+        "symbol": symbol,
+        "name": _get_attr(q, "name", default=symbol),
+        "isin": _get_attr(q, "isin"),
+        "exchange": exchange or default_exchange,
+        "price": _as_float(_get_attr(q, "price")),
+        "change_amount": _as_float(_get_attr(q, "change_amount")),
+        "change_percent": _as_float(_get_attr(q, "change_percent")),
+        "volume": _get_attr(q, "volume"),
+        "value": _get_attr(q, "value"),
+        "high": _as_float(_get_attr(q, "high")),
+        "low": _as_float(_get_attr(q, "low")),
+        "open": _as_float(_get_attr(q, "open")),
+        "close": _as_float(_get_attr(q, "close")),
+        "bid": _as_float(_get_attr(q, "bid")),
+        "ask": _as_float(_get_attr(q, "ask")),
+        "delivery_qty": _get_attr(q, "delivery_qty"),
+        "delivery_percent": _as_float(_get_attr(q, "delivery_percent")),
+        "timestamp": _get_attr(q, "timestamp") or datetime.now(),  # same local clock as the fetchers
+        "data_source": _get_attr(_get_attr(q, "data_source"), "value", default="API") or "API",
+    }
+
+
+async def _fetch_exchange_quotes(fetcher: Any) -> List[Any]:
+    # Prefer multi-symbol method if available
+    if hasattr(fetcher, "fetch_all_quotes"):
+        return await fetcher.fetch_all_quotes()
+    if hasattr(fetcher, "fetch_quotes"):
+        # If your fetcher needs symbols, you could pull top symbols from DB here
+        return await fetcher.fetch_quotes()
+    return []
 
 
 # ---------------------------
@@ -62,18 +96,17 @@ def _ensure_stock_row(symbol: str, name: Optional[str], exchange: str) -> None:
 
 async def refresh_market_data() -> Dict[str, Any]:
     """
-    Refresh market data for NSE and BSE:
+    Fetch stage of the market data refresh for NSE and BSE:
       - Fetch quotes from both exchanges
-      - Upsert minimal stocks rows to satisfy FK
-      - Insert quotes into 'quotes' table
-    Returns summary counts.
+      - Flatten them into rows and enqueue one batch per exchange on the ingest queue
+    The writer (drain_ingest_queue) persists the batches. Returns enqueued counts.
     """
     logger.info("Starting market data refresh")
 
     nse_fetcher = NSEFetcher()
     bse_fetcher = BSEFetcher()
 
-    total_inserted = {"NSE": 0, "BSE": 0}
+    total_enqueued = {"NSE": 0, "BSE": 0}
     total_errors = {"NSE": 0, "BSE": 0}
 
     # ---------- NSE ----------
@@ -85,134 +118,73 @@ async def refresh_market_data() -> Dict[str, Any]:
             except Exception as se:
                 logger.warning(f"NSE session init skipped/failed: {se}")
 
-        # Prefer multi-symbol method if available
-        if hasattr(nse_fetcher, "fetch_all_quotes"):
-            nse_quotes = await nse_fetcher.fetch_all_quotes()
-        elif hasattr(nse_fetcher, "fetch_quotes"):
-            # If your fetcher needs symbols, you could pull top symbols from DB here
-            nse_quotes = await nse_fetcher.fetch_quotes()
-        else:
-            nse_quotes = []
-
-        insert_query = """
-            INSERT INTO quotes (
-                id, symbol, exchange, price, change_amount, change_percent, volume, value,
-                high, low, open, close, bid, ask, delivery_qty, delivery_percent,
-                timestamp, data_source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        for q in nse_quotes or []:
+        nse_rows = []
+        for q in await _fetch_exchange_quotes(nse_fetcher) or []:
             try:
-                symbol = _get_attr(q, "symbol")
-                name = _get_attr(q, "name", default=symbol)
-                exchange = _get_attr(q, "exchange", default="NSE")
-                if hasattr(exchange, "value"):
-                    exchange = exchange.value
-
-                # Ensure stocks row (FK safety)
-                _ensure_stock_row(symbol, name, exchange)
-
-                params = [
-                    _gen_pk(),
-                    symbol,
-                    exchange or "NSE",
-                    _as_float(_get_attr(q, "price")),
-                    _as_float(_get_attr(q, "change_amount")),
-                    _as_float(_get_attr(q, "change_percent")),
-                    _get_attr(q, "volume"),
-                    _get_attr(q, "value"),
-                    _as_float(_get_attr(q, "high")),
-                    _as_float(_get_attr(q, "low")),
-                    _as_float(_get_attr(q, "open")),
-                    _as_float(_get_attr(q, "close")),
-                    _as_float(_get_attr(q, "bid")),
-                    _as_float(_get_attr(q, "ask")),
-                    _get_attr(q, "delivery_qty"),
-                    _as_float(_get_attr(q, "delivery_percent")),
-                    _get_attr(q, "timestamp") or datetime.utcnow(),
-                    _get_attr(_get_attr(q, "data_source"), "value", default="API") or "API",
-                ]
-
-                db_manager.execute_insert(insert_query, params)
-                total_inserted["NSE"] += 1
+                nse_rows.append(quote_to_row(q, "NSE"))
             except Exception as e:
                 total_errors["NSE"] += 1
-                logger.error(f"NSE quote insert failed for {_get_attr(q, 'symbol')}: {e}")
-
-        logger.info(f"NSE market data refreshed | inserted={total_inserted['NSE']}, errors={total_errors['NSE']}")
+                logger.error(f"NSE quote normalization failed for {_get_attr(q, 'symbol')}: {e}")
+        ingest_queue.put("quotes", nse_rows)
+        total_enqueued["NSE"] = len(nse_rows)
+        logger.info(f"NSE market data fetched | enqueued={total_enqueued['NSE']}, errors={total_errors['NSE']}")
     except Exception as e:
         logger.error(f"NSE market data refresh failed: {e}")
 
     # ---------- BSE ----------
     try:
-        # Prefer multi-symbol method if available
-        if hasattr(bse_fetcher, "fetch_all_quotes"):
-            bse_quotes = await bse_fetcher.fetch_all_quotes()
-        elif hasattr(bse_fetcher, "fetch_quotes"):
-            bse_quotes = await bse_fetcher.fetch_quotes()
-        else:
-            bse_quotes = []
-
-        insert_query = """
-            INSERT INTO quotes (
-                id, symbol, exchange, price, change_amount, change_percent, volume, value,
-                high, low, open, close, bid, ask, delivery_qty, delivery_percent,
-                timestamp, data_source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        for q in bse_quotes or []:
+        bse_rows = []
+        for q in await _fetch_exchange_quotes(bse_fetcher) or []:
             try:
-                symbol = _get_attr(q, "symbol")
-                name = _get_attr(q, "name", default=symbol)
-                exchange = _get_attr(q, "exchange", default="BSE")
-                if hasattr(exchange, "value"):
-                    exchange = exchange.value
-
-                # Ensure stocks row (FK safety)
-                _ensure_stock_row(symbol, name, exchange)
-
-                params = [
-                    _gen_pk(),
-                    symbol,
-                    exchange or "BSE",
-                    _as_float(_get_attr(q, "price")),
-                    _as_float(_get_attr(q, "change_amount")),
-                    _as_float(_get_attr(q, "change_percent")),
-                    _get_attr(q, "volume"),
-                    _get_attr(q, "value"),
-                    _as_float(_get_attr(q, "high")),
-                    _as_float(_get_attr(q, "low")),
-                    _as_float(_get_attr(q, "open")),
-                    _as_float(_get_attr(q, "close")),
-                    _as_float(_get_attr(q, "bid")),
-                    _as_float(_get_attr(q, "ask")),
-                    _get_attr(q, "delivery_qty"),
-                    _as_float(_get_attr(q, "delivery_percent")),
-                    _get_attr(q, "timestamp") or datetime.utcnow(),
-                    _get_attr(_get_attr(q, "data_source"), "value", default="API") or "API",
-                ]
-
-                db_manager.execute_insert(insert_query, params)
-                total_inserted["BSE"] += 1
+                bse_rows.append(quote_to_row(q, "BSE"))
             except Exception as e:
                 total_errors["BSE"] += 1
-                logger.error(f"BSE quote insert failed for {_get_attr(q, 'symbol')}: {e}")
-
-        logger.info(f"BSE market data refreshed | inserted={total_inserted['BSE']}, errors={total_errors['BSE']}")
+                logger.error(f"BSE quote normalization failed for {_get_attr(q, 'symbol')}: {e}")
+        ingest_queue.put("quotes", bse_rows)
+        total_enqueued["BSE"] = len(bse_rows)
+        logger.info(f"BSE market data fetched | enqueued={total_enqueued['BSE']}, errors={total_errors['BSE']}")
     except Exception as e:
         logger.error(f"BSE market data refresh failed: {e}")
 
     summary = {
-        "NSE": total_inserted["NSE"],
-        "BSE": total_inserted["BSE"],
+        "NSE": total_enqueued["NSE"],
+        "BSE": total_enqueued["BSE"],
         "errors": {"NSE": total_errors["NSE"], "BSE": total_errors["BSE"]},
     }
     logger.info(f"Market data refresh summary: {summary}")
     return summary
 
 
+def drain_ingest_queue(max_batches: int = 20) -> Dict[str, Any]:
+    """
+    Writer stage: claim pending batches from the ingest queue and stage them on the
+    quote write buffer, which flushes on its size/age thresholds. Batches are acked
+    by the buffer's flush listener, so anything not yet flushed is redelivered.
+    Synchronous on purpose: the scheduler runs it in a worker thread, so the
+    blocking DuckDB writes stay off the event loop.
+    """
+    batches = ingest_queue.claim(limit=max_batches)
+    staged = {"batches": 0, "rows": 0, "accepted": 0, "flushed": 0}
+    for batch_id, kind, rows in batches:
+        try:
+            if kind == "quotes":
+                staged["accepted"] += quote_buffer.add(rows, token=batch_id)
+                staged["rows"] += len(rows)
+            else:
+                logger.warning(f"Dropping ingest batch {batch_id} of unknown kind '{kind}'")
+                ingest_queue.ack([batch_id])
+            staged["batches"] += 1
+        except Exception as e:
+            logger.error(f"Ingest batch {batch_id} staging failed; will retry: {e}")
+    try:
+        staged["flushed"] += quote_buffer.flush_if_due()
+    except Exception as e:
+        logger.error(f"Timed quote buffer flush failed: {e}")
+    if batches:
+        logger.info(f"Ingest queue drained | {staged}")
+    return staged
+
+
 async def refresh_gold_data(city: str = "Coimbatore", purity: str = "22K") -> Dict[str, Any]:
     """
     Refresh current gold rate and upsert into gold_rates (unique by date, city, purity).
@@ -266,6 +238,8 @@ async def refresh_gold_data(city: str = "Coimbatore", purity: str = "22K") -> Di
         ]
         db_manager.execute_insert(upsert_sql, params)
         logger.info(f"Gold rates upserted | date={g_date} city={g_city} purity={g_purity}")
+        if settings.DQ_ENABLED:
+            GoldRateValidator().validate_rates()
         return {
             "updated": True,
             "date": str(g_date),
@@ -280,4 +254,4 @@ async def refresh_gold_data(city: str = "Coimbatore", purity: str = "22K") -> Di
 
 
 # Explicit exports for scheduler imports
-__all__ = ["refresh_market_data", "refresh_gold_data"]
+__all__ = ["refresh_market_data", "drain_ingest_queue", "refresh_gold_data"]
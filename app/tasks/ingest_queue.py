@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from app.core.config import settings
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "value"):
+        return value.value
+    raise TypeError(f"Unserializable value in ingest batch: {value!r}")
+
+
+class IngestQueue:
+    """
+    Durable local queue between the fetchers and the DuckDB writer.
+
+    Backed by a small SQLite file (WAL mode) so that batches survive a crash
+    between fetch and write, and so fetching never holds the DuckDB write lock.
+    Batches are claimed, written, then acknowledged; unacknowledged claims are
+    handed out again after INGEST_QUEUE_VISIBILITY_TIMEOUT seconds. The file is
+    opened on first use, so processes that never enqueue or drain do not create it.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.INGEST_QUEUE_PATH
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Callers hold self._lock
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    claimed_at REAL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    error TEXT,
+                    failed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection = connection
+        return self._connection
+
+    def put(self, kind: str, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        payload = json.dumps(rows, default=_json_default)
+        with self._lock:
+            cur = self.connection.execute(
+                "INSERT INTO ingest_batches (kind, payload, row_count, enqueued_at) VALUES (?, ?, ?, ?)",
+                (kind, payload, len(rows), time.time()),
+            )
+        logger.debug(f"Enqueued {len(rows)} {kind} rows as batch {cur.lastrowid}")
+        return cur.lastrowid
+
+    def claim(self, limit: int = 10) -> List[Tuple[int, str, List[Dict[str, Any]]]]:
+        now = time.time()
+        expired = now - settings.INGEST_QUEUE_VISIBILITY_TIMEOUT
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    """
+                    SELECT id, kind, payload FROM ingest_batches
+                    WHERE claimed_at IS NULL OR claimed_at < ?
+                    ORDER BY id LIMIT ?
+                    """,
+                    (expired, limit),
+                ).fetchall()
+                if rows:
+                    self.connection.executemany(
+                        "UPDATE ingest_batches SET claimed_at = ? WHERE id = ?",
+                        [(now, r[0]) for r in rows],
+                    )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return [(r[0], r[1], json.loads(r[2])) for r in rows]
+
+    def ack(self, batch_ids: List[int]):
+        if not batch_ids:
+            return
+        with self._lock:
+            self.connection.executemany("DELETE FROM ingest_batches WHERE id = ?", [(i,) for i in batch_ids])
+
+    def dead_letter(self, kind: str, rows: List[Dict[str, Any]], error: str) -> int:
+        """Keep rows the writer could not store, with the error, for inspection or replay."""
+        if not rows:
+            return 0
+        payload = json.dumps(rows, default=_json_default)
+        with self._lock:
+            cur = self.connection.execute(
+                "INSERT INTO dead_letters (kind, payload, row_count, error, failed_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, payload, len(rows), error, time.time()),
+            )
+        return cur.lastrowid
+
+    def depth(self) -> Dict[str, int]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(row_count), 0) FROM ingest_batches"
+            ).fetchone()
+            dead = self.connection.execute("SELECT COALESCE(SUM(row_count), 0) FROM dead_letters").fetchone()
+        return {"batches": row[0], "rows": row[1], "dead_letter_rows": dead[0]}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,53 @@
+import fcntl
+import os
+from typing import Optional
+from loguru import logger
+from app.core.config import settings
+
+
+class LeaderLock:
+    """
+    Advisory file lock used as a cheap leader election between processes on one host.
+
+    Only the process holding the lock runs the fetch jobs, so fetches are never
+    duplicated between the API and a standalone worker. The lock is released by the OS
+    if the holder dies, so a restarted worker can take over immediately.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.SCHEDULER_LOCK_PATH
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            logger.info(f"Scheduler lock {self.path} held by another process; running as follower")
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"Acquired scheduler lock {self.path} (pid={os.getpid()})")
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            logger.info(f"Released scheduler lock {self.path}")
+
+
+scheduler_lock = LeaderLock()
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+
+IST = ZoneInfo(settings.MARKET_TIMEZONE)
+
+# NSE/BSE equity segment trading holidays (weekday closures only).
+# Extra or late-announced closures can be supplied via settings.MARKET_EXTRA_HOLIDAYS.
+EXCHANGE_HOLIDAYS = {
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+    date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+    date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+    date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26), date(2026, 3, 31),
+    date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1), date(2026, 5, 28),
+    date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2), date(2026, 10, 20),
+    date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+}
+
+# Special sessions held on otherwise closed days (e.g. Muhurat trading).
+# The exchanges announce Muhurat timings by circular shortly before Diwali, so the
+# 2026 session (Sunday 8 Nov 2026) is not listed yet: supply it, or any other
+# late-announced session, via settings.MARKET_EXTRA_SESSIONS.
+SPECIAL_SESSIONS: Dict[date, List[Tuple[time, time]]] = {
+    date(2025, 10, 21): [(time(13, 45), time(14, 45))],
+}
+
+
+class SessionPhase:
+    PRE_OPEN = "PRE_OPEN"
+    REGULAR = "REGULAR"
+    POST_CLOSE = "POST_CLOSE"
+    SPECIAL = "SPECIAL"
+    CLOSED = "CLOSED"
+
+
+@dataclass(frozen=True)
+class Session:
+    phase: str
+    start: time
+    end: time
+
+
+# Equity segment timings (IST)
+REGULAR_SESSIONS = [
+    Session(SessionPhase.PRE_OPEN, time(9, 0), time(9, 15)),
+    Session(SessionPhase.REGULAR, time(9, 15), time(15, 30)),
+    Session(SessionPhase.POST_CLOSE, time(15, 30), time(16, 0)),
+]
+
+
+def _parse_extra_holidays(raw: str) -> set:
+    days = set()
+    for token in (raw or "").split(","):
+        token = token.strip()
+        if token:
+            days.add(date.fromisoformat(token))
+    return days
+
+
+def _parse_extra_sessions(raw: str) -> Dict[date, List[Tuple[time, time]]]:
+    """Parse "2026-11-08 18:00-19:15, ..." into {date: [(start, end)]}."""
+    sessions: Dict[date, List[Tuple[time, time]]] = {}
+    for token in (raw or "").split(","):
+        token = token.strip()
+        if token:
+            day, hours = token.split()
+            start, end = hours.split("-")
+            sessions.setdefault(date.fromisoformat(day), []).append((time.fromisoformat(start), time.fromisoformat(end)))
+    return sessions
+
+
+class TradingCalendar:
+    """Exchange calendar used to decide when (and how often) market data jobs should run."""
+
+    def __init__(
+        self,
+        holidays: Optional[set] = None,
+        special_sessions: Optional[Dict[date, List[Tuple[time, time]]]] = None,
+        sessions: Optional[List[Session]] = None,
+    ):
+        self.holidays = set(EXCHANGE_HOLIDAYS if holidays is None else holidays)
+        self.holidays |= _parse_extra_holidays(settings.MARKET_EXTRA_HOLIDAYS)
+        self.special_sessions = dict(SPECIAL_SESSIONS if special_sessions is None else special_sessions)
+        for day, extra in _parse_extra_sessions(settings.MARKET_EXTRA_SESSIONS).items():
+            self.special_sessions[day] = self.special_sessions.get(day, []) + extra
+        self.sessions = list(REGULAR_SESSIONS if sessions is None else sessions)
+        self.timezone = IST
+
+    def _localize(self, when: Optional[datetime]) -> datetime:
+        if when is None:
+            return datetime.now(IST)
+        if when.tzinfo is None:
+            return when.replace(tzinfo=IST)
+        return when.astimezone(IST)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def sessions_for(self, day: date) -> List[Session]:
+        """All sessions (regular and special) for a calendar day, ordered by start time."""
+        sessions = list(self.sessions) if self.is_trading_day(day) else []
+        for start, end in self.special_sessions.get(day, []):
+            sessions.append(Session(SessionPhase.SPECIAL, start, end))
+        return sorted(sessions, key=lambda s: s.start)
+
+    def phase(self, when: Optional[datetime] = None) -> str:
+        now = self._localize(when)
+        for session in self.sessions_for(now.date()):
+            if session.start <= now.time() < session.end:
+                return session.phase
+        return SessionPhase.CLOSED
+
+    def refresh_interval(self, phase: str) -> Optional[int]:
+        """Polling interval in seconds for a phase; None means no polling."""
+        if phase in (SessionPhase.REGULAR, SessionPhase.SPECIAL):
+            return settings.AUTO_REFRESH_INTERVAL
+        if phase in (SessionPhase.PRE_OPEN, SessionPhase.POST_CLOSE):
+            return settings.MARKET_EDGE_REFRESH_INTERVAL
+        return None
+
+    def next_session_start(self, when: Optional[datetime] = None) -> datetime:
+        now = self._localize(when)
+        for offset in range(0, 15):
+            day = now.date() + timedelta(days=offset)
+            for session in self.sessions_for(day):
+                start = datetime.combine(day, session.start, tzinfo=IST)
+                if start > now:
+                    return start
+        raise RuntimeError("No trading session found in the next 15 days; check holiday configuration")
+
+    def next_refresh_time(self, when: Optional[datetime] = None) -> datetime:
+        """
+        Next time the market refresh job should fire: one interval ahead while a
+        session is live, otherwise the start of the next session.
+        """
+        now = self._localize(when)
+        interval = self.refresh_interval(self.phase(now))
+        if interval is None:
+            return self.next_session_start(now)
+        candidate = now + timedelta(seconds=interval)
+        # Don't overshoot into a closed period; land on the next session boundary instead
+        if self.phase(candidate) == SessionPhase.CLOSED:
+            return self.next_session_start(now)
+        return candidate
+
+
+trading_calendar = TradingCalendar()
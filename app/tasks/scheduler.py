@@ -1,19 +1,169 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from asyncio import get_event_loop
+from asyncio import get_event_loop, to_thread
 from datetime import datetime
 from loguru import logger
-from app.tasks.data_refresh import refresh_market_data, refresh_gold_data
+from app.tasks.data_refresh import refresh_market_data, drain_ingest_queue, refresh_gold_data
 from app.tasks.health_monitor import monitor_system_health
+from app.tasks.market_calendar import trading_calendar, SessionPhase
+from app.data.reconciliation import reconciler
+from app.data.daily_bars import rollup_daily_bars
+from app.events_actions.adjustments import adjustment_engine
+from app.events_actions.catalyst import CatalystCardsService
+from app.portfolio.valuation import valuation_engine
+from app.portfolio.risk import risk_model
+from app.scoring.event_study import event_study_job
+from app.backtest.pit_loader import snapshot_universe
+from app.mf_etf.nav_ingest import fetch_amfi_nav, fetch_index_levels
+from app.mf_etf.metrics import Attribution, compute_fund_metrics
+from app.tasks.leader_lock import scheduler_lock
 from app.core.config import settings
+from app.core.security_master import security_master
 
 scheduler = AsyncIOScheduler()
 
-def start_scheduler():
-    logger.info("Starting Elite Stock Engine Scheduler")
+# The refresh job re-arms itself from each run, so a run must never be dropped as
+# misfired (e.g. after an event-loop stall): late runs still fire, once.
+MARKET_REFRESH_JOB = {"id": "market_refresh", "misfire_grace_time": None, "coalesce": True}
 
-    # Market data refresh every 15 seconds
-    scheduler.add_job(refresh_market_data, IntervalTrigger(seconds=settings.AUTO_REFRESH_INTERVAL), id="market_refresh")
+
+def _schedule_next_market_refresh():
+    run_at = trading_calendar.next_refresh_time()
+    scheduler.add_job(
+        market_refresh_tick,
+        DateTrigger(run_date=run_at),
+        replace_existing=True,
+        **MARKET_REFRESH_JOB,
+    )
+    logger.debug(f"Next market refresh at {run_at.isoformat()}")
+
+
+async def market_refresh_tick():
+    """
+    Run one market data refresh if a session is live, then re-arm the job
+    according to the trading calendar (15s in session, minutes around the
+    open/close, nothing until the next session when closed).
+    """
+    try:
+        phase = trading_calendar.phase()
+        if trading_calendar.refresh_interval(phase) is not None:
+            await refresh_market_data()
+        else:
+            logger.info(f"Market closed ({phase}); skipping refresh")
+    finally:
+        _schedule_next_market_refresh()
+
+
+def exchange_reconcile_tick():
+    """Reconcile NSE/BSE snapshots each cycle while a session is live (and once at startup)."""
+    if reconciler.last_run_at is not None and trading_calendar.phase() == SessionPhase.CLOSED:
+        return
+    reconciler.reconcile()
+
+
+def end_of_day_tick():
+    """
+    Roll today's quotes into daily bars, refresh adjustment factors (dividend
+    factors need the prior close), snapshot every portfolio's valuation,
+    roll the shared risk model forward one day and version the day's universe.
+    """
+    rollup_daily_bars()
+    adjustment_engine.rebuild()
+    valuation_engine.snapshot_all()
+    risk_model.update()
+    snapshot_universe()
+
+
+async def fund_nav_tick():
+    """
+    Load the day's AMFI NAVs and the style factor / market index levels, recompute
+    the fund screening metrics and solve any new style windows. The loads and the
+    metric/attribution solves run in worker threads, off the event loop.
+    """
+    await fetch_amfi_nav()
+    await fetch_index_levels()
+    await to_thread(compute_fund_metrics)
+    await to_thread(Attribution().run)
+
+
+def event_study_tick():
+    """Market-model CARs for events whose [-5, +20] window completed, then re-aggregate the statistics."""
+    event_study_job.run()
+
+
+def catalyst_refresh_tick():
+    """Regenerate catalyst cards whose action or latest price changed."""
+    CatalystCardsService().refresh()
+
+
+def start_scheduler(fetch: bool = True, database: bool = True) -> bool:
+    """
+    Start the jobs this process is responsible for.
+
+    Fetch jobs pull market data onto the ingest queue and never open DuckDB; they
+    run only in the process that wins the scheduler lock (the API, or the
+    standalone worker). Database jobs, from draining the queue onwards, must run
+    in the single process that owns the DuckDB file, i.e. the API.
+    Returns False (and starts nothing) when there is nothing left to run here.
+    """
+    leader = fetch and scheduler_lock.acquire()
+    if fetch and not leader:
+        logger.info("Fetch jobs not started in this process; another process holds the scheduler lock")
+    if not leader and not database:
+        return False
+
+    logger.info(f"Starting Elite Stock Engine Scheduler (fetch={leader}, database={database})")
+
+    if leader:
+        # Market data refresh, paced by the trading calendar
+        scheduler.add_job(
+            market_refresh_tick, DateTrigger(run_date=datetime.now(trading_calendar.timezone)), **MARKET_REFRESH_JOB
+        )
+
+    if database:
+        _add_database_jobs()
+
+    scheduler.start()
+    return True
+
+
+def _add_database_jobs():
+    # Register stocks rows missing from the security master and backfill sec_ids, once per start
+    scheduler.add_job(security_master.sync_from_stocks, DateTrigger(run_date=datetime.now()), id="security_master_sync")
+
+    # Writer: drain fetched batches from the ingest queue into DuckDB
+    scheduler.add_job(drain_ingest_queue, IntervalTrigger(seconds=settings.INGEST_DRAIN_INTERVAL), id="ingest_drain", max_instances=1)
+
+    # Cross-exchange NSE/BSE reconciliation, once per refresh cycle
+    scheduler.add_job(exchange_reconcile_tick, IntervalTrigger(seconds=settings.AUTO_REFRESH_INTERVAL), id="exchange_reconcile", max_instances=1)
+
+    # End-of-day daily bar rollup and adjustment factors, after the post-close session
+    scheduler.add_job(
+        end_of_day_tick,
+        CronTrigger(day_of_week="mon-fri", hour=16, minute=5, timezone=trading_calendar.timezone),
+        id="end_of_day",
+    )
+
+    # Nightly event study over completed corporate action windows
+    scheduler.add_job(
+        event_study_tick,
+        CronTrigger(hour=1, minute=30, timezone=trading_calendar.timezone),
+        id="event_study",
+        max_instances=1,
+    )
+
+    # Catalyst cards for upcoming corporate actions (only stale cards are rescored)
+    scheduler.add_job(catalyst_refresh_tick, IntervalTrigger(minutes=5), id="catalyst_refresh", max_instances=1)
+
+    # AMFI publishes the day's NAVs in the evening; screens read the recomputed metrics
+    scheduler.add_job(
+        fund_nav_tick,
+        CronTrigger(hour=23, minute=30, timezone=trading_calendar.timezone),
+        id="fund_nav",
+        max_instances=1,
+    )
 
     # Gold price refresh every 30 minutes
     scheduler.add_job(refresh_gold_data, IntervalTrigger(minutes=30), id="gold_refresh")
@@ -21,11 +171,13 @@ def start_scheduler():
     # Health monitor every 1 minute
     scheduler.add_job(monitor_system_health, IntervalTrigger(minutes=1), id="health_monitor")
 
-    scheduler.start()
 
 def shutdown_scheduler():
+    if not scheduler.running:
+        return
     logger.info("Shutting down Elite Stock Engine Scheduler")
     scheduler.shutdown(wait=False)
+    scheduler_lock.release()
 
 if __name__ == "__main__":
     start_scheduler()
@@ -0,0 +1,48 @@
+# app/tasks/worker.py
+"""
+Standalone ingestion worker.
+
+Runs the fetch jobs outside the uvicorn API process, so fetching and parsing
+do not compete with request handling:
+
+    SCHEDULER_IN_API=false uvicorn app.main:app
+    python -m app.tasks.worker
+
+The worker never opens DuckDB (only one process may own the file): fetched
+batches go onto the ingest queue and the API process writes them.
+"""
+import asyncio
+import signal
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from loguru import logger
+
+from app.tasks.scheduler import start_scheduler, shutdown_scheduler
+from app.utils.logger import setup_logging
+
+
+async def _run():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if not start_scheduler(database=False):
+        logger.warning("Another ingestion worker is already running; exiting")
+        return
+    logger.info("Ingestion worker running")
+    try:
+        await stop.wait()
+    finally:
+        shutdown_scheduler()
+
+
+def main():
+    setup_logging()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
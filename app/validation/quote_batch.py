@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from app.core.models import Exchange
+
+EXCHANGES = {e.value for e in Exchange}
+
+NUMERIC_FIELDS = [
+    "price", "change_amount", "change_percent", "volume", "value",
+    "high", "low", "open", "close", "bid", "ask", "delivery_qty", "delivery_percent",
+]
+
+
+@dataclass
+class BatchValidationResult:
+    """Per-row reject mask plus per-check failure counts for one quote batch."""
+    reject: np.ndarray
+    checks: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def accepted(self) -> int:
+        return int((~self.reject).sum())
+
+    @property
+    def rejected(self) -> int:
+        return int(self.reject.sum())
+
+    def counts(self) -> Dict[str, int]:
+        return {name: int(failed.sum()) for name, failed in self.checks.items() if failed.any()}
+
+    def reasons(self, i: int) -> List[str]:
+        return [name for name, failed in self.checks.items() if failed[i]]
+
+
+def _column(rows: Sequence[Dict[str, Any]], name: str) -> np.ndarray:
+    raw = [row.get(name) for row in rows]
+    try:
+        # Fast path: numbers and None (-> NaN) convert in one C-level pass
+        return np.array(raw, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    values = []
+    for v in raw:
+        try:
+            values.append(np.nan if v is None else float(v))
+        except (TypeError, ValueError):
+            values.append(np.inf)  # unparseable -> fails every bound check
+    return np.asarray(values, dtype=np.float64)
+
+
+def validate_quote_batch(rows: Sequence[Dict[str, Any]]) -> BatchValidationResult:
+    """
+    Columnar equivalent of the Quote model constraints, applied to a whole batch
+    of flat quote rows at once. Missing optional values (NaN) pass; present values
+    must satisfy the same bounds the Pydantic model enforces:
+      - price > 0; OHLC/bid/ask > 0; OHLC within [0.5, 2] x price
+      - high >= low; change_percent and delivery_percent in range
+      - volume/value/delivery_qty >= 0; symbol non-empty, <= 20 chars
+      - exchange is a known Exchange
+    """
+    n = len(rows)
+    col = {name: _column(rows, name) for name in NUMERIC_FIELDS}
+    price = col["price"]
+
+    symbol_len = np.fromiter((len(r.get("symbol") or "") for r in rows), dtype=np.int64, count=n)
+
+    def present(a: np.ndarray) -> np.ndarray:
+        return ~np.isnan(a)
+
+    exchange_ok = np.fromiter((getattr(r.get("exchange"), "value", r.get("exchange")) in EXCHANGES for r in rows), dtype=bool, count=n)
+
+    checks: Dict[str, np.ndarray] = {
+        "symbol": (symbol_len == 0) | (symbol_len > 20),
+        "exchange": ~exchange_ok,
+        "price": ~(np.isfinite(price) & (price > 0)),
+    }
+    for name in ("high", "low", "open", "close", "bid", "ask"):
+        a = col[name]
+        checks[f"{name}_positive"] = present(a) & ~(a > 0)
+    with np.errstate(invalid="ignore"):
+        for name in ("high", "low", "open", "close"):
+            a = col[name]
+            checks[f"{name}_vs_price"] = present(a) & ((a > price * 2) | (a < price * 0.5))
+        high, low = col["high"], col["low"]
+        checks["high_low"] = present(high) & present(low) & (high < low)
+        cp = col["change_percent"]
+        checks["change_percent"] = present(cp) & ((cp < -100) | (cp > 100))
+        dp = col["delivery_percent"]
+        checks["delivery_percent"] = present(dp) & ((dp < 0) | (dp > 100))
+        for name in ("volume", "value", "delivery_qty"):
+            a = col[name]
+            checks[f"{name}_non_negative"] = present(a) & ~(a >= 0)
+
+    reject = np.zeros(n, dtype=bool)
+    for failed in checks.values():
+        reject |= failed
+    return BatchValidationResult(reject=reject, checks=checks)
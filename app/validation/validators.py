@@ -1,40 +1,201 @@
-from great_expectations.core.batch import BatchRequest
-from great_expectations.exceptions import GreatExpectationsError
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
 from app.core.database import db_manager
 from app.core.config import settings
 from loguru import logger
 
+PASSED = "PASSED"
+FAILED = "FAILED"
+
+NULL_RATE_COLUMNS = ["price", "volume", "high", "low", "open", "close"]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return float(value)
+
+
+def log_quality_checks(source: str, results: List[Dict[str, Any]]) -> int:
+    """Write check results to data_quality_log in a single statement."""
+    if not results:
+        return 0
+    return db_manager.execute_insert(
+        """
+        INSERT INTO data_quality_log (id, source, check_type, status, details, checked_at)
+        SELECT nextval('data_quality_log_id_seq'), UNNEST(?), UNNEST(?), UNNEST(?),
+               CAST(UNNEST(?) AS JSON), CURRENT_TIMESTAMP
+        """,
+        [
+            [source] * len(results),
+            [r["check_type"] for r in results],
+            [r["status"] for r in results],
+            [json.dumps(r["details"], default=_json_default) for r in results],
+        ],
+    )
+
+
 class QuoteValidator:
-    def __init__(self):
-        self.gx_context = None  # Initialize Great Expectations context here if needed
+    """
+    Incremental data-quality checks for quotes.
 
-    def validate_quotes(self):
-        # Here you can create a batch request or connect to DuckDB table
-        # and run expectations configured externally
-        try:
-            # This is an example, adjust to actual context & suite names
-            batch_request = BatchRequest(
-                datasource_name="duckdb_datasource",
-                data_connector_name="default_inferred_data_connector_name",
-                data_asset_name="quotes",
-                limit=1000
+    Every check is a single SQL aggregate over the rows of one ingest batch
+    (an id range from the write buffer), never the whole table. Checks that join
+    or group (cross-exchange spread, duplicates) can run on a Bernoulli sample of
+    the batch via DQ_SAMPLE_PERCENT.
+    """
+
+    SOURCE = "quotes"
+
+    def __init__(self, sample_percent: Optional[float] = None):
+        self.sample_percent = settings.DQ_SAMPLE_PERCENT if sample_percent is None else sample_percent
+
+    def _batch_cte(self, sampled: bool = False) -> str:
+        sample = ""
+        if sampled and self.sample_percent < 100:
+            sample = f" USING SAMPLE {float(self.sample_percent)} PERCENT (bernoulli)"
+        return f"WITH batch AS (SELECT * FROM quotes WHERE id BETWEEN ? AND ?{sample})"
+
+    def _range_check(self, lo: int, hi: int) -> Dict[str, Any]:
+        row = db_manager.execute_query(
+            self._batch_cte() + """
+            SELECT COUNT(*) AS rows,
+                   COUNT(*) FILTER (WHERE price <= 0) AS bad_price,
+                   COUNT(*) FILTER (WHERE change_percent NOT BETWEEN -100 AND 100) AS bad_change_percent,
+                   COUNT(*) FILTER (WHERE high < low) AS high_below_low,
+                   COUNT(*) FILTER (WHERE price > high * 1.001 OR price < low * 0.999) AS price_outside_range,
+                   COUNT(*) FILTER (WHERE volume < 0 OR value < 0) AS negative_volume
+            FROM batch
+            """,
+            [lo, hi],
+        )[0]
+        violations = sum(v for k, v in row.items() if k != "rows")
+        return {"check_type": "range", "status": PASSED if violations == 0 else FAILED, "details": row}
+
+    def _null_rate_check(self, lo: int, hi: int) -> Dict[str, Any]:
+        select = ", ".join(f"AVG(CASE WHEN {c} IS NULL THEN 1.0 ELSE 0.0 END) AS {c}" for c in NULL_RATE_COLUMNS)
+        row = db_manager.execute_query(self._batch_cte() + f" SELECT COUNT(*) AS rows, {select} FROM batch", [lo, hi])[0]
+        rates = {c: round(float(row[c] or 0), 4) for c in NULL_RATE_COLUMNS}
+        worst = max(rates.values()) if rates else 0.0
+        return {
+            "check_type": "null_rate",
+            "status": PASSED if worst <= settings.DQ_MAX_NULL_RATE else FAILED,
+            "details": {"rows": row["rows"], "null_rates": rates, "threshold": settings.DQ_MAX_NULL_RATE},
+        }
+
+    def _freshness_check(self, lo: int, hi: int) -> Dict[str, Any]:
+        row = db_manager.execute_query(
+            self._batch_cte() + """
+            SELECT COUNT(*) AS rows,
+                   MIN(seen_at) AS oldest,
+                   MAX(seen_at) AS newest,
+                   MEDIAN(epoch(CAST(? AS TIMESTAMP)) - epoch(seen_at)) AS median_age_seconds
+            FROM (SELECT COALESCE(last_seen_at, timestamp) AS seen_at FROM batch)
+            """,
+            # Fetchers stamp quotes with local wall-clock time; ages are measured on the same clock
+            [lo, hi, datetime.now()],
+        )[0]
+        age = row["median_age_seconds"]
+        return {
+            "check_type": "freshness",
+            "status": PASSED if age is None or age <= settings.DATA_STALENESS_THRESHOLD else FAILED,
+            "details": {**row, "threshold_seconds": settings.DATA_STALENESS_THRESHOLD},
+        }
+
+    def _spread_check(self, lo: int, hi: int) -> Dict[str, Any]:
+        row = db_manager.execute_query(
+            self._batch_cte(sampled=True) + """
+            , keyed AS (
+                SELECT COALESCE(CAST(b.sec_id AS VARCHAR), b.symbol) AS company, b.exchange,
+                       arg_max(b.price, b.timestamp) AS price
+                FROM batch b
+                GROUP BY 1, 2
             )
-            # Run validation, return results
-            # validation_result = self.gx_context.run_validation_operator(...)
+            SELECT COUNT(*) AS pairs,
+                   MAX(ABS(n.price - x.price) / LEAST(n.price, x.price) * 100) AS max_spread_pct,
+                   COUNT(*) FILTER (WHERE ABS(n.price - x.price) / LEAST(n.price, x.price) * 100 > ?) AS divergent
+            FROM keyed n JOIN keyed x ON n.company = x.company AND n.exchange = 'NSE' AND x.exchange = 'BSE'
+            """,
+            [lo, hi, settings.DQ_MAX_SPREAD_PCT],
+        )[0]
+        return {
+            "check_type": "cross_exchange_spread",
+            "status": PASSED if not row["divergent"] else FAILED,
+            "details": {**row, "threshold_pct": settings.DQ_MAX_SPREAD_PCT, "sample_percent": self.sample_percent},
+        }
 
-            logger.info("Quote validation completed successfully")
-            return True
-        except GreatExpectationsError as e:
-            logger.error(f"Great Expectations validation error: {e}")
-            return False
+    def _duplicate_check(self, lo: int, hi: int) -> Dict[str, Any]:
+        row = db_manager.execute_query(
+            self._batch_cte(sampled=True) + """
+            SELECT
+                (SELECT COUNT(*) FROM (
+                    SELECT symbol, exchange, timestamp FROM batch GROUP BY ALL HAVING COUNT(*) > 1
+                )) AS in_batch,
+                (SELECT COUNT(*) FROM batch b WHERE EXISTS (
+                    SELECT 1 FROM quotes q
+                    WHERE q.timestamp BETWEEN (SELECT MIN(timestamp) FROM batch) AND (SELECT MAX(timestamp) FROM batch)
+                      AND q.id < ? AND q.symbol = b.symbol AND q.exchange = b.exchange AND q.timestamp = b.timestamp
+                )) AS against_history
+            """,
+            [lo, hi, lo],
+        )[0]
+        return {
+            "check_type": "duplicates",
+            "status": PASSED if not (row["in_batch"] or row["against_history"]) else FAILED,
+            "details": {**row, "sample_percent": self.sample_percent},
+        }
+
+    def validate_quotes(self, min_id: int, max_id: int) -> bool:
+        """Run all checks over quotes with id in [min_id, max_id] and log them. True if all passed."""
+        results = []
+        for check in (self._range_check, self._null_rate_check, self._freshness_check,
+                      self._spread_check, self._duplicate_check):
+            try:
+                results.append(check(min_id, max_id))
+            except Exception as e:
+                logger.error(f"Quote quality check {check.__name__} failed to run: {e}")
+        try:
+            log_quality_checks(self.SOURCE, results)
         except Exception as e:
-            logger.error(f"Unexpected validation error: {e}")
-            return False
+            logger.error(f"Failed to write data_quality_log: {e}")
+        failed = [r["check_type"] for r in results if r["status"] == FAILED]
+        if failed:
+            logger.warning(f"Quote batch {min_id}..{max_id} failed quality checks: {failed}")
+        else:
+            logger.info(f"Quote batch {min_id}..{max_id} passed {len(results)} quality checks")
+        return not failed
+
 
 class GoldRateValidator:
-    def __init__(self):
-        pass
+    SOURCE = "gold_rates"
 
-    def validate_rates(self):
-        # Similar validation logic for gold_rates table
-        pass
+    def validate_rates(self, as_of: Optional[date] = None) -> bool:
+        """Range, 10g/1g consistency and freshness checks over the latest gold_rates date."""
+        as_of = as_of or date.today()
+        results = []
+        try:
+            row = db_manager.execute_query(
+                """
+                SELECT COUNT(*) AS rows,
+                       MAX(date) AS latest_date,
+                       COUNT(*) FILTER (WHERE rate_per_gram <= 0 OR rate_per_10g <= 0) AS non_positive,
+                       COUNT(*) FILTER (WHERE ABS(rate_per_10g - rate_per_gram * 10) > rate_per_gram * 10 * 0.01) AS inconsistent_10g,
+                       COUNT(*) FILTER (WHERE ABS(change_percent) > 50) AS bad_change_percent
+                FROM gold_rates
+                WHERE date = (SELECT MAX(date) FROM gold_rates)
+                """
+            )[0]
+            violations = row["non_positive"] + row["inconsistent_10g"] + row["bad_change_percent"]
+            results.append({"check_type": "range", "status": PASSED if violations == 0 else FAILED, "details": row})
+            fresh = row["latest_date"] is not None and row["latest_date"] >= as_of - timedelta(days=1)
+            results.append({
+                "check_type": "freshness",
+                "status": PASSED if fresh else FAILED,
+                "details": {"latest_date": row["latest_date"], "as_of": as_of},
+            })
+            log_quality_checks(self.SOURCE, results)
+        except Exception as e:
+            logger.error(f"Gold rate validation error: {e}")
+            return False
+        return all(r["status"] == PASSED for r in results)
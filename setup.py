@@ -21,6 +21,7 @@ setup(
         "python-jose>=3.3.0",
         "icalendar>=4.0.9",
         "numpy>=1.26.1",
+        "scipy>=1.11.0",
         "pandas>=2.1.0",
         "shap>=0.42.1",
         "joblib>=1.3.2",
@@ -34,6 +35,7 @@ setup(
     entry_points={
         "console_scripts": [
             "elite-stock-engine=app.main:app",
+            "elite-stock-worker=app.tasks.worker:main",
         ],
     },
 )
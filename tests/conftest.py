@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported: use an in-memory DuckDB and a
+# throwaway ingest queue so tests never touch data/.
+os.environ["DATABASE_MEMORY"] = "true"
+os.environ.setdefault("INGEST_QUEUE_PATH", os.path.join(tempfile.mkdtemp(prefix="ese-tests-"), "ingest_queue.db"))
+
+from pathlib import Path
+
+import pytest
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def fixture_text():
+    def read(name: str) -> str:
+        return (FIXTURES / name).read_text()
+    return read
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app.core.database import db_manager
+    yield db_manager
+    db_manager.close()  # before pytest releases the captured stderr loguru writes to
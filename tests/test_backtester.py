@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.backtest.backtester import Backtester, BacktestConfig, CostModel, PricePanel
+from app.core.database import db_manager
+from app.core.security_master import security_master
+
+FREE = CostModel(stt=0, brokerage=0, exchange=0, gst=0, stamp_duty=0, slippage=0)
+
+
+def _panel(n_days: int, n_symbols: int, adv: float) -> PricePanel:
+    dates = np.array([date(2026, 1, 1) + timedelta(days=i) for i in range(n_days)], dtype=object)
+    return PricePanel(
+        dates=dates,
+        symbols=np.array([f"S{i}" for i in range(n_symbols)], dtype=object),
+        returns=np.zeros((n_days, n_symbols)),
+        adv=np.full((n_days, n_symbols), adv),
+    )
+
+
+def test_clipped_trade_keeps_working_towards_the_target():
+    panel = _panel(6, 1, adv=1e6)
+    signals = np.full((6, 1), np.nan)
+    signals[0, 0] = 0.5
+    config = BacktestConfig(capital=1e6, execution_lag=1, max_participation=0.2, costs=FREE)
+
+    result = Backtester().simulate(signals, panel, config)
+
+    # 20% of ADV per day: 0.2, 0.4, then the remaining 0.1 on the third trading day
+    assert np.allclose(result["turnover"][0] * 2, [0, 0.2, 0.2, 0.1, 0, 0])
+    assert np.allclose(result["capacity_clipped"][0], [0, 0.3, 0.1, 0, 0, 0])
+
+
+def test_untradable_symbol_is_bought_once_it_has_a_bar():
+    panel = _panel(4, 2, adv=1e12)
+    panel.returns[1, 1] = np.nan  # no bar for S1 on the execution day
+    signals = np.full((4, 2), np.nan)
+    signals[0] = [0.5, 0.5]
+    config = BacktestConfig(capital=1e6, execution_lag=1, costs=FREE)
+
+    result = Backtester().simulate(signals, panel, config)
+
+    assert np.allclose(result["turnover"][0] * 2, [0, 0.5, 0.5, 0])
+
+
+def test_signal_dates_on_the_same_trading_day_are_not_summed():
+    security_master.register_listings([("BTA", "NSE", None)])
+    sec_id = security_master.resolve("BTA", "NSE")
+    monday = date(2026, 1, 5)
+    history = [d for d in (monday - timedelta(days=i) for i in range(40, 0, -1)) if d.weekday() < 5]  # ADV warm-up
+    days = [monday + timedelta(days=i) for i in range(5)]
+    db_manager.bulk_insert(
+        "daily_bars", ["sec_id", "exchange", "date", "symbol", "close", "volume"],
+        [[sec_id, "NSE", d, "BTA", 100.0, 10 ** 9] for d in history]
+        + [[sec_id, "NSE", d, "BTA", 100.0 + i, 10 ** 9] for i, d in enumerate(days)],
+    )
+    signals = [
+        {"date": "2026-01-03", "symbol": "BTA", "weight": 0.4},  # Saturday -> Monday
+        {"date": "2026-01-05", "symbol": "BTA", "weight": 0.6},
+    ]
+    try:
+        result = Backtester().run(signals, BacktestConfig(capital=1e6, execution_lag=0, costs=FREE))
+    finally:
+        db_manager.execute_insert("DELETE FROM daily_bars WHERE symbol = 'BTA'")
+
+    # 60% (not 100%) bought at Monday's close of 100 and held to 104
+    assert abs(result["total_return"] - 0.6 * 0.04) < 1e-9
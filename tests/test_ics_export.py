@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from app.api.events_actions import _etag_matches
+from app.core.database import db_manager
+from app.events_actions.ics_export import ICSScheduler
+
+
+def test_editing_an_action_changes_the_feed_version():
+    ics = ICSScheduler()
+    ex_date = date.today() + timedelta(days=3)
+    db_manager.execute_insert(
+        "INSERT INTO corporate_actions (id, symbol, type, ex_date, event_date, amount) VALUES (9001, 'ICSA', 'DIVIDEND', ?, ?, 5)",
+        [ex_date, ex_date],
+    )
+    try:
+        content, etag = ics.feed()
+        assert b"ICSA Dividend 5" in content
+        assert ics.feed()[1] == etag
+
+        # Same row count, id and timestamps: only the content differs
+        db_manager.execute_insert("UPDATE corporate_actions SET amount = 7 WHERE id = 9001")
+        content, changed = ics.feed()
+        assert changed != etag
+        assert b"ICSA Dividend 7" in content
+    finally:
+        db_manager.execute_insert("DELETE FROM corporate_actions WHERE id = 9001")
+
+
+def test_if_none_match_lists_weak_tags_and_wildcard():
+    etag = '"abc"'
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('"xyz", W/"abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"xyz", W/"abcd"', etag)
+    assert not _etag_matches(None, etag)
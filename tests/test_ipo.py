@@ -0,0 +1,43 @@
+from datetime import date
+
+from app.core.database import db_manager
+from app.ipo.ingest import upsert_ipos
+
+
+def test_upsert_binds_iso_date_strings_and_keeps_missing_fields():
+    upsert_ipos([{"symbol": "TESTIPO", "open_date": "2026-10-20", "close_date": "2026-10-22", "lot_size": 10}])
+    upsert_ipos([{"symbol": "TESTIPO", "listing_date": "2026-10-27T00:00:00"}])
+
+    row = db_manager.execute_query(
+        "SELECT open_date, close_date, listing_date, lot_size FROM upcoming_ipos WHERE symbol = 'TESTIPO'"
+    )[0]
+    assert row == {
+        "open_date": date(2026, 10, 20),
+        "close_date": date(2026, 10, 22),
+        "listing_date": date(2026, 10, 27),
+        "lot_size": 10,
+    }
+
+
+def test_tracker_parses_iso_captured_at_and_persists_before_applying(monkeypatch):
+    from app.ipo.tracker import SubscriptionTracker
+
+    tracker = SubscriptionTracker()
+    assert tracker.ingest([
+        {"symbol": "TRK", "captured_at": "2026-10-19T10:00:00", "qib": 1.0, "total": 2.0},
+        {"symbol": "TRK", "captured_at": "2026-10-19T10:30:00", "qib": 2.0, "total": 3.0},
+    ]) == 2
+    latest = tracker._latest["TRK"]
+    assert latest["total"] == 3.0
+    assert latest["velocity_per_hour"]["total"] > 0
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(db_manager, "bulk_insert", fail)
+    try:
+        tracker.ingest([{"symbol": "TRK", "captured_at": "2026-10-19T11:00:00", "total": 9.0}])
+    except RuntimeError:
+        pass
+    assert tracker._latest["TRK"]["total"] == 3.0
+    assert len(tracker._points["TRK"]) == 2
@@ -0,0 +1,26 @@
+from datetime import date, datetime, time
+
+from app.core.config import settings
+from app.tasks.market_calendar import IST, SessionPhase, TradingCalendar
+from app.tasks.scheduler import MARKET_REFRESH_JOB
+
+
+def test_next_refresh_skips_weekend_and_holidays():
+    calendar = TradingCalendar(holidays={date(2026, 1, 26)}, special_sessions={})
+    # Friday after the close -> Tuesday's pre-open (Monday is a holiday)
+    nxt = calendar.next_refresh_time(datetime(2026, 1, 23, 17, 0, tzinfo=IST))
+    assert nxt.date() == date(2026, 1, 27)
+    assert calendar.phase(nxt) != SessionPhase.CLOSED
+
+
+def test_extra_sessions_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_EXTRA_SESSIONS", "2026-11-08 18:00-19:00")
+    calendar = TradingCalendar()
+    assert calendar.sessions_for(date(2026, 11, 8))[0].start == time(18, 0)
+    assert calendar.phase(datetime(2026, 11, 8, 18, 30, tzinfo=IST)) == SessionPhase.SPECIAL
+    assert calendar.next_session_start(datetime(2026, 11, 8, 12, 0, tzinfo=IST)).hour == 18
+
+
+def test_market_refresh_job_never_misfires():
+    assert MARKET_REFRESH_JOB["misfire_grace_time"] is None
+    assert MARKET_REFRESH_JOB["coalesce"] is True
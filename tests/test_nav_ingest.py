@@ -0,0 +1,92 @@
+from datetime import date
+
+from app.core.database import db_manager
+from app.mf_etf.metrics import compute_fund_metrics
+from app.mf_etf.nav_ingest import _is_etf, load_amfi_nav, parse_amfi_nav, update_fund_attributes
+from app.mf_etf.screener import ETFScreener, MFScreener
+
+
+def test_parse_carries_category_and_amc(fixture_text):
+    schemes, navs = parse_amfi_nav(fixture_text("amfi_nav_sample.txt"))
+
+    assert set(schemes) == {119551, 120465, 120503, 118741, 145137}
+    frontline = schemes[120465]
+    assert frontline["category"] == "Equity Scheme - Large Cap Fund"
+    assert frontline["amc"] == "Aditya Birla Sun Life Mutual Fund"
+    assert frontline["isin_growth"] == "INF209K01YY7"
+    assert frontline["isin_reinvest"] is None
+    assert schemes[119551]["isin_reinvest"] == "INF209KA13Z9"
+    assert schemes[118741]["amc"] == "Nippon India Mutual Fund"
+
+
+def test_parse_skips_na_navs_but_keeps_the_scheme(fixture_text):
+    schemes, navs = parse_amfi_nav(fixture_text("amfi_nav_sample.txt"))
+
+    assert 120503 in schemes
+    assert 120503 not in navs["fid"]
+    assert len(navs["fid"]) == 4
+    assert navs["date"] == [date(2026, 10, 17)] * 4
+    assert navs["nav"][navs["fid"].index(120465)] == 512.11
+
+
+def test_parse_history_layout():
+    text = (
+        "Scheme Code;Scheme Name;ISIN Div Payout/ISIN Growth;ISIN Div Reinvestment;"
+        "Net Asset Value;Repurchase Price;Sale Price;Date\n"
+        "Open Ended Schemes(Debt Scheme - Liquid Fund)\n"
+        "HDFC Mutual Fund\n"
+        "119062;HDFC Liquid Fund - Growth;INF179KB1HK0;;4801.2213;;;16-10-2026\n"
+    )
+    schemes, navs = parse_amfi_nav(text)
+
+    assert schemes[119062]["name"] == "HDFC Liquid Fund - Growth"
+    assert schemes[119062]["category"] == "Debt Scheme - Liquid Fund"
+    assert navs == {"fid": [119062], "date": [date(2026, 10, 16)], "nav": [4801.2213]}
+
+
+def test_etf_detection_excludes_funds_of_funds(fixture_text):
+    schemes, _ = parse_amfi_nav(fixture_text("amfi_nav_sample.txt"))
+
+    assert schemes[118741]["is_etf"]
+    assert not schemes[145137]["is_etf"]
+    assert not schemes[120465]["is_etf"]
+    assert not _is_etf(None, "Kotak Gold ETF Fund of Fund - Direct Growth")
+    assert _is_etf(None, "SBI Nifty 50 ETF")
+
+
+def test_screen_defaults_tolerate_missing_attributes(fixture_text):
+    load_amfi_nav(fixture_text("amfi_nav_sample.txt"))
+    compute_fund_metrics()
+
+    funds = {r["fid"] for r in MFScreener().run({})["results"]}
+    etfs = {r["fid"] for r in ETFScreener().run({})["results"]}
+    assert {119551, 120465, 145137} <= funds
+    assert etfs == {118741}
+
+    update_fund_attributes([{"fid": 120465, "expense_ratio": 0.08}])
+    compute_fund_metrics()
+    assert 120465 not in {r["fid"] for r in MFScreener().run({})["results"]}
+    assert 120465 in {r["fid"] for r in MFScreener().run({"max_er": 0.1})["results"]}
+    db_manager.execute_insert("DELETE FROM fund_metrics")
+
+
+def test_index_levels_fetch_backfills_then_continues(monkeypatch):
+    import asyncio
+    from datetime import timedelta
+    from app.data.fetchers.nse_fetcher import NSEFetcher
+    from app.mf_etf.nav_ingest import fetch_index_levels
+
+    calls = []
+
+    async def fake_history(self, index_name, start, end):
+        calls.append((index_name, start, end))
+        return [(end - timedelta(days=1), 100.0), (end, 101.0)]
+
+    monkeypatch.setattr(NSEFetcher, "fetch_index_history", fake_history)
+    today = date.today()
+
+    assert asyncio.run(fetch_index_levels(["NIFTY TEST"])) == {"NIFTY TEST": 2}
+    assert calls[-1][1] < today - timedelta(days=365)
+    assert asyncio.run(fetch_index_levels(["NIFTY TEST"])) == {"NIFTY TEST": 0}
+    assert len(calls) == 1
+    db_manager.execute_insert("DELETE FROM index_history WHERE index_name = 'NIFTY TEST'")
@@ -0,0 +1,43 @@
+from datetime import date
+
+import pytest
+
+from app.backtest.pit_loader import PITLoader, load_membership_history, snapshot_universe
+from app.core.config import settings
+from app.core.database import db_manager
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    monkeypatch.setattr(settings, "PIT_CACHE_CHECK_SECONDS", 0)
+    db_manager.bulk_insert(
+        "stocks", ["symbol", "name", "exchange", "sector"],
+        [["PITA", "A", "NSE", "IT"], ["PITB", "B", "NSE", "BANK"]],
+    )
+    yield
+    db_manager.execute_insert("DELETE FROM universe_membership")
+    db_manager.execute_insert("DELETE FROM stocks WHERE symbol IN ('PITA', 'PITB')")
+
+
+def test_cache_reloads_after_a_same_day_correction(universe):
+    today = date.today()
+    snapshot_universe(today)
+    loader = PITLoader()
+    assert {m["symbol"]: m["sector"] for m in loader.universe(today)} == {"PITA": "IT", "PITB": "BANK"}
+
+    # Dropped and reopened on the same day: row count and dates are unchanged
+    db_manager.execute_insert("UPDATE stocks SET sector = 'AUTO' WHERE symbol = 'PITA'")
+    snapshot_universe(today)
+
+    assert {m["symbol"]: m["sector"] for m in loader.universe(today)}["PITA"] == "AUTO"
+
+
+def test_membership_history_accepts_iso_dates(universe):
+    loaded = load_membership_history([
+        {"symbol": "OLDCO", "valid_from": "2020-01-01", "valid_to": "2022-06-30", "name": "Old Co", "sector": "IT"},
+    ])
+    loader = PITLoader()
+
+    assert loaded == 1
+    assert list(loader.members(date(2021, 1, 1))) == ["OLDCO"]
+    assert list(loader.members(date(2022, 6, 30))) == []
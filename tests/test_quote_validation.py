@@ -0,0 +1,22 @@
+from app.validation.quote_batch import validate_quote_batch
+
+
+def test_batch_rejects_only_rows_that_break_model_bounds():
+    rows = [
+        {"symbol": "OK", "exchange": "NSE", "price": 100.0, "high": 110.0, "low": 95.0},
+        {"symbol": "OKNULLS", "exchange": "BSE", "price": 50.0, "volume": None},
+        {"symbol": "", "exchange": "NSE", "price": 10.0},
+        {"symbol": "BADX", "exchange": "LSE", "price": 10.0},
+        {"symbol": "NEG", "exchange": "NSE", "price": -1.0},
+        {"symbol": "HILO", "exchange": "NSE", "price": 100.0, "high": 90.0, "low": 95.0},
+        {"symbol": "FAR", "exchange": "NSE", "price": 100.0, "open": 300.0},
+        {"symbol": "TEXT", "exchange": "NSE", "price": "n/a"},
+    ]
+    result = validate_quote_batch(rows)
+
+    assert result.reject.tolist() == [False, False, True, True, True, True, True, True]
+    assert result.accepted == 2
+    assert result.reasons(5) == ["high_low"]
+    assert result.counts() == {
+        "symbol": 1, "exchange": 1, "price": 2, "open_vs_price": 1, "high_low": 1,
+    }
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.backtest import walk_forward
+from app.backtest.backtester import PricePanel
+from app.backtest.pit_loader import snapshot_universe
+from app.backtest.walk_forward import WalkForward, _candidates, _inputs, _windows
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.security_master import security_master
+
+SYMBOLS = ["WFA", "WFB", "WFC", "WFD"]
+
+
+def _trading_days(end: date, n: int):
+    days, d = [], end
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d -= timedelta(days=1)
+    return days[::-1]
+
+
+@pytest.fixture
+def bars(monkeypatch):
+    monkeypatch.setattr(settings, "PIT_CACHE_CHECK_SECONDS", 0)
+    monkeypatch.setattr(settings, "WALKFORWARD_MAX_WORKERS", 1)
+    security_master.register_listings([(s, "NSE", None) for s in SYMBOLS])
+    days = _trading_days(date.today(), 260)
+    rng = np.random.default_rng(7)
+    closes = 100 * np.cumprod(1 + rng.normal(0.0005, 0.01, (len(days), len(SYMBOLS))), axis=0)
+    db_manager.bulk_insert(
+        "daily_bars", ["sec_id", "exchange", "date", "symbol", "close", "volume"],
+        [
+            [security_master.resolve(s, "NSE"), "NSE", d, s, float(closes[t, j]), 10 ** 7]
+            for j, s in enumerate(SYMBOLS) for t, d in enumerate(days)
+        ],
+    )
+    db_manager.bulk_insert("stocks", ["symbol", "name", "exchange"], [[s, s, "NSE"] for s in SYMBOLS[:2]])
+    yield days
+    for table in ("walkforward_results", "universe_membership"):
+        db_manager.execute_insert(f"DELETE FROM {table}")
+    db_manager.execute_insert("DELETE FROM daily_bars WHERE symbol IN (SELECT UNNEST(?))", [SYMBOLS])
+    db_manager.execute_insert("DELETE FROM stocks WHERE symbol IN (SELECT UNNEST(?))", [SYMBOLS])
+
+
+def test_rolling_windows_step_by_the_out_of_sample_length():
+    assert _windows(10, 4, 2, anchored=False) == [(0, 4, 6), (2, 6, 8), (4, 8, 10)]
+    assert _windows(11, 4, 2, anchored=False)[-1] == (4, 8, 10)  # a partial last block is dropped
+
+
+def test_anchored_windows_expand_from_the_first_day():
+    assert _windows(10, 4, 2, anchored=True) == [(0, 4, 6), (0, 6, 8), (0, 8, 10)]
+    assert _windows(5, 4, 2, anchored=True) == []
+
+
+def test_grid_candidates_decode_every_combination_in_order():
+    space = {"b": [1, 2, 3], "a": ["x", "y"]}
+    assert _candidates(space, "grid", 0, 0) == [
+        {"a": a, "b": b} for a in ("x", "y") for b in (1, 2, 3)
+    ]
+
+
+def test_random_candidates_are_a_seeded_sample_of_the_grid():
+    space = {"a": list(range(10)), "b": list(range(10)), "c": list(range(10))}
+    grid = _candidates(space, "grid", 0, 0)
+    sample = _candidates(space, "random", 25, seed=3)
+
+    assert len(sample) == 25
+    assert len({tuple(p.values()) for p in sample}) == 25
+    assert all(p in grid for p in sample)
+    assert sample == _candidates(space, "random", 25, seed=3)
+    assert _candidates(space, "random", 5000, seed=3) == grid  # more samples than combinations
+
+
+def test_todays_snapshot_does_not_empty_history(bars):
+    days = bars
+    snapshot_universe(days[-1])  # versions open today; WFC and WFD are not in `stocks`
+    n = len(days)
+    panel = PricePanel(
+        dates=np.array(days, dtype=object),
+        symbols=np.array(SYMBOLS, dtype=object),
+        returns=np.zeros((n, len(SYMBOLS))),
+        adv=np.ones((n, len(SYMBOLS))),
+    )
+
+    eligible = _inputs(panel)["eligible"]
+
+    assert eligible[:-1].all()  # before the first version: every tradable name
+    assert eligible[-1].tolist() == [True, True, False, False]
+
+
+def test_rerun_serves_every_window_from_the_cache(bars, monkeypatch):
+    spec = {
+        "name": "momentum", "symbols": SYMBOLS, "in_sample_days": 100, "out_sample_days": 50,
+        "params": {"lookback": [10, 20], "skip": [0], "top_n": [2], "rebalance_days": [5]},
+    }
+    first = WalkForward().optimize(spec)
+    assert first["computed_windows"] == 3 and first["cached_windows"] == 0
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached windows were recomputed")
+
+    monkeypatch.setattr(walk_forward.WalkForward, "_compute", fail)
+    second = WalkForward().optimize(spec)
+
+    assert second["computed_windows"] == 0 and second["cached_windows"] == 3
+    assert second["windows"] == first["windows"]
+    assert second["out_of_sample"] == first["out_of_sample"]
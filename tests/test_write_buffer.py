@@ -0,0 +1,92 @@
+import pytest
+
+from app.core.database import db_manager
+from app.core.quote_dedup import QuoteDeduplicator
+from app.core.security_master import security_master
+from app.core.write_buffer import QuoteWriteBuffer
+
+
+@pytest.fixture
+def buffer():
+    yield QuoteWriteBuffer(max_rows=1000, deduplicator=QuoteDeduplicator(mode="rle"))
+    db_manager.execute_insert("DELETE FROM quotes WHERE symbol LIKE 'WB%'")
+    db_manager.execute_insert(
+        "DELETE FROM securities WHERE sec_id IN (SELECT sec_id FROM security_aliases WHERE symbol LIKE 'WB%')"
+    )
+    db_manager.execute_insert("DELETE FROM security_aliases WHERE symbol LIKE 'WB%'")
+    db_manager.execute_insert("DELETE FROM stocks WHERE symbol LIKE 'WB%'")
+    security_master.load()
+
+
+def quotes(n, **overrides):
+    return [dict({"symbol": f"WB{i}", "exchange": "NSE", "price": 100.0 + i}, **overrides) for i in range(n)]
+
+
+def stored(column="symbol"):
+    return db_manager.execute_query(f"SELECT symbol, {column} FROM quotes WHERE symbol LIKE 'WB%' ORDER BY symbol")
+
+
+def test_flush_stamps_sec_ids_and_skips_redelivered_tokens(buffer):
+    flushed = []
+    buffer.add_flush_listener(flushed.append)
+    assert buffer.add(quotes(3), token=1) == 3
+    assert buffer.add(quotes(3), token=1) == 0  # redelivered batch, still staged
+
+    assert buffer.flush() == 3
+    assert flushed == [[1]]
+    assert all(r["sec_id"] is not None for r in stored("sec_id"))
+
+
+def test_unchanged_quotes_extend_the_latest_row(buffer):
+    buffer.add(quotes(2))
+    buffer.flush()
+    assert buffer.add(quotes(2)) == 0
+    assert buffer.add(quotes(2)) == 0
+    buffer.flush()
+
+    rows = stored("repeat_count, last_seen_at")
+    assert len(rows) == 2
+    assert all(r["repeat_count"] == 2 and r["last_seen_at"] is not None for r in rows)
+
+
+def test_rows_the_database_rejects_are_isolated_and_dead_lettered(buffer):
+    dead = []
+    buffer.add_dead_letter_listener(lambda rows, error: dead.append(rows))
+    rows = quotes(6)
+    rows[3]["price"] = 1e9  # passes batch validation, overflows DECIMAL(10,2)
+    buffer.add(rows, token="batch")
+
+    assert buffer.flush() == 5
+    assert [r["symbol"] for r in dead[0]] == ["WB3"]
+    assert [r["symbol"] for r in stored()] == ["WB0", "WB1", "WB2", "WB4", "WB5"]
+    assert buffer.get_stats()["rows_dead_lettered"] == 1
+    assert buffer.get_stats()["backlog_rows"] == 0
+
+
+def test_rows_stay_staged_while_the_database_is_down(buffer, monkeypatch):
+    buffer.add(quotes(2), token=7)
+
+    def down(*args, **kwargs):
+        raise RuntimeError("database down")
+
+    with monkeypatch.context() as m:
+        m.setattr(db_manager, "bulk_insert", down)
+        m.setattr(db_manager, "execute_query", down)
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+    assert buffer.get_stats()["backlog_rows"] == 2
+
+    assert buffer.flush() == 2
+    assert len(stored()) == 2
+
+
+def test_nse_and_bse_listings_keep_their_own_stocks_rows(buffer):
+    buffer.add([
+        {"symbol": "WBDUAL", "exchange": "NSE", "price": 10.0, "name": "Dual NSE"},
+        {"symbol": "WBDUAL", "exchange": "BSE", "price": 10.1, "name": "Dual BSE", "isin": "INE000WB0001"},
+    ])
+    buffer.flush()
+
+    rows = db_manager.execute_query("SELECT exchange, name FROM stocks WHERE symbol = 'WBDUAL' ORDER BY exchange")
+    assert rows == [{"exchange": "BSE", "name": "Dual BSE"}, {"exchange": "NSE", "name": "Dual NSE"}]
+    assert db_manager.execute_query("SELECT exchange FROM primary_stocks WHERE symbol = 'WBDUAL'") == [{"exchange": "NSE"}]
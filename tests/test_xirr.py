@@ -0,0 +1,27 @@
+import math
+
+from app.portfolio.services import calculate_xirr
+from app.portfolio.xirr import xirr, xirr_batch
+
+
+def test_one_year_round_trip():
+    assert math.isclose(xirr(["2025-01-01", "2026-01-01"], [-1000.0, 1100.0]), 0.1, rel_tol=1e-9)
+    assert math.isclose(xirr(["2025-01-01", "2026-01-01"], [-1000.0, 500.0]), -0.5, rel_tol=1e-9)
+
+
+def test_flows_without_a_sign_change_have_no_xirr():
+    dates = ["2025-01-01", "2025-06-01", "2026-01-01"]
+    assert xirr(dates, [100.0, 50.0, 25.0]) is None   # all positive
+    assert xirr(dates, [-100.0, -50.0, 0.0]) is None  # no inflow
+    assert calculate_xirr(dates, [100.0, 50.0, 25.0]) == 0.0
+
+
+def test_batch_mixes_solvable_and_unsolvable_series():
+    rates = xirr_batch([
+        (["2025-01-01", "2026-01-01"], [-1000.0, 1100.0]),
+        (["2025-01-01", "2026-01-01"], [1000.0, 1100.0]),
+        (["2025-01-01", "2025-01-31"], [-100.0, 110.0]),  # 10% in 30 days
+    ])
+    assert math.isclose(rates[0], 0.1, rel_tol=1e-9)
+    assert math.isnan(rates[1])
+    assert math.isclose(rates[2], 1.1 ** (365 / 30) - 1, rel_tol=1e-9)